@@ -0,0 +1,182 @@
+"""
+Vectorized data augmentation for the 138-feature bimanual gesture rows
+
+Every transform works on whole (N, 138) arrays at once:
+    - mirroring: x -> 1 - x, with the two hand slots and the left/right
+      elbow and wrist pose points swapped
+    - rotation and scaling of each hand around its wrist landmark
+    - Gaussian coordinate jitter
+    - dropout of one hand, leaving the other in slot 0 the way
+      extract_features() stores a single detected hand
+
+Missing hands and pose points (all zeros) stay zero. Large jobs are split
+across worker processes; every fixed-size block of input rows has its own
+random stream derived from the seed, so the output does not depend on the
+number of workers.
+
+Usage from the trainers:
+    X_train, y_train = augment_dataset(X_train, y_train, copies=100)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HAND_SLOTS = 2
+HAND_LANDMARKS = 21
+HAND_FEATURES = HAND_SLOTS * HAND_LANDMARKS * 3
+# Pose features are left elbow, right elbow, left wrist, right wrist (x, y, z)
+POSE_MIRROR_ORDER = [1, 0, 3, 2]
+
+# Camera frames are 640x480; rotate in pixel-proportional space so hands
+# are not sheared by the non-square normalized coordinates
+ASPECT_RATIO = 640 / 480
+
+# Below this many output rows a single process is faster than a pool
+MIN_ROWS_PER_PROCESS = 20000
+
+# Input rows per independently seeded block (the unit of work for the pool)
+BLOCK_ROWS = 256
+
+
+def add_augmentation_arguments(parser):
+    """Add the augmentation command line options to an argparse parser"""
+    parser.add_argument("--augment", type=int, default=0,
+                        help="Number of augmented copies of each training row (0 = no augmentation)")
+    parser.add_argument("--augment-workers", type=int, default=0,
+                        help="Worker processes for augmentation (0 = one per CPU)")
+    parser.add_argument("--no-mirror", dest="mirror", action="store_false",
+                        help="Don't mirror left/right (for gestures that are not symmetric)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for augmentation")
+    return parser
+
+
+def _split(X):
+    """(N, 2, 21, 3) hand view and (N, 4, 3) pose view of a feature array"""
+    hands = X[:, :HAND_FEATURES].reshape(-1, HAND_SLOTS, HAND_LANDMARKS, 3)
+    pose = X[:, HAND_FEATURES:].reshape(len(X), -1, 3)
+    return hands, pose
+
+
+def mirror(X, mask):
+    """Mirror the rows selected by mask horizontally, in place"""
+    hands, pose = _split(X)
+    hand_present = np.any(hands != 0, axis=(2, 3))
+    pose_present = np.any(pose != 0, axis=2)
+
+    hands[..., 0] = np.where(mask[:, None, None] & hand_present[..., None], 1.0 - hands[..., 0], hands[..., 0])
+    pose[..., 0] = np.where(mask[:, None] & pose_present, 1.0 - pose[..., 0], pose[..., 0])
+
+    # Only swap slots when both hands are present, so a single hand stays in slot 0
+    swap = mask & hand_present.all(axis=1)
+    hands[swap] = hands[swap][:, ::-1]
+    pose[mask] = pose[mask][:, POSE_MIRROR_ORDER]
+    return X
+
+
+def rotate_scale(X, angles, scales):
+    """Rotate (radians) and scale each hand around its wrist, in place"""
+    hands, _ = _split(X)
+    present = np.any(hands != 0, axis=(2, 3))
+    wrist = hands[:, :, :1, :]
+    dx = (hands[..., 0] - wrist[..., 0]) * ASPECT_RATIO
+    dy = hands[..., 1] - wrist[..., 1]
+    cos, sin = np.cos(angles)[..., None], np.sin(angles)[..., None]
+    scale = scales[..., None]
+    x = wrist[..., 0] + (cos * dx - sin * dy) * scale / ASPECT_RATIO
+    y = wrist[..., 1] + (sin * dx + cos * dy) * scale
+    z = hands[..., 2] * scale
+    keep = present[..., None]
+    hands[..., 0] = np.where(keep, x, 0.0)
+    hands[..., 1] = np.where(keep, y, 0.0)
+    hands[..., 2] = np.where(keep, z, 0.0)
+    return X
+
+
+def jitter(X, sigma, rng):
+    """Add Gaussian noise to every non-missing coordinate, in place"""
+    X += np.where(X != 0, rng.normal(0.0, sigma, size=X.shape), 0.0)
+    return X
+
+
+def drop_hand(X, mask, rng):
+    """For rows selected by mask that have both hands, keep one random hand in slot 0"""
+    hands, _ = _split(X)
+    both = mask & np.any(hands != 0, axis=(2, 3)).all(axis=1)
+    keep_second = both & (rng.random(len(X)) < 0.5)
+    hands[keep_second, 0] = hands[keep_second, 1]
+    hands[both, 1] = 0.0
+    return X
+
+
+def augment_batch(X, copies, seed, mirror_prob=0.5, max_rotation_deg=10.0, scale_range=(0.9, 1.1),
+                  jitter_sigma=0.004, dropout_prob=0.1):
+    """
+    Make `copies` randomly augmented versions of every row of X
+
+    Returns:
+        (len(X) * copies, 138) array; row i * copies + c is a copy of X[i]
+    """
+    rng = np.random.default_rng(seed)
+    out = np.repeat(np.asarray(X, dtype=np.float64), copies, axis=0)
+    n = len(out)
+    if n == 0:
+        return out
+
+    if mirror_prob > 0:
+        mirror(out, rng.random(n) < mirror_prob)
+    max_rotation = np.deg2rad(max_rotation_deg)
+    rotate_scale(out, rng.uniform(-max_rotation, max_rotation, size=(n, HAND_SLOTS)),
+                 rng.uniform(scale_range[0], scale_range[1], size=(n, HAND_SLOTS)))
+    if jitter_sigma > 0:
+        jitter(out, jitter_sigma, rng)
+    if dropout_prob > 0:
+        drop_hand(out, rng.random(n) < dropout_prob, rng)
+    return out
+
+
+def _augment_chunk(job):
+    X, copies, seed, options = job
+    return augment_batch(X, copies, seed, **options)
+
+
+def augment_dataset(X, y, copies=100, seed=42, workers=0, include_original=True, **options):
+    """
+    Augment a labelled dataset, splitting the work across processes
+
+    Args:
+        X, y: Feature rows and labels
+        copies: Augmented copies per row
+        seed: Base seed; results are reproducible for a given seed, whatever the worker count
+        workers: Worker processes (0 = one per CPU; small jobs always run in-process)
+        include_original: Keep the original rows in front of the augmented ones
+        **options: Passed to augment_batch (mirror_prob, max_rotation_deg, ...)
+
+    Returns:
+        (X_augmented, y_augmented)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    if copies <= 0 or len(X) == 0:
+        return X, y
+
+    # Blocks and their seeds depend only on len(X) and seed; workers just share them out
+    blocks = [np.arange(start, min(start + BLOCK_ROWS, len(X))) for start in range(0, len(X), BLOCK_ROWS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    jobs = [(X[block], copies, block_seed, options) for block, block_seed in zip(blocks, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(X) * copies // MIN_ROWS_PER_PROCESS, len(blocks)))
+    if workers == 1:
+        parts = [_augment_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_augment_chunk, jobs, chunksize=-(-len(jobs) // workers)))
+
+    X_aug = np.concatenate(parts)
+    y_aug = np.repeat(y, copies)
+    if include_original:
+        X_aug = np.concatenate([X, X_aug])
+        y_aug = np.concatenate([y, y_aug])
+    return X_aug, y_aug
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Camera-free benchmark suite for the HandTalk recognition hot path
+
+Replays the recorded 138-feature frames in data/arm_hand_sequences and the
+rows of data/gestures_bimanual.csv through the same steps the recognizer runs
+per frame - feature extraction, predict_proba, the confidence threshold logic
+and TranslationModule.translate - and writes throughput and p50/p95/p99
+latency per component to a JSON file. With --baseline, the run fails when a
+component's p95 latency regresses past --max-regression.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from recognition_core import (FEATURE_COUNT, ARM_LANDMARKS, confidence_level, extract_features,
+                              load_model, top_predictions)
+from translation_module import get_translator
+
+COMPONENTS = ["extract_features", "predict_proba", "thresholds", "translate", "total"]
+
+
+def load_sequence_frames(sequences_dir="data/arm_hand_sequences"):
+    """Load (features, label) pairs from the recorded motion sequence JSON files"""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(sequences_dir, "*.json"))):
+        try:
+            with open(path, 'r') as f:
+                sequence = json.load(f)
+        except Exception as e:
+            print(f"Skipping unreadable sequence {path}: {e}")
+            continue
+        for row in sequence.get("frames", []):
+            # Rows are stored as 138 features followed by the label
+            frames.append(([float(v) for v in row[:FEATURE_COUNT]], str(row[-1])))
+    return frames
+
+
+def load_csv_frames(csv_path="data/gestures_bimanual.csv"):
+    """Load (features, label) pairs from the gesture CSV"""
+    if not os.path.exists(csv_path):
+        return []
+    df = pd.read_csv(csv_path)
+    X = df.drop('label', axis=1).values
+    y = df['label'].values
+    return [(X[i, :FEATURE_COUNT].tolist(), str(y[i])) for i in range(len(df))]
+
+
+def results_from_features(features):
+    """Rebuild MediaPipe-like hand and pose results from a 138-feature vector"""
+    def landmarks(values):
+        return [SimpleNamespace(x=values[i], y=values[i + 1], z=values[i + 2])
+                for i in range(0, len(values), 3)]
+
+    hands = []
+    for start in (0, 63):
+        values = features[start:start + 63]
+        if any(values):
+            hands.append(SimpleNamespace(landmark=landmarks(values)))
+    hand_results = SimpleNamespace(multi_hand_landmarks=hands or None)
+
+    pose_values = features[126:FEATURE_COUNT]
+    pose_landmarks = None
+    if any(pose_values):
+        pose = [SimpleNamespace(x=0.0, y=0.0, z=0.0) for _ in range(33)]
+        for i, lm in zip(ARM_LANDMARKS, landmarks(pose_values)):
+            pose[i] = lm
+        pose_landmarks = SimpleNamespace(landmark=pose)
+    return hand_results, SimpleNamespace(pose_landmarks=pose_landmarks)
+
+
+def summarize(samples_ns):
+    """Throughput and latency percentiles for one component"""
+    if not samples_ns:
+        return {"count": 0}
+    ms = np.array(samples_ns, dtype=np.float64) / 1e6
+    total_s = ms.sum() / 1000
+    return {
+        "count": int(ms.size),
+        "total_ms": round(float(ms.sum()), 3),
+        "throughput_per_s": round(ms.size / total_s, 1) if total_s > 0 else None,
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def run_benchmark(frames, model, translator, repeat=3, warmup=20):
+    """Replay frames through the recognition steps and time each component"""
+    timings = {name: [] for name in COMPONENTS}
+    replay = [results_from_features(features) for features, _ in frames]
+    clock = time.perf_counter_ns
+    skipped = 0
+
+    for iteration in range(repeat + 1):
+        # The first pass only warms up caches and lazy imports
+        measuring = iteration > 0
+        for index, (hand_results, pose_results) in enumerate(replay):
+            if not measuring and index >= warmup:
+                break
+            if not hand_results.multi_hand_landmarks:
+                # The recognizer does not classify frames without hands
+                skipped += measuring
+                continue
+
+            t0 = clock()
+            features = extract_features(hand_results, pose_results)
+            t1 = clock()
+            prediction_proba = model.predict_proba(features)[0]
+            t2 = clock()
+            max_proba = np.max(prediction_proba)
+            confidence = confidence_level(max_proba)
+            predicted_class = model.classes_[np.argmax(prediction_proba)]
+            top_predictions(prediction_proba, model.classes_, 3)
+            t3 = clock()
+            if confidence == "High":
+                translator.translate(predicted_class)
+            t4 = clock()
+
+            if measuring:
+                timings["extract_features"].append(t1 - t0)
+                timings["predict_proba"].append(t2 - t1)
+                timings["thresholds"].append(t3 - t2)
+                timings["translate"].append(t4 - t3)
+                timings["total"].append(t4 - t0)
+
+    return {name: summarize(samples) for name, samples in timings.items()}, skipped
+
+
+def compare_to_baseline(components, baseline, max_regression):
+    """List components whose p95 latency grew more than max_regression over the baseline"""
+    regressions = []
+    for name, stats in components.items():
+        base = baseline.get("components", {}).get(name, {})
+        if not base.get("p95_ms") or not stats.get("p95_ms"):
+            continue
+        change = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"]
+        if change > max_regression:
+            regressions.append(f"{name}: p95 {base['p95_ms']:.4f} ms -> {stats['p95_ms']:.4f} ms ({change:+.0%})")
+    return regressions
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Camera-free benchmark of the HandTalk recognition hot path")
+    parser.add_argument("--sequences-dir", default="data/arm_hand_sequences",
+                        help="Directory of recorded motion sequence JSON files")
+    parser.add_argument("--csv", default="data/gestures_bimanual.csv",
+                        help="Gesture CSV whose rows are replayed as frames")
+    parser.add_argument("--model", default="sign_language_model_bimanual.pkl",
+                        help="Model file to benchmark")
+    parser.add_argument("--dialect", default="english", help="Translation dialect")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes over the data")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 latency growth per component vs. the baseline (default: 0.25)")
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark and write the JSON report"""
+    args = parse_args()
+    print("=== HandTalk Recognition Benchmark ===")
+
+    frames = load_sequence_frames(args.sequences_dir) + load_csv_frames(args.csv)
+    if not frames:
+        print("❌ No recorded frames found. Please collect gesture data first.")
+        return 1
+    print(f"Loaded {len(frames)} recorded frames")
+
+    model = load_model(args.model)
+    # load_model prefers the bundle next to the pickle; report what was actually loaded
+    model_path = getattr(model, "path", None) or args.model
+    translator = get_translator()
+    translator.set_dialect(args.dialect)
+
+    components, skipped = run_benchmark(frames, model, translator, repeat=args.repeat)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "model": model_path,
+        "model_format": "bundle" if hasattr(model, "manifest") else "pickle",
+        "frames": len(frames),
+        "repeat": args.repeat,
+        "frames_without_hands": skipped,
+        "components": components,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print(f"{'Component':<18}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in COMPONENTS:
+        stats = components[name]
+        if stats["count"]:
+            print(f"{name:<18}{stats['throughput_per_s']:>12}{stats['p50_ms']:>10.4f}"
+                  f"{stats['p95_ms']:>10.4f}{stats['p99_ms']:>10.4f}")
+    print(f"\n💾 Saved benchmark report to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(components, baseline, args.max_regression)
+        if regressions:
+            print("❌ Latency regressions against baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ No latency regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import sys
 # Fixed tensorflow disablement - proper way
 import sys
+import argparse
 sys.modules['tensorflow'] = type(sys)('tensorflow')
 
 import mediapipe as mp
@@ -8,18 +9,34 @@ import cv2
 import os
 import numpy as np
 import pandas as pd
-import json
-from datetime import datetime
 import time  # Added for timer functionality
 
 # Import logging configuration
 from logging_config import setup_logging, get_logger
 
+# Import overlay rendering helpers
+from overlay_renderer import OverlayCache, draw_arm_landmarks, draw_hand_landmarks
+
+# Import region-of-interest inference
+from roi_tracker import ROITracker, add_roi_arguments
+
+# Import adaptive quality control
+from quality_controller import AdaptiveQualityController, add_quality_arguments
+
+# Import pluggable frame sources
+from frame_source import add_source_arguments, open_from_args
+
+# Import the optional invariant feature transform
+from feature_transform import add_transform_arguments, make_model
+from model_bundle import save_model
+
+# Import the background CSV / motion sequence writer
+from collection_writer import CollectionWriter
+
 # Import modules needed for training
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
-import joblib
 
 # Suppress protobuf deprecation warnings
 import warnings
@@ -36,24 +53,6 @@ log_warning = logger.warning
 # We're not using smoothing to allow for more responsive tracking
 pass
 
-def draw_text_with_background(frame, text, position, font, font_scale, text_color, thickness, bg_color=(128, 128, 128), padding=5):
-    """Draw text with a background rectangle for better visibility"""
-    # Get text size
-    text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
-    
-    # Calculate background rectangle coordinates
-    x, y = position
-    bg_coords = (
-        (x - padding, y - text_size[1] - padding),
-        (x + text_size[0] + padding, y + padding)
-    )
-    
-    # Draw background rectangle
-    cv2.rectangle(frame, bg_coords[0], bg_coords[1], bg_color, -1)
-    
-    # Draw text
-    cv2.putText(frame, text, position, font, font_scale, text_color, thickness)
-
 def load_and_prepare_data(csv_path="data/gestures_bimanual.csv"):
     """Load and prepare the bimanual gesture data for training"""
     try:
@@ -82,7 +81,7 @@ def load_and_prepare_data(csv_path="data/gestures_bimanual.csv"):
         log_error(f"Error loading data: {str(e)}")
         raise
 
-def train_model_automatically():
+def train_model_automatically(transform="raw"):
     """Automatically train the model after data collection"""
     try:
         print("=== HandTalk Bimanual Sign Language Recognition Model Training ===")
@@ -96,8 +95,8 @@ def train_model_automatically():
         log_info("Data split for training and testing")
         
         # Create and train the model
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        log_info("Training Random Forest classifier...")
+        model = make_model(RandomForestClassifier(n_estimators=100, random_state=42), transform)
+        log_info(f"Training Random Forest classifier ({transform} features)...")
         print("Training Random Forest classifier...")
         model.fit(X_train, y_train)
         
@@ -113,8 +112,8 @@ def train_model_automatically():
         
         # Save model
         model_filename = "sign_language_model_bimanual.pkl"
-        joblib.dump(model, model_filename)
-        log_info(f"Bimanual model saved as {model_filename}")
+        bundle = save_model(model, model_filename, {"accuracy": round(float(accuracy), 4)}, "data/gestures_bimanual.csv")
+        log_info(f"Bimanual model saved as {model_filename} and {bundle}")
         print(f"Bimanual model saved as {model_filename}")
         
         log_info("Automatic bimanual training completed successfully!")
@@ -126,86 +125,42 @@ def train_model_automatically():
         log_error(error_msg)
         print(f"❌ {error_msg}")
 
-def save_motion_sequence(gesture_name, motion_data):
-    """Save hand motion sequence as JSON file"""
-    try:
-        # Create directory if it doesn't exist
-        os.makedirs("data/arm_hand_sequences", exist_ok=True)
-        
-        # Generate filename with timestamp and sequence number
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        sequence_number = 1
-        
-        # Check for existing files with the same gesture name to determine sequence number
-        import glob
-        existing_files = glob.glob(f"data/arm_hand_sequences/gesture_{gesture_name}_seq_*_{timestamp[:8]}*.json")
-        if existing_files:
-            # Extract sequence numbers and find the highest
-            seq_numbers = []
-            for file in existing_files:
-                try:
-                    # Extract sequence number from filename
-                    parts = os.path.basename(file).split('_')
-                    if len(parts) >= 4:
-                        seq_num = int(parts[3])
-                        seq_numbers.append(seq_num)
-                except:
-                    pass
-            if seq_numbers:
-                sequence_number = max(seq_numbers) + 1
-        
-        # Format sequence number with leading zeros
-        seq_num_formatted = f"{sequence_number:03d}"
-        
-        # Create filename
-        filename = f"data/arm_hand_sequences/gesture_{gesture_name}_seq_{seq_num_formatted}_{timestamp}.json"
-        
-        # Prepare data for saving
-        motion_json = {
-            "metadata": {
-                "gesture_name": gesture_name,
-                "timestamp": timestamp,
-                "sequence_number": sequence_number,
-                "frame_count": len(motion_data),
-                "features_per_frame": len(motion_data[0]) if motion_data else 0
-            },
-            "frames": motion_data,
-            "feature_names": []
-        }
-        
-        # Add feature names (same as CSV header)
-        feature_names = []
-        # Hand landmarks (both hands)
-        for hand in range(2):  # Two hands
-            for i in range(21):  # 21 landmarks per hand
-                feature_names += [f"hand{hand}_x{i}", f"hand{hand}_y{i}", f"hand{hand}_z{i}"]
-        
-        # Pose landmarks (hands and arms only) - Updated to remove shoulders
-        pose_parts = ["left_elbow", "right_elbow", "left_wrist", "right_wrist"]  # Removed shoulders
-        for part in pose_parts:
-            feature_names += [f"{part}_x", f"{part}_y", f"{part}_z"]
-        
-        # Combined label
-        feature_names.append("label")
-        motion_json["feature_names"] = feature_names
-        
-        # Save to JSON file
-        with open(filename, 'w') as f:
-            json.dump(motion_json, f, indent=2)
-        
-        log_info(f"Saved motion sequence to {filename}")
-        print(f"💾 Saved motion sequence to {filename}")
-        return filename
-        
-    except Exception as e:
-        log_error(f"Error saving motion sequence: {str(e)}")
-        print(f"❌ Error saving motion sequence: {str(e)}")
-        return None
+def read_label_file(path):
+    """Gesture labels from a text file, one per line (blank lines and # comments ignored)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+def session_plan(labels, repetitions):
+    """(label, repetition) takes of a session: every repetition of a label back-to-back"""
+    return [(label, repetition) for label in labels for repetition in range(1, repetitions + 1)]
 
 # --- SETTINGS ---
-gesture_label = input("Enter gesture label for both hands: ")
+parser = argparse.ArgumentParser(description="HandTalk bimanual gesture data collector")
+add_roi_arguments(parser)
+add_quality_arguments(parser)
+add_source_arguments(parser)
+add_transform_arguments(parser)
+parser.add_argument("--labels", nargs="+", help="Record these gestures in one session instead of asking for one")
+parser.add_argument("--labels-file", help="Text file with one gesture label per line to record in one session")
+parser.add_argument("--repetitions", type=int, default=1, help="Takes to record of every label (default: 1)")
+parser.add_argument("--samples", type=int, default=20, help="Frames to capture per take (default: 20)")
+parser.add_argument("--auto-start", action="store_true",
+                    help="Start the countdown for the next take automatically instead of waiting for 's'")
+parser.add_argument("--no-train", action="store_true", help="Don't retrain the model when the session ends")
+args = parser.parse_args()
+
+# Session mode records every label of --labels / --labels-file with the same
+# camera and MediaPipe graphs; otherwise ask for a single label as before
+session_labels = list(args.labels or [])
+if args.labels_file:
+    session_labels += read_label_file(args.labels_file)
+if not session_labels:
+    session_labels = [input("Enter gesture label for both hands: ")]
+plan = session_plan(session_labels, max(1, args.repetitions))
+take_index = 0
+gesture_label, repetition = plan[take_index]
 COMBINED_GESTURE_NAME = gesture_label
-SAMPLES = 20  # how many frames to capture per gesture
+SAMPLES = args.samples  # how many frames to capture per gesture
 SAVE_PATH = "data/gestures_bimanual.csv"  # New file for bimanual data
 
 # --- SETUP ---
@@ -214,44 +169,76 @@ import mediapipe.python.solutions.hands as mp_hands
 import mediapipe.python.solutions.pose as mp_pose
 import mediapipe.python.solutions.drawing_utils as mp_drawing
 
-# MediaPipe settings with high confidence thresholds
-hands = mp_hands.Hands(
-    static_image_mode=False,  # Set to False for video/live streaming
-    max_num_hands=2,
-    min_detection_confidence=0.9,  # High detection confidence
-    min_tracking_confidence=0.9,   # High tracking confidence
-    model_complexity=1  # Use complex model for better accuracy
-)
-
-# Pose settings with high confidence thresholds
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    min_detection_confidence=0.9,  # High detection confidence
-    min_tracking_confidence=0.9,   # High tracking confidence
-    enable_segmentation=False, 
-    smooth_landmarks=True,
-    model_complexity=1  # Use complex model
-)
+def create_detectors(model_complexity=1):
+    """Create the MediaPipe Hands and Pose graphs"""
+    # MediaPipe settings with high confidence thresholds
+    hands = mp_hands.Hands(
+        static_image_mode=False,  # Set to False for video/live streaming
+        max_num_hands=2,
+        min_detection_confidence=0.9,  # High detection confidence
+        min_tracking_confidence=0.9,   # High tracking confidence
+        model_complexity=model_complexity  # 1 = complex model for better accuracy
+    )
+    
+    # Pose settings with high confidence thresholds
+    pose = mp_pose.Pose(
+        static_image_mode=False,
+        min_detection_confidence=0.9,  # High detection confidence
+        min_tracking_confidence=0.9,   # High tracking confidence
+        enable_segmentation=False, 
+        smooth_landmarks=True,
+        model_complexity=model_complexity  # 1 = complex model
+    )
+    return hands, pose
+
+hands, pose = create_detectors()
+hands_complexity = 1
 
 # Define which pose landmarks to focus on (hands and arms only)
 # Including shoulders, elbows, wrists for full arm context (no hips)
 ARM_LANDMARKS = [13, 14, 15, 16]  # Elbows, Wrists only (removed shoulders 11, 12)
 
-# Initialize camera with standard settings (30 FPS)
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)   # Standard resolution
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)  # Standard resolution
-cap.set(cv2.CAP_PROP_FPS, 30)            # Force 30 FPS for consistency
+# Landmark inference on a crop around the previously tracked hands (--roi)
+roi = ROITracker.from_args(args)
+if roi.enabled:
+    log_info(f"ROI mode enabled (margin={roi.margin}, max_side={roi.max_side})")
+
+# Adaptive model complexity / input resolution / frame skip (--target-ms).
+# Only adjusted between recordings so one gesture is captured at one quality.
+quality = AdaptiveQualityController.from_args(args)
+base_max_side = roi.max_side
+if quality.enabled:
+    log_info(f"Adaptive quality enabled with a {quality.target_ms:.0f} ms frame budget")
+    roi.max_side = min(filter(None, [base_max_side, quality.level.max_side]))
+
+# Initialize frame source: camera with standard settings (640x480, 30 FPS)
+# unless --source selects a video file, image directory or synthetic frames
+try:
+    frames = open_from_args(args)
+except (OSError, ValueError) as e:
+    log_error(f"Could not open frame source {args.source}: {str(e)}")
+    print(f"❌ Could not open frame source {args.source}: {str(e)}")
+    sys.exit(1)
 
 # Initialize temporal smoother for tracking stability
 # REMOVED: smoother = TemporalSmoother(smoothing_factor=0.4)
 # Not using smoothing for more responsive tracking
 
-all_data = []
+# Rows are appended to the CSV and the motion sequence journal by a background
+# thread while recording, so a crash keeps everything recorded so far
+writer = CollectionWriter(SAVE_PATH)
+for path in writer.recovered:
+    print(f"♻️ Recovered motion sequence from an interrupted session: {path}")
 frame_skip = 1  # Process every frame (no skipping) for better tracking
+quality_changed = False  # A quality level waiting to be applied once idle
 frame_count = 0
 
-print(f"\nRecording bimanual gesture:")
+if len(plan) > 1:
+    print(f"\nRecording session: {len(session_labels)} gestures x {max(1, args.repetitions)} takes")
+    print(f"Gestures: {', '.join(session_labels)}")
+    print("Press 'n' to skip a take; the model is trained once when the session ends.")
+else:
+    print(f"\nRecording bimanual gesture:")
 print(f"Gesture label: '{gesture_label}' (both hands)")
 print(f"Samples to collect: {SAMPLES}")
 print("Show your hands and arms when ready...")
@@ -259,34 +246,35 @@ print("Press 's' to start recording.")
 print("NOTE: Make sure this gesture is one you want to train the model to recognize!")
 
 # Log the start of the program
-log_info(f"Starting data collection for bimanual gesture: '{gesture_label}' (both hands)")
-logger.info(f"Starting data collection for bimanual gesture: '{gesture_label}' (both hands)")
+log_info(f"Starting data collection for {len(plan)} take(s) of {len(session_labels)} bimanual gesture(s), "
+         f"first: '{gesture_label}' (both hands)")
 
 recording = False
 count = 0
-countdown_active = False
-countdown_start_time = 0
+countdown_active = args.auto_start
+countdown_start_time = time.time()
+completed_takes = {}
+
+# Static and rarely-changing text is rasterized once and re-stamped per frame
+overlay = OverlayCache()
 
 try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            logger.warning("Failed to read frame from camera")  # Using standard logging
-            break
-        
+    for frame in frames:
+        frame_start = time.perf_counter()
         frame_count += 1
-        # Process every frame (no skipping) for better tracking
+        # Process every frame (no skipping) for better tracking, unless the
+        # adaptive quality controller has raised frame_skip. Skipped frames
+        # are timed too, as in the recognizer, so the average reflects the skip
         if frame_count % frame_skip != 0:
+            quality_changed = quality.record((time.perf_counter() - frame_start) * 1000) or quality_changed
             continue
             
         frame = cv2.flip(frame, 1)
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        # Process hands
-        hand_results = hands.process(rgb)
-        
-        # Process pose (wrists and elbows only - no face mapping)
-        pose_results = pose.process(rgb)
+        # Process hands and pose (wrists and elbows only - no face mapping),
+        # cropped to the tracked region in ROI mode
+        hand_results, pose_results = roi.process(hands, pose, rgb)
 
         # Handle countdown timer
         if countdown_active:
@@ -294,102 +282,24 @@ try:
             elapsed_time = time.time() - countdown_start_time
             remaining_time = max(0, 5 - int(elapsed_time))
             
-            # Display countdown on screen
-            draw_text_with_background(frame, f"Recording starts in {remaining_time} seconds", (10, 50),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3, (0, 0, 0))
-            draw_text_with_background(frame, "Get ready with your gesture", (10, 100),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+            # Display countdown on screen (only re-rasterized when the second changes)
+            overlay.set_text("countdown", f"Recording starts in {remaining_time} seconds", (10, 50),
+                             cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3, (0, 0, 0))
+            overlay.set_text("get_ready", "Get ready with your gesture", (10, 100),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
             
             # Check if countdown is finished
             if elapsed_time >= 5:
                 countdown_active = False
                 recording = True
                 count = 0
-                all_data = []
+                writer.start_recording(COMBINED_GESTURE_NAME)
+                overlay.discard("countdown", "get_ready")
                 print("🎥 Recording started... perform the gesture now.")
 
-        # Draw hand landmarks with distinction for left/right
-        # Use getattr with default None to safely access attributes
-        multi_hand_landmarks = getattr(hand_results, 'multi_hand_landmarks', None)
-        multi_handedness = getattr(hand_results, 'multi_handedness', None)
-        
-        if multi_hand_landmarks:
-            for idx, hand_landmarks in enumerate(multi_hand_landmarks):
-                # Use MediaPipe's handedness detection instead of positional guessing
-                color = (255, 0, 0)  # Default to blue (left hand)
-                hand_side = "Left"   # Default to left hand
-                
-                # Get the handedness confidence if available
-                if multi_handedness and idx < len(multi_handedness):
-                    handedness = multi_handedness[idx]
-                    classification = getattr(handedness, 'classification', [])
-                    if classification and len(classification) > 0:
-                        if classification[0].label == "Right":
-                            color = (0, 255, 0)  # Green for right hand
-                            hand_side = "Right"
-                        else:  # "Left"
-                            color = (255, 0, 0)  # Blue for left hand
-                            hand_side = "Left"
-                else:
-                    # Fallback to positional method if handedness not available
-                    h, w, c = frame.shape
-                    landmarks = getattr(hand_landmarks, 'landmark', [])
-                    if landmarks and len(landmarks) > 0:
-                        wrist_x = landmarks[0].x * w
-                        
-                        # Left side of screen is right hand (due to flip), right side is left hand
-                        if wrist_x < w/2:
-                            color = (0, 255, 0)  # Green for right hand
-                            hand_side = "Right"
-                        else:
-                            color = (255, 0, 0)  # Blue for left hand
-                            hand_side = "Left"
-                
-                # Draw raw landmarks instead of smoothed ones
-                h, w, c = frame.shape  # Initialize h,w,c before use
-                landmarks = getattr(hand_landmarks, 'landmark', [])
-                if landmarks:
-                    for lm_idx, lm in enumerate(landmarks):
-                        cx, cy = int(lm.x * w), int(lm.y * h)
-                        cv2.circle(frame, (cx, cy), 4, color, cv2.FILLED)
-                        
-                        # Draw connections between landmarks
-                        hand_connections = getattr(mp_hands, 'HAND_CONNECTIONS', [])
-                        if hand_connections:
-                            for connection in hand_connections:
-                                start_idx, end_idx = connection
-                                if start_idx < len(landmarks) and end_idx < len(landmarks):
-                                    start_lm = landmarks[start_idx]
-                                    end_lm = landmarks[end_idx]
-                                    start_x, start_y = int(start_lm.x * w), int(start_lm.y * h)
-                                    end_x, end_y = int(end_lm.x * w), int(end_lm.y * h)
-                                    cv2.line(frame, (start_x, start_y), (end_x, end_y), color, 2)
-                    
-                    # Label the hand with background for better visibility
-                    if len(landmarks) > 0:
-                        cx, cy = int(landmarks[0].x * w), int(landmarks[0].y * h)
-                        draw_text_with_background(frame, hand_side, (cx, cy-20), 
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, (0, 0, 0))
-
-        # Draw pose landmarks for arm tracking visualization
-        if pose_results:
-            pose_landmarks = getattr(pose_results, 'pose_landmarks', None)
-            if pose_landmarks:
-                # Draw only the key upper body landmarks we're tracking
-                h, w, c = frame.shape  # Initialize h,w,c before use
-                landmarks = getattr(pose_landmarks, 'landmark', [])
-                if landmarks:
-                    for i, lm in enumerate(landmarks):
-                        if i in ARM_LANDMARKS:  # Our key landmarks
-                            cx, cy = int(lm.x * w), int(lm.y * h)
-                            # Different colors for different body parts
-                            if i in [13, 14]:  # Elbows
-                                color = (0, 255, 255)  # Yellow
-                            elif i in [15, 16]:  # Wrists
-                                color = (255, 0, 255)  # Magenta
-                            else:
-                                color = (128, 128, 128)  # Default gray
-                            cv2.circle(frame, (cx, cy), 6, color, cv2.FILLED)
+        # Draw hand skeletons (coloured by handedness) and the tracked arm landmarks
+        draw_hand_landmarks(frame, hand_results)
+        draw_arm_landmarks(frame, pose_results)
 
         # Collect data when recording
         if recording:
@@ -439,52 +349,95 @@ try:
                     
                 # Add combined gesture label
                 frame_data.append(COMBINED_GESTURE_NAME)
-                all_data.append(frame_data)
+                writer.add_row(frame_data)
 
 
                 count += 1
                 # Recording indicator (without red overlay)
-                draw_text_with_background(frame, "RECORDING", (10, 50),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3, (0, 0, 0))
+                overlay.discard("gesture", "samples", "guide", "footer", "prompt")
+                overlay.set_text("recording", "RECORDING", (10, 50),
+                                 cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3, (0, 0, 0))
                 cv2.putText(frame, f"{count}/{SAMPLES}", (10, 100),
                             cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3)
-                cv2.putText(frame, f"Gesture: {gesture_label}", (10, 150),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                overlay.set_text("recording_gesture", f"Gesture: {gesture_label}", (10, 150),
+                                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2, None)
 
                 if count >= SAMPLES:
                     recording = False
+                    writer.finish_recording()
+                    completed_takes[gesture_label] = completed_takes.get(gesture_label, 0) + 1
                     log_info(f"Successfully collected {SAMPLES} samples for gesture: '{gesture_label}'")
                     print(f"✅ Collected {SAMPLES} samples for gesture: '{gesture_label}'")
-                    print("💡 Remember to retrain the model to recognize this new gesture!")
-                    break
+                    
+                    # Move on to the next take, keeping the camera and detectors open
+                    take_index += 1
+                    if take_index >= len(plan):
+                        break
+                    gesture_label, repetition = plan[take_index]
+                    COMBINED_GESTURE_NAME = gesture_label
+                    count = 0
+                    print(f"➡️ Next: '{gesture_label}' take {repetition} ({take_index + 1}/{len(plan)})")
+                    if args.auto_start:
+                        countdown_active = True
+                        countdown_start_time = time.time()
             except Exception as e:
                 log_error(f"Error during data collection: {str(e)}")
                 print(f"❌ Error during data collection: {str(e)}")
         else:
             # Display instructions
-            draw_text_with_background(frame, f"Gesture: {COMBINED_GESTURE_NAME} (both hands)", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            draw_text_with_background(frame, f"Samples: {count}/{SAMPLES}", (10, 60),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            overlay.discard("recording", "recording_gesture")
+            gesture_text = f"Gesture: {COMBINED_GESTURE_NAME} (both hands)"
+            if len(plan) > 1:
+                gesture_text += f" - take {take_index + 1}/{len(plan)}"
+            overlay.set_text("gesture", gesture_text, (10, 30),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            overlay.set_text("samples", f"Samples: {count}/{SAMPLES}", (10, 60),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             
             # Add positioning guide
             h, w = frame.shape[:2]
             center_x = w // 2
             # Draw vertical center line to help with hand positioning
-            cv2.line(frame, (center_x, 0), (center_x, h), (128, 128, 128), 1)
-            draw_text_with_background(frame, "Keep left hand on right side, right hand on left side", (10, h-20),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, (0, 0, 0))
+            overlay.set_line("guide", (center_x, 0), (center_x, h), (128, 128, 128), 1)
+            overlay.set_text("footer", "Keep left hand on right side, right hand on left side", (10, h-20),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, (0, 0, 0))
             
             if not recording and not countdown_active:
-                draw_text_with_background(frame, "Press 's' to START recording", (10, 90),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                overlay.set_text("prompt", "Press 's' to START recording", (10, 90),
+                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
             elif countdown_active:
                 # Countdown display is handled above
-                pass
+                overlay.discard("prompt")
             else:
-                draw_text_with_background(frame, "Recording... Keep hands steady!", (10, 90),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-
+                overlay.set_text("prompt", "Recording... Keep hands steady!", (10, 90),
+                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+        # Show write errors while recording rather than after the session
+        for error in writer.poll_errors():
+            print(f"❌ Error saving data: {error}")
+        if writer.failing:
+            overlay.set_text("write_error", "Error saving data - rows are kept and retried",
+                             (10, frame.shape[0] - 45), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2, (0, 0, 0))
+        else:
+            overlay.discard("write_error")
+
+        overlay.render(frame)
+        
+        # Hold the frame budget by adjusting detector quality. Every frame is
+        # timed, but a new level is only applied while idle, so all frames of
+        # a take are collected with the same detector settings
+        quality_changed = quality.record((time.perf_counter() - frame_start) * 1000) or quality_changed
+        if quality_changed and not recording and not countdown_active:
+            quality_changed = False
+            level = quality.level
+            if level.model_complexity != hands_complexity:
+                hands.close()
+                pose.close()
+                hands, pose = create_detectors(level.model_complexity)
+                hands_complexity = level.model_complexity
+            roi.max_side = min(filter(None, [base_max_side, level.max_side]))
+            frame_skip = level.frame_skip
+        
         cv2.imshow("HandTalk Enhanced - Bimanual Data Collector", frame)
         key = cv2.waitKey(1) & 0xFF
 
@@ -493,6 +446,14 @@ try:
             print("Starting recording in 5 seconds...")
             countdown_active = True
             countdown_start_time = time.time()
+        elif key == ord('n') and not recording and not countdown_active:  # skip this take
+            take_index += 1
+            if take_index >= len(plan):
+                break
+            gesture_label, repetition = plan[take_index]
+            COMBINED_GESTURE_NAME = gesture_label
+            count = 0
+            print(f"⏭️ Skipped to '{gesture_label}' take {repetition} ({take_index + 1}/{len(plan)})")
         elif key == ord('q'):  # quit
             break
 
@@ -500,59 +461,42 @@ except Exception as e:
     log_error(f"Critical error in main loop: {str(e)}")
     print(f"❌ Critical error: {str(e)}")
 
-cap.release()
+if roi.enabled:
+    print(f"ROI mode processed {roi.pixel_ratio():.0%} of full-frame pixels "
+          f"({roi.full_frame_passes}/{roi.frames} full-frame passes, {roi.retry_passes} after a lost track, "
+          f"{roi.graph_resets} graph resets)")
+
+frames.close()
 cv2.destroyAllWindows()
 
 # --- SAVE DATA ---
-if all_data:
+# Wait for the writer to flush the last rows and finalize the sequence file
+rows_written = writer.close()
+for error in writer.poll_errors():
+    print(f"❌ Error saving data: {error}")
+if rows_written:
+    log_info(f"Saved enhanced bimanual data to {SAVE_PATH}")
+    print(f"💾 Saved enhanced bimanual data to {SAVE_PATH}")
+    print(f"📊 Collected data for {rows_written} frames")
+    for json_filename in writer.sequences:
+        print(f"🎬 Saved motion sequence as JSON: {json_filename}")
+    if len(plan) > 1:
+        print(f"📋 Session: {sum(completed_takes.values())}/{len(plan)} takes recorded")
+        for label in dict.fromkeys(session_labels):
+            print(f"   {label}: {completed_takes.get(label, 0)} take(s)")
+    
+if rows_written and args.no_train:
+    print("💡 Remember to retrain the model to recognize the new gestures!")
+elif rows_written:
+    # Automatically train the model once, after the whole session
+    print("\n🤖 Automatically training the model with new data...")
     try:
-        df = pd.DataFrame(all_data)
-        os.makedirs("data", exist_ok=True)
-        
-        # Create header for enhanced data
-        header = []
-        
-        # Hand landmarks (both hands)
-        for hand in range(2):  # Two hands
-            for i in range(21):  # 21 landmarks per hand
-                header += [f"hand{hand}_x{i}", f"hand{hand}_y{i}", f"hand{hand}_z{i}"]
-        
-        # Pose landmarks (hands and arms only)
-        pose_parts = ["left_elbow", "right_elbow", "left_wrist", "right_wrist"]  # Removed shoulders
-        for part in pose_parts:
-            header += [f"{part}_x", f"{part}_y", f"{part}_z"]  # Fixed: Added missing _y
-        
-        # Combined label
-        header.append("label")
-        
-
-        if not os.path.exists(SAVE_PATH):
-            df.to_csv(SAVE_PATH, index=False, header=header)
-        else:
-            df.to_csv(SAVE_PATH, mode='a', index=False, header=False)
-        
-        log_info(f"Saved enhanced bimanual data to {SAVE_PATH}")
-        print(f"💾 Saved enhanced bimanual data to {SAVE_PATH}")
-        print(f"📊 Collected data for {len(all_data)} frames with {len(header)} features each")
-        
-        # Save motion sequence as JSON
-        json_filename = save_motion_sequence(COMBINED_GESTURE_NAME, all_data)
-        if json_filename:
-            print(f"🎬 Saved motion sequence as JSON: {json_filename}")
-        
-        # Automatically train the model after data collection
-        print("\n🤖 Automatically training the model with new data...")
-        try:
-            train_model_automatically()
-            print("✅ Model trained and saved successfully!")
-        except Exception as e:
-            log_error(f"Error during automatic model training: {str(e)}")
-            print(f"❌ Error during automatic model training: {str(e)}")
-            print("⚠️  You may need to manually train the model using the batch file option.")
-        
+        train_model_automatically(args.features)
+        print("✅ Model trained and saved successfully!")
     except Exception as e:
-        log_error(f"Error saving data: {str(e)}")
-        print(f"❌ Error saving data: {str(e)}")
+        log_error(f"Error during automatic model training: {str(e)}")
+        print(f"❌ Error during automatic model training: {str(e)}")
+        print("⚠️  You may need to manually train the model using the batch file option.")
 else:
     log_info("No data collected to save")  # Changed from warning to info
     print("⚠️ No data collected to save")
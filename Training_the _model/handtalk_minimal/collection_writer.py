@@ -0,0 +1,305 @@
+"""
+Background, crash-safe writer for the bimanual data collector
+
+The collector used to keep every recorded frame in memory and write the CSV
+and the motion sequence JSON after the camera loop ended, so a crash lost
+the whole session. CollectionWriter takes rows from the UI loop through a
+queue and a writer thread:
+
+    - appends them to data/gestures_bimanual.csv in batches (every
+      flush_rows rows or flush_interval seconds, flushed and fsynced)
+    - journals each recording to <sequence>.json.partial, one JSON row per
+      line, as it goes
+    - on finish_recording, writes the sequence JSON to a temporary file and
+      renames it into place, then removes the journal
+
+add_row never touches the disk. A batch that fails to write stays queued
+and is retried on the next flush; poll_errors hands the failure to the UI
+right away. Journals left behind by a crash are turned
+into sequence files (marked "recovered") the next time a writer starts, and
+a torn last CSV line is cut off before appending.
+"""
+
+import csv
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from recognition_core import feature_names
+
+PARTIAL_SUFFIX = ".partial"
+# Write attempts, flush_interval apart, for rows still held back when the writer closes
+CLOSE_RETRIES = 5
+
+logger = logging.getLogger("HandTalk")
+
+
+def sequence_header():
+    """Feature names of a sequence frame / CSV row, including the label"""
+    return feature_names() + ["label"]
+
+
+def next_sequence_path(gesture_name, timestamp, sequence_dir="data/arm_hand_sequences"):
+    """Sequence file name, numbered after today's existing recordings of the gesture"""
+    sequence_number = 1
+    pattern = os.path.join(sequence_dir, f"gesture_{gesture_name}_seq_*_{timestamp[:8]}*.json*")
+    seq_numbers = []
+    for file in glob.glob(pattern):
+        try:
+            seq_numbers.append(int(os.path.basename(file).split('_')[3]))
+        except (IndexError, ValueError):
+            pass
+    if seq_numbers:
+        sequence_number = max(seq_numbers) + 1
+    path = os.path.join(sequence_dir, f"gesture_{gesture_name}_seq_{sequence_number:03d}_{timestamp}.json")
+    return path, sequence_number
+
+
+def write_sequence(path, gesture_name, timestamp, sequence_number, frames, recovered=False):
+    """Atomically write a motion sequence JSON file"""
+    motion_json = {
+        "metadata": {
+            "gesture_name": gesture_name,
+            "timestamp": timestamp,
+            "sequence_number": sequence_number,
+            "frame_count": len(frames),
+            "features_per_frame": len(frames[0]) if frames else 0
+        },
+        "frames": frames,
+        "feature_names": sequence_header()
+    }
+    if recovered:
+        motion_json["metadata"]["recovered"] = True
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(motion_json, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def recover_sequences(sequence_dir="data/arm_hand_sequences"):
+    """Finalize sequence journals left behind by an interrupted session"""
+    recovered = []
+    for journal in sorted(glob.glob(os.path.join(sequence_dir, "*.json" + PARTIAL_SUFFIX))):
+        path = journal[:-len(PARTIAL_SUFFIX)]
+        try:
+            with open(journal) as f:
+                header = json.loads(f.readline())
+                frames = []
+                for line in f:
+                    try:
+                        frames.append(json.loads(line))
+                    except ValueError:
+                        break  # Torn last line
+            if frames:
+                write_sequence(path, header["gesture_name"], header["timestamp"], header["sequence_number"],
+                               frames, recovered=True)
+                recovered.append(path)
+            os.remove(journal)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not recover motion sequence {journal}: {str(e)}")
+    return recovered
+
+
+def repair_csv_tail(csv_path):
+    """Cut off a partially written last line so appended rows start on a fresh line"""
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return False
+    with open(csv_path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return False
+        size = f.seek(0, os.SEEK_END)
+        # Find the start of the torn line
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                position = position - step + newline + 1
+                break
+            position -= step
+        f.truncate(position)
+    return True
+
+
+class CollectionWriter:
+    """
+    Append collected rows to the gesture CSV and sequence files from a background thread
+
+    Args:
+        csv_path: Gesture CSV to append to (created with a header if missing)
+        sequence_dir: Directory for motion sequence JSON files
+        flush_rows: Write a batch once this many rows are waiting
+        flush_interval: Longest time in seconds a row waits before being written
+    """
+
+    def __init__(self, csv_path="data/gestures_bimanual.csv", sequence_dir="data/arm_hand_sequences",
+                 flush_rows=10, flush_interval=0.5):
+        self.csv_path = csv_path
+        self.sequence_dir = sequence_dir
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.sequences = []
+        self.errors = []
+        self.rows_lost = 0
+        # True while collected rows are held back by a write error
+        self.failing = False
+        self.recovered = recover_sequences(sequence_dir) if os.path.isdir(sequence_dir) else []
+        for path in self.recovered:
+            logger.info(f"Recovered interrupted motion sequence {path}")
+        if repair_csv_tail(csv_path):
+            logger.warning(f"Removed a partially written last row from {csv_path}")
+        self._queue = queue.Queue()
+        self._new_errors = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="collection-writer", daemon=True)
+        self._thread.start()
+
+    def start_recording(self, gesture_name):
+        """Begin a new motion sequence for the rows that follow"""
+        self._queue.put(("start", gesture_name))
+
+    def add_row(self, row):
+        """Queue one frame (138 features and the label); never blocks on disk"""
+        self._queue.put(("row", list(row)))
+
+    def finish_recording(self):
+        """Flush the current recording and finalize its sequence file"""
+        self._queue.put(("finish", None))
+
+    def close(self):
+        """Write everything still queued (retrying held-back rows) and stop the writer thread"""
+        self._queue.put(("close", None))
+        self._thread.join()
+        return self.rows_written
+
+    def poll_errors(self):
+        """Write errors since the last call, for the UI to show while the session goes on"""
+        errors = []
+        while True:
+            try:
+                errors.append(self._new_errors.get_nowait())
+            except queue.Empty:
+                return errors
+
+    def _report(self, message):
+        self.errors.append(message)
+        self._new_errors.put(message)
+        logger.error(f"Error writing collected data: {message}")
+
+    def _run(self):
+        pending = []
+        sequence = None  # (path, gesture name, timestamp, number, frames, journal file)
+        while True:
+            try:
+                command, payload = self._queue.get(timeout=self.flush_interval if pending else None)
+            except queue.Empty:
+                command, payload = "flush", None
+
+            # Rows stay pending until they are on disk, so a failed batch is retried on the next flush
+            try:
+                if command == "row":
+                    pending.append(payload)
+                    if sequence:
+                        sequence[4].append(payload)
+                        sequence[5].write(json.dumps(payload) + "\n")
+                    if len(pending) < self.flush_rows:
+                        continue
+                if pending:
+                    self._write_rows(pending, sequence)
+                    if self.failing:
+                        logger.info(f"Wrote {len(pending)} collected rows held back by a write error")
+                    pending = []
+                    self.failing = False
+            except Exception as e:
+                # Report once per run of failures; the session goes on
+                if not self.failing:
+                    self.failing = True
+                    self._report(str(e))
+
+            if command in ("start", "finish", "close") and sequence:
+                try:
+                    self._finalize(sequence)
+                except Exception as e:
+                    # The journal stays behind and is recovered when the next writer starts
+                    self._report(f"Could not save motion sequence {sequence[0]}: {str(e)}")
+                finally:
+                    sequence[5].close()
+                    sequence = None
+            if command == "start":
+                try:
+                    sequence = self._open_sequence(payload)
+                except Exception as e:
+                    self._report(f"Could not start a motion sequence: {str(e)}")
+            elif command == "close":
+                for _ in range(CLOSE_RETRIES):
+                    if not pending:
+                        break
+                    time.sleep(self.flush_interval)
+                    try:
+                        self._write_rows(pending, None)
+                        pending = []
+                        self.failing = False
+                    except Exception:
+                        pass
+                if pending:
+                    self.rows_lost = len(pending)
+                    self._report(f"{len(pending)} collected rows could not be written to {self.csv_path}")
+                return
+
+    def _open_sequence(self, gesture_name):
+        os.makedirs(self.sequence_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path, number = next_sequence_path(gesture_name, timestamp, self.sequence_dir)
+        journal = open(path + PARTIAL_SUFFIX, 'w')
+        try:
+            journal.write(json.dumps({"gesture_name": gesture_name, "timestamp": timestamp,
+                                      "sequence_number": number}) + "\n")
+        except Exception:
+            journal.close()
+            raise
+        return (path, gesture_name, timestamp, number, [], journal)
+
+    def _write_rows(self, rows, sequence):
+        if not rows:
+            return
+        if sequence:
+            sequence[5].flush()
+            os.fsync(sequence[5].fileno())
+        directory = os.path.dirname(self.csv_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        size = os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+        try:
+            with open(self.csv_path, 'a', newline='') as f:
+                writer = csv.writer(f)
+                if size == 0:
+                    writer.writerow(sequence_header())
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            # Cut off a partly written batch so the retry doesn't duplicate rows
+            if os.path.exists(self.csv_path):
+                with open(self.csv_path, 'rb+') as f:
+                    f.truncate(size)
+            raise
+        self.rows_written += len(rows)
+
+    def _finalize(self, sequence):
+        path, gesture_name, timestamp, number, frames, journal = sequence
+        journal.close()
+        if frames:
+            write_sequence(path, gesture_name, timestamp, number, frames)
+            self.sequences.append(path)
+            logger.info(f"Saved motion sequence to {path}")
+        os.remove(path + PARTIAL_SUFFIX)
@@ -1,5 +1,29 @@
 """
 Script to convert the trained scikit-learn model to TensorFlow Lite format
+
+--quantize float16 stores the weights as float16; --quantize int8 quantizes
+weights and activations to int8, calibrated on a representative dataset of
+rows from data/gestures_bimanual.csv (the model keeps float32 inputs and
+outputs, so the app code does not change). Every run prints a report of
+model size, CPU interpreter latency and accuracy for the float model, the
+quantized model and the scikit-learn pickle.
+
+Labels are sorted, so labels.txt lists them in the same order on every run.
+Training streams a cached, prefetched tf.data pipeline and stops early once
+the loss on a validation split of the training data stops improving; the
+test split is only used for the final evaluation. Before any model file is
+written, each converted model is run on the test split and compared with
+Keras; the export fails if the outputs diverge.
+
+--distill trains the network on the soft predict_proba outputs of the
+scikit-learn forest (over the real training rows plus augmented copies)
+instead of the hard labels, so the app behaves like the desktop recognizer,
+and reports how often the two agree and how much faster the network is.
+
+The app feeds the model raw features, so only raw-feature models are written
+to gesture_model.tflite. With --features invariant, or when distilling a
+forest trained on invariant features, the model is written to
+gesture_model_invariant.tflite instead.
 """
 import pandas as pd
 import numpy as np
@@ -8,6 +32,23 @@ import tensorflow as tf
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 import os
+import argparse
+import json
+import sys
+import time
+
+from augmentation import add_augmentation_arguments, augment_dataset
+from feature_transform import add_transform_arguments, invariant_features, model_transform
+
+QUANTIZE_MODES = ["none", "float16", "int8"]
+# The app feeds gesture_model.tflite raw 138-feature rows, so a model trained
+# on another transform is written under its own name instead
+OUTPUT_NAMES = {
+    "raw": ("gesture_model.tflite", "gesture_model_tf.h5"),
+    "invariant": ("gesture_model_invariant.tflite", "gesture_model_invariant_tf.h5"),
+}
+# Augmented copies per training row when distilling without --augment
+DISTILL_AUGMENT = 20
 
 def load_data(csv_path="data/gestures_bimanual.csv"):
     """Load and prepare the bimanual gesture data"""
@@ -22,8 +63,8 @@ def load_data(csv_path="data/gestures_bimanual.csv"):
         X = df.drop('label', axis=1).values
         y = df['label'].values
         
-        # Get unique labels
-        labels = list(set(y))
+        # Sorted so the label indices (and labels.txt) are the same on every run
+        labels = sorted(set(y))
         print(f"Labels: {labels}")
         
         return X, y, labels
@@ -31,10 +72,191 @@ def load_data(csv_path="data/gestures_bimanual.csv"):
         print(f"Error loading data: {str(e)}")
         raise
 
-def train_tensorflow_model():
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Train a TensorFlow model and convert it to TensorFlow Lite")
+    add_augmentation_arguments(parser)
+    add_transform_arguments(parser)
+    parser.add_argument("--quantize", choices=QUANTIZE_MODES, default="none",
+                        help="Post-training quantization of gesture_model.tflite (default: none, float32)")
+    parser.add_argument("--representative-samples", type=int, default=200,
+                        help="CSV rows used to calibrate int8 quantization")
+    parser.add_argument("--report", help="Also write the size/latency/accuracy report to this JSON file")
+    parser.add_argument("--epochs", type=int, default=200, help="Most training epochs (early stopping usually ends sooner)")
+    parser.add_argument("--patience", type=int, default=10, help="Epochs without validation improvement before stopping")
+    parser.add_argument("--batch-size", type=int, default=32, help="Training batch size")
+    parser.add_argument("--atol", type=float, default=1e-4,
+                        help="Largest allowed difference between float32 TFLite and Keras outputs")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Smallest allowed top-1 agreement between a quantized model and Keras")
+    parser.add_argument("--distill", action="store_true",
+                        help="Train on the scikit-learn forest's probabilities instead of the labels")
+    parser.add_argument("--teacher", default="sign_language_model_bimanual.pkl",
+                        help="Forest to distill (default: sign_language_model_bimanual.pkl)")
+    parser.add_argument("--validation-size", type=float, default=0.2,
+                        help="Fraction of the training split held out for early stopping")
+    return parser.parse_args()
+
+def make_dataset(X, y, batch_size=32, shuffle=False, seed=42):
+    """Cached, batched and prefetched tf.data pipeline over in-memory arrays"""
+    dataset = tf.data.Dataset.from_tensor_slices((np.asarray(X, dtype=np.float32), y)).cache()
+    if shuffle:
+        dataset = dataset.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def build_model(input_size, num_classes):
+    """The small MLP shipped to the app"""
+    return tf.keras.Sequential([
+        tf.keras.layers.Dense(128, activation='relu', input_shape=(input_size,)),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+
+def fit_model(model, train_dataset, validation_dataset, epochs=200, patience=10):
+    """Train until the validation loss stops improving, keeping the best weights"""
+    early_stopping = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience,
+                                                      restore_best_weights=True)
+    history = model.fit(train_dataset, epochs=epochs, validation_data=validation_dataset,
+                        callbacks=[early_stopping], verbose=2)
+    print(f"Trained for {len(history.epoch)} epochs")
+    return history
+
+class ConversionMismatchError(RuntimeError):
+    """A converted TFLite model does not reproduce the Keras model"""
+
+def verify_conversion(keras_model, tflite_model, X_test, name, atol=1e-4, min_agreement=0.95, quantized=False):
+    """
+    Run the TFLite model on the test split and compare it with Keras
+
+    Float models must match within atol; quantized models must agree on the
+    top-1 label for at least min_agreement of the rows.
+    """
+    expected = keras_model.predict(np.asarray(X_test, dtype=np.float32), verbose=0)
+    actual, _ = run_tflite(tflite_model, X_test)
+    max_difference = float(np.max(np.abs(actual - expected)))
+    agreement = float(np.mean(np.argmax(actual, axis=1) == np.argmax(expected, axis=1)))
+    print(f"Check {name}: max output difference {max_difference:.2e}, top-1 agreement {agreement:.1%}")
+
+    if quantized and agreement < min_agreement:
+        raise ConversionMismatchError(f"{name} agrees with Keras on only {agreement:.1%} of the test split "
+                                      f"(minimum {min_agreement:.1%})")
+    if not quantized and (max_difference > atol or agreement < 1.0):
+        raise ConversionMismatchError(f"{name} outputs differ from Keras by up to {max_difference:.2e} "
+                                      f"(tolerance {atol:.0e})")
+    return max_difference, agreement
+
+def representative_dataset(X, samples=200, seed=42):
+    """Generator of single float32 rows for calibrating int8 quantization"""
+    rng = np.random.default_rng(seed)
+    rows = X[rng.permutation(len(X))[:samples]].astype(np.float32)
+    def generate():
+        for row in rows:
+            yield [row.reshape(1, -1)]
+    return generate
+
+def convert_model(model, quantize="none", representative_rows=None, samples=200):
+    """Convert a Keras model to a TFLite flatbuffer with optional post-training quantization"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(representative_rows, samples)
+        # Integer kernels only; inputs and outputs stay float32 for the app
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+def run_tflite(tflite_model, X):
+    """Run a TFLite model one row at a time, as the app does; returns (probabilities, latencies_ns)"""
+    interpreter = tf.lite.Interpreter(model_content=tflite_model, num_threads=1)
+    interpreter.allocate_tensors()
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[0]
+    input_scale, input_zero = input_detail["quantization"]
+    output_scale, output_zero = output_detail["quantization"]
+
+    outputs, latencies = [], []
+    for row in np.asarray(X, dtype=np.float32):
+        row = row.reshape(1, -1)
+        if input_detail["dtype"] != np.float32:
+            row = np.round(row / input_scale + input_zero).astype(input_detail["dtype"])
+        start = time.perf_counter_ns()
+        interpreter.set_tensor(input_detail["index"], row)
+        interpreter.invoke()
+        output = interpreter.get_tensor(output_detail["index"])
+        latencies.append(time.perf_counter_ns() - start)
+        if output_detail["dtype"] != np.float32:
+            output = (output.astype(np.float32) - output_zero) * output_scale
+        outputs.append(output[0])
+    return np.array(outputs), latencies
+
+def _latency_summary(name, size_bytes, accuracy, latencies_ns):
+    ms = np.array(latencies_ns, dtype=np.float64) / 1e6
+    return {"model": name, "size_kb": round(size_bytes / 1024, 1), "accuracy": round(float(accuracy), 4),
+            "p50_ms": round(float(np.percentile(ms, 50)), 4), "p95_ms": round(float(np.percentile(ms, 95)), 4)}
+
+def compare_models(variants, X_test, y_test, raw_test, labels, sklearn_path="sign_language_model_bimanual.pkl"):
+    """
+    Size, single-row CPU latency and test accuracy of each TFLite variant and the sklearn pickle
+
+    Args:
+        variants: {name: tflite flatbuffer}
+        X_test, y_test: Model inputs and label indices of the test split
+        raw_test: The same rows as raw 138 features, for the sklearn pickle
+    """
+    report = []
+    for name, tflite_model in variants.items():
+        probabilities, latencies = run_tflite(tflite_model, X_test)
+        accuracy = np.mean(np.argmax(probabilities, axis=1) == y_test)
+        report.append(_latency_summary(name, len(tflite_model), accuracy, latencies))
+
+    if os.path.exists(sklearn_path):
+        forest = joblib.load(sklearn_path)
+        expected = np.array(labels)[y_test]
+        latencies = []
+        for row in raw_test:
+            start = time.perf_counter_ns()
+            forest.predict_proba(row.reshape(1, -1))
+            latencies.append(time.perf_counter_ns() - start)
+        accuracy = np.mean(forest.predict(raw_test) == expected)
+        report.append(_latency_summary(f"sklearn ({sklearn_path})", os.path.getsize(sklearn_path),
+                                       accuracy, latencies))
+
+    print(f"\n{'Model':40s} {'Size':>10s} {'Accuracy':>9s} {'p50':>9s} {'p95':>9s}")
+    for row in report:
+        print(f"{row['model']:40s} {row['size_kb']:7.1f} KB {row['accuracy']:9.3f} "
+              f"{row['p50_ms']:6.3f} ms {row['p95_ms']:6.3f} ms")
+    return report
+
+def distillation_report(teacher, tflite_model, raw_rows, student_rows, report, name="augmented test split"):
+    """Top-1 agreement of the distilled TFLite model with the forest, and its latency win"""
+    teacher_labels = np.argmax(teacher.predict_proba(raw_rows), axis=1)
+    student_probabilities, _ = run_tflite(tflite_model, student_rows)
+    agreement = float(np.mean(np.argmax(student_probabilities, axis=1) == teacher_labels))
+    print(f"Distilled model agrees with the forest on {agreement:.1%} of the {name} ({len(raw_rows)} samples)")
+
+    result = {"agreement": round(agreement, 4), "samples": len(raw_rows)}
+    student = next(row for row in reversed(report) if row["model"].startswith("tflite"))
+    forest = next((row for row in report if row["model"].startswith("sklearn")), None)
+    if forest and student["p50_ms"] > 0:
+        result["speedup"] = round(forest["p50_ms"] / student["p50_ms"], 1)
+        print(f"Median single-row latency: {student['p50_ms']:.3f} ms vs {forest['p50_ms']:.3f} ms "
+              f"for the forest ({result['speedup']}x faster)")
+    return result
+
+def train_tensorflow_model(augment=0, augment_workers=0, mirror=True, seed=42, transform="raw",
+                           quantize="none", representative_samples=200, report_path=None,
+                           epochs=200, patience=10, batch_size=32, atol=1e-4, min_agreement=0.95,
+                           distill=False, teacher_path="sign_language_model_bimanual.pkl", validation_size=0.2):
     """Train a TensorFlow model equivalent to the scikit-learn model"""
     print("=== Converting to TensorFlow Lite ===")
     
+    # Seed Python, NumPy and TensorFlow so runs are repeatable
+    tf.keras.utils.set_random_seed(seed)
+    
     # Load data
     X, y, labels = load_data()
     
@@ -42,44 +264,97 @@ def train_tensorflow_model():
     label_to_index = {label: idx for idx, label in enumerate(labels)}
     y_indices = np.array([label_to_index[label] for label in y])
     
+    if distill:
+        teacher = joblib.load(teacher_path)
+        if [str(c) for c in teacher.classes_] != [str(label) for label in labels]:
+            raise ValueError(f"{teacher_path} was trained on different labels than the CSV; retrain it first")
+        # The student sees the same features as its teacher
+        transform = model_transform(teacher)
+        augment = augment or DISTILL_AUGMENT
+        print(f"Distilling {teacher_path} ({transform} features)")
+    
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X, y_indices, test_size=0.2, random_state=42)
+    raw_test = X_test
+    # Calibration rows come from the real CSV rows, not the augmented ones
+    representative_rows = X_train
+    # Early stopping watches a validation split of the training data, so the
+    # test split plays no part in choosing the weights it evaluates
+    X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=validation_size,
+                                                      random_state=seed)
+    
+    # Augment the training split only, so validation stays real data
+    if augment:
+        X_train, y_train = augment_dataset(X_train, y_train, copies=augment, seed=seed,
+                                           workers=augment_workers, mirror_prob=0.5 if mirror else 0.0)
+        print(f"Augmented training data: {len(X_train)} samples ({augment} copies per sample)")
+    
+    if distill:
+        # Soft targets: the forest's class probabilities for every (augmented) row
+        train_targets = teacher.predict_proba(X_train)
+        val_targets = teacher.predict_proba(X_val)
+        test_targets = teacher.predict_proba(X_test)
+        raw_check, _ = augment_dataset(raw_test, y_test, copies=DISTILL_AUGMENT, seed=seed + 1,
+                                       workers=augment_workers, mirror_prob=0.5 if mirror else 0.0)
+        X_check = invariant_features(raw_check) if transform == "invariant" else raw_check
+    
+    # The TFLite model can't carry the transform; see OUTPUT_NAMES
+    if transform == "invariant":
+        X_train, X_val, X_test = invariant_features(X_train), invariant_features(X_val), invariant_features(X_test)
+        representative_rows = invariant_features(representative_rows)
+        print(f"Using invariant features: {X_train.shape[1]} inputs")
     
     # Create a simple neural network model
-    model = tf.keras.Sequential([
-        tf.keras.layers.Dense(128, activation='relu', input_shape=(X.shape[1],)),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.Dense(64, activation='relu'),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.Dense(len(labels), activation='softmax')
-    ])
+    model = build_model(X_train.shape[1], len(labels))
     
     model.compile(
         optimizer='adam',
-        loss='sparse_categorical_crossentropy',
+        # Cross-entropy against the forest's probabilities when distilling
+        loss='categorical_crossentropy' if distill else 'sparse_categorical_crossentropy',
         metrics=['accuracy']
     )
     
     # Train the model
     print("Training TensorFlow model...")
-    model.fit(X_train, y_train, epochs=50, validation_data=(X_test, y_test), verbose=1)
+    train_dataset = make_dataset(X_train, train_targets if distill else y_train, batch_size, shuffle=True, seed=seed)
+    val_dataset = make_dataset(X_val, val_targets if distill else y_val, batch_size)
+    test_dataset = make_dataset(X_test, test_targets if distill else y_test, batch_size)
+    fit_model(model, train_dataset, val_dataset, epochs, patience)
     
-    # Evaluate the model
-    loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
-    print(f"TensorFlow model accuracy: {accuracy:.2f}")
-    
-    # Save the model
-    model.save("gesture_model_tf.h5")
-    print("TensorFlow model saved as gesture_model_tf.h5")
+    # Evaluate the model on the held-out test split
+    loss, accuracy = model.evaluate(test_dataset, verbose=0)
+    print(f"TensorFlow model test {'agreement with the forest' if distill else 'accuracy'}: {accuracy:.2f}")
     
     # Convert to TensorFlow Lite
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    tflite_model = converter.convert()
+    variants = {"tflite float32": convert_model(model)}
+    if quantize != "none":
+        print(f"Quantizing to {quantize}...")
+        variants[f"tflite {quantize}"] = convert_model(model, quantize, representative_rows, representative_samples)
+    tflite_model = list(variants.values())[-1]
+    
+    # Refuse to ship a model that doesn't reproduce Keras
+    for name, variant in variants.items():
+        verify_conversion(model, variant, X_test, name, atol, min_agreement, quantized=name != "tflite float32")
     
-    with open("gesture_model.tflite", "wb") as f:
+    # Only verified models are written
+    tflite_path, keras_path = OUTPUT_NAMES[transform]
+    model.save(keras_path)
+    print(f"TensorFlow model saved as {keras_path}")
+    with open(tflite_path, "wb") as f:
         f.write(tflite_model)
     
-    print("TensorFlow Lite model saved as gesture_model.tflite")
+    print(f"TensorFlow Lite model ({quantize if quantize != 'none' else 'float32'}) saved as {tflite_path}")
+    if transform != "raw":
+        print(f"⚠️ The app reads raw features from gesture_model.tflite; {tflite_path} "
+              f"expects {transform} features and is not used by it")
+    
+    report = compare_models(variants, X_test, y_test, raw_test, labels, teacher_path)
+    if distill:
+        report.append({"distillation": distillation_report(teacher, tflite_model, raw_check, X_check, report)})
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved as {report_path}")
     
     # Save labels to a file
     with open("labels.txt", "w") as f:
@@ -91,4 +366,12 @@ def train_tensorflow_model():
     return model, labels
 
 if __name__ == "__main__":
-    train_tensorflow_model()
\ No newline at end of file
+    args = parse_args()
+    try:
+        train_tensorflow_model(args.augment, args.augment_workers, args.mirror, args.seed, args.features,
+                               args.quantize, args.representative_samples, args.report,
+                               args.epochs, args.patience, args.batch_size, args.atol, args.min_agreement,
+                               args.distill, args.teacher, args.validation_size)
+    except ConversionMismatchError as e:
+        print(f"❌ Conversion check failed, no model files were updated: {str(e)}")
+        sys.exit(1)
\ No newline at end of file
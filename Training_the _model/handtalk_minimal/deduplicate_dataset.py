@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate removal for data/gestures_bimanual.csv
+
+Consecutive frames of one recording (and repeated sessions) produce rows
+that are nearly identical. Within each label this finds them in two passes:
+
+    1. quantized hashing: rows that fall in the same --grid cell on every
+       coordinate are exact duplicates at that resolution
+    2. a KD-tree over the remaining rows: a row within --threshold RMS
+       distance (normalized image units per coordinate) of an earlier kept
+       row is a near-duplicate
+
+Rows are kept in file order, so the first frame of each run of near-identical
+frames survives and every removed row is within the threshold of a kept one.
+Without --remove it only reports; with --remove the CSV is rewritten (the
+original is kept as a .bak copy).
+
+Usage:
+    python deduplicate_dataset.py
+    python deduplicate_dataset.py --threshold 0.004 --remove
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+
+def quantized_duplicates(X, grid):
+    """Mask of rows whose quantized coordinates repeat an earlier row"""
+    keys = np.round(X / grid).astype(np.int64)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    duplicate = np.ones(len(X), dtype=bool)
+    duplicate[first] = False
+    return duplicate
+
+
+def near_duplicates(X, threshold, leaf_size=40):
+    """
+    Greedy near-duplicate mask in row order using a KD-tree
+
+    Returns:
+        (duplicate, nearest_kept): mask of removable rows and, for each of
+        them, the index of the kept row it duplicates (-1 for kept rows)
+    """
+    n = len(X)
+    duplicate = np.zeros(n, dtype=bool)
+    nearest_kept = np.full(n, -1)
+    if n < 2:
+        return duplicate, nearest_kept
+    # RMS distance per coordinate -> Euclidean radius in the full space
+    radius = threshold * np.sqrt(X.shape[1])
+    neighbors = KDTree(X, leaf_size=leaf_size).query_radius(X, r=radius)
+    for i in range(n):
+        if duplicate[i]:
+            continue
+        later = neighbors[i][neighbors[i] > i]
+        later = later[~duplicate[later]]
+        duplicate[later] = True
+        nearest_kept[later] = i
+    return duplicate, nearest_kept
+
+
+def find_duplicates(df, threshold=0.003, grid=0.001):
+    """
+    Near-duplicate rows of a gesture DataFrame, searched within each label
+
+    Returns:
+        (remove, report): boolean mask over df's rows and a per-label summary
+    """
+    remove = np.zeros(len(df), dtype=bool)
+    report = []
+    features = df.drop('label', axis=1).to_numpy(dtype=np.float64)
+    for label, positions in df.groupby('label', sort=True).indices.items():
+        X = features[positions]
+        hashed = quantized_duplicates(X, grid)
+        candidates = positions[~hashed]
+        near, _ = near_duplicates(features[candidates], threshold)
+        remove[positions[hashed]] = True
+        remove[candidates[near]] = True
+        report.append({"label": label, "rows": len(positions), "hash_duplicates": int(hashed.sum()),
+                       "near_duplicates": int(near.sum()), "kept": int(len(positions) - hashed.sum() - near.sum())})
+    return remove, report
+
+
+def coverage_distance(features, remove):
+    """Largest RMS distance from a removed row to the nearest kept row of any label"""
+    if not remove.any() or remove.all():
+        return 0.0
+    distances, _ = KDTree(features[~remove]).query(features[remove], k=1)
+    return float(distances.max() / np.sqrt(features.shape[1]))
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Find and remove near-duplicate rows in the gesture CSV")
+    parser.add_argument("--csv", default="data/gestures_bimanual.csv", help="Gesture CSV to check")
+    parser.add_argument("--threshold", type=float, default=0.003,
+                        help="RMS distance per coordinate below which rows are near-duplicates")
+    parser.add_argument("--grid", type=float, default=0.001, help="Quantization step for exact-duplicate hashing")
+    parser.add_argument("--remove", action="store_true", help="Rewrite the CSV without the duplicates")
+    parser.add_argument("--output", help="Write the deduplicated CSV here instead of over --csv")
+    return parser.parse_args()
+
+
+def main():
+    """Report near-duplicates per label and optionally remove them"""
+    args = parse_args()
+    if not os.path.exists(args.csv):
+        print(f"❌ Data file {args.csv} not found.")
+        return 1
+    df = pd.read_csv(args.csv)
+    remove, report = find_duplicates(df, args.threshold, args.grid)
+
+    print(f"{'Label':20s} {'Rows':>6s} {'Hashed':>7s} {'Near':>6s} {'Kept':>6s}")
+    for row in report:
+        print(f"{row['label']:20s} {row['rows']:6d} {row['hash_duplicates']:7d} "
+              f"{row['near_duplicates']:6d} {row['kept']:6d}")
+    features = df.drop('label', axis=1).to_numpy(dtype=np.float64)
+    print(f"\n{int(remove.sum())} of {len(df)} rows are near-duplicates ({remove.mean():.0%}); "
+          f"every removed row is within {coverage_distance(features, remove):.4f} of a kept row")
+
+    if not (args.remove or args.output):
+        print("Run with --remove to rewrite the CSV without them.")
+        return 0
+    if not remove.any():
+        return 0
+
+    output = args.output or args.csv
+    if output == args.csv:
+        shutil.copy2(args.csv, args.csv + ".bak")
+        print(f"Original kept as {args.csv}.bak")
+    temp_path = output + ".tmp"
+    df[~remove].to_csv(temp_path, index=False)
+    os.replace(temp_path, output)
+    print(f"💾 Saved {int((~remove).sum())} rows to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Feature selection for the HandTalk gesture model
+
+Ranks the (raw or invariant) features by impurity importance and by
+permutation importance on a validation split carved from the training data,
+both computed across all CPU cores, retrains the forest on the top-k
+features for several k and reports accuracy on the untouched test split
+against single-row inference latency. With --export K, the top-K model is
+saved (to sign_language_model_bimanual_selected.pkl unless --model-output
+says otherwise) with a column selection step in front of the forest (see
+feature_transform.make_model), so the recognizers keep passing the full 138
+features and the model gathers only the columns it needs. The selected
+column indices and names are written next to the model as JSON.
+
+Usage:
+    python feature_selection.py --k 8 16 32 64
+    python feature_selection.py --features invariant --export 32
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from benchmark_suite import summarize
+from feature_transform import (add_transform_arguments, invariant_features, make_model,
+                               transformed_feature_names)
+from model_bundle import save_model
+from retrain_model import load_and_prepare_data
+
+
+def rank_features(model, X_test, y_test, repeats=10, seed=42, jobs=-1):
+    """
+    Rank features by the mean of their normalized impurity and permutation importances
+
+    Returns:
+        (order, impurity, permutation): feature indices from most to least
+        important, and the two importance arrays
+    """
+    impurity = model.feature_importances_
+    permutation = permutation_importance(model, X_test, y_test, n_repeats=repeats,
+                                         random_state=seed, n_jobs=jobs).importances_mean
+    # Permutation importance can be slightly negative for useless features
+    scores = impurity / max(impurity.sum(), 1e-12)
+    clipped = np.clip(permutation, 0.0, None)
+    if clipped.sum() > 0:
+        scores = (scores + clipped / clipped.sum()) / 2
+    # Stable sort keeps ties in feature order, so the ranking is reproducible
+    order = np.argsort(-scores, kind="stable")
+    return order, impurity, permutation
+
+
+def time_single_row(model, rows, repeat=200):
+    """Latency of one-row predict_proba calls, as in the recognizers"""
+    rows = np.asarray(rows, dtype=np.float64)
+    for row in rows[:5]:
+        model.predict_proba(row.reshape(1, -1))
+    samples = []
+    clock = time.perf_counter_ns
+    for i in range(repeat):
+        row = rows[i % len(rows)].reshape(1, -1)
+        start = clock()
+        model.predict_proba(row)
+        samples.append(clock() - start)
+    return summarize(samples)
+
+
+def evaluate_subsets(X_train, X_test, y_train, y_test, raw_test, order, ks, transform, n_estimators=100):
+    """Retrain on the top-k features for each k and measure accuracy and latency"""
+    results = []
+    for k in ks:
+        indices = np.sort(order[:k])
+        forest = RandomForestClassifier(n_estimators=n_estimators, random_state=42,
+                                        class_weight='balanced', n_jobs=-1)
+        forest.fit(X_train[:, indices], y_train)
+        # n_jobs is only for training; one-row predictions are faster in-process
+        forest.set_params(n_jobs=None)
+        model = make_model(forest, transform, indices)
+        accuracy = accuracy_score(y_test, model.predict(raw_test))
+        latency = time_single_row(model, raw_test)
+        results.append({"k": int(k), "accuracy": round(float(accuracy), 4),
+                        "p50_ms": latency["p50_ms"], "p95_ms": latency["p95_ms"],
+                        "indices": indices, "model": model})
+        print(f"  k={k:4d}  accuracy {accuracy:.3f}  predict_proba p50 {latency['p50_ms']:.3f} ms, "
+              f"p95 {latency['p95_ms']:.3f} ms")
+    return results
+
+
+def export_model(result, names, transform, model_path, dataset_path=None):
+    """Save a reduced-width model (pickle and bundle) and its column index map"""
+    save_model(result["model"], model_path, {"accuracy": result["accuracy"]}, dataset_path)
+    index_map = {
+        "transform": transform,
+        "feature_count": len(names),
+        "indices": [int(i) for i in result["indices"]],
+        "names": [names[i] for i in result["indices"]],
+        "accuracy": result["accuracy"],
+    }
+    map_path = os.path.splitext(model_path)[0] + "_features.json"
+    with open(map_path, 'w') as f:
+        json.dump(index_map, f, indent=2)
+    print(f"💾 Saved {result['k']}-feature model to {model_path} "
+          f"({os.path.getsize(model_path) / 1024:.0f} KB) and column map to {map_path}")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Rank HandTalk features and train reduced-width models")
+    parser.add_argument("--csv", default="data/gestures_bimanual.csv", help="Gesture CSV to train on")
+    add_transform_arguments(parser)
+    parser.add_argument("--k", type=int, nargs="+", default=[8, 16, 32, 64],
+                        help="Feature counts to evaluate (the full width is always included)")
+    parser.add_argument("--n-estimators", type=int, default=100, help="Number of trees")
+    parser.add_argument("--repeats", type=int, default=10, help="Permutation importance repeats")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel jobs for importances (-1 = all CPUs)")
+    parser.add_argument("--top", type=int, default=15, help="Number of ranked features to print")
+    parser.add_argument("--export", type=int, metavar="K", help="Save the top-K model")
+    parser.add_argument("--model-output", default="sign_language_model_bimanual_selected.pkl",
+                        help="Where --export saves the model (kept apart from the production model by default)")
+    parser.add_argument("--validation-size", type=float, default=0.25,
+                        help="Fraction of the training split held out for ranking the features")
+    parser.add_argument("--output", help="Write the ranking and results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    """Rank features, evaluate top-k subsets and optionally export one"""
+    args = parse_args()
+    try:
+        X, y = load_and_prepare_data(args.csv)
+    except Exception:
+        return 1
+
+    raw_train, raw_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    if args.features == "invariant":
+        X_train, X_test = invariant_features(raw_train), invariant_features(raw_test)
+    else:
+        X_train, X_test = raw_train, raw_test
+    names = transformed_feature_names(args.features)
+    width = X_train.shape[1]
+
+    # Rank on a validation split of the training data, so the test split that
+    # scores the top-k subsets had no say in choosing them
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=args.validation_size,
+                                                  random_state=42)
+    print(f"Ranking {width} {args.features} features on {len(y_val)} validation samples...")
+    forest = RandomForestClassifier(n_estimators=args.n_estimators, random_state=42,
+                                    class_weight='balanced', n_jobs=args.jobs)
+    forest.fit(X_fit, y_fit)
+    order, impurity, permutation = rank_features(forest, X_val, y_val, args.repeats, jobs=args.jobs)
+
+    print(f"\nTop {min(args.top, width)} features:")
+    for rank, index in enumerate(order[:args.top], 1):
+        print(f"  {rank:3d}. {names[index]:24s} impurity {impurity[index]:.4f}  "
+              f"permutation {permutation[index]:+.4f}")
+
+    ks = sorted({k for k in args.k if 0 < k < width} | {width} | ({args.export} if args.export else set()))
+    print(f"\nAccuracy vs. latency ({len(y_test)} test samples, {args.n_estimators} trees):")
+    results = evaluate_subsets(X_train, X_test, y_train, y_test, raw_test, order, ks,
+                               args.features, args.n_estimators)
+
+    if args.export:
+        if not 0 < args.export <= width:
+            print(f"❌ --export must be between 1 and {width}")
+            return 1
+        export_model(next(r for r in results if r["k"] == args.export), names, args.features, args.model_output,
+                     args.csv)
+
+    if args.output:
+        report = {
+            "transform": args.features,
+            "ranking": [{"index": int(i), "name": names[i], "impurity": round(float(impurity[i]), 6),
+                         "permutation": round(float(permutation[i]), 6)} for i in order],
+            "subsets": [{key: value for key, value in r.items() if key not in ("model", "indices")}
+                        for r in results],
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved feature selection report to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Position- and scale-invariant feature transform for HandTalk
+
+The raw 138 features are normalized image coordinates, so a model trained on
+them has to learn every position in the frame and every distance from the
+camera. invariant_features() maps the same (N, 138) rows to 128 features that
+do not change when the signer moves or steps back:
+
+    - per hand: the 20 non-wrist landmarks relative to the wrist, divided by
+      the palm size (wrist to middle-finger MCP)              2 x 60
+    - the offset from the first to the second wrist, in palm sizes     2
+    - which hand slots are filled                                      2
+    - sine and cosine of each forearm (elbow -> wrist) angle           4
+
+The transform is stored inside the trained model as the first step of an
+sklearn Pipeline (see make_model), so the collector's auto-training, the
+trainers and every recognizer apply it identically: callers keep passing the
+raw 138 features to predict_proba. A reduced-width model exported by
+feature_selection.py adds a column selection step the same way.
+"""
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+HAND_FEATURES = 126
+MIDDLE_MCP = 9
+# Camera frames are 640x480; x distances are scaled to match y distances
+ASPECT_RATIO = 640 / 480
+
+FEATURE_TRANSFORMS = ["raw", "invariant"]
+
+
+def add_transform_arguments(parser):
+    """Add the feature transform command line option to an argparse parser"""
+    parser.add_argument("--features", choices=FEATURE_TRANSFORMS, default="raw",
+                        help="Train on raw coordinates or on position/scale-invariant features (default: raw)")
+    return parser
+
+
+def invariant_features(X):
+    """Map (N, 138) raw feature rows to (N, 128) position/scale-invariant rows"""
+    X = np.asarray(X, dtype=np.float64).reshape(-1, HAND_FEATURES + 12)
+    n = len(X)
+    hands = X[:, :HAND_FEATURES].reshape(n, 2, 21, 3)
+    present = np.any(hands != 0, axis=(2, 3))
+
+    wrists = hands[:, :, 0, :]
+    relative = hands[:, :, 1:, :] - wrists[:, :, None, :]
+    relative[..., 0] *= ASPECT_RATIO
+    palm = np.linalg.norm(relative[:, :, MIDDLE_MCP - 1, :2], axis=-1)
+    palm = np.where(present & (palm > 1e-6), palm, 1.0)
+    relative /= palm[:, :, None, None]
+    relative[~present] = 0.0
+
+    # Offset between the wrists, in units of the average palm size
+    both = present.all(axis=1)
+    offset = wrists[:, 1, :2] - wrists[:, 0, :2]
+    offset[:, 0] *= ASPECT_RATIO
+    offset = np.where(both[:, None], offset / palm.mean(axis=1)[:, None], 0.0)
+
+    # Forearm directions from the pose elbows (13, 14) to the wrists (15, 16)
+    pose = X[:, HAND_FEATURES:].reshape(n, 4, 3)
+    elbows, pose_wrists = pose[:, :2, :2], pose[:, 2:, :2]
+    forearm_present = np.any(elbows != 0, axis=2) & np.any(pose_wrists != 0, axis=2)
+    forearm = pose_wrists - elbows
+    angle = np.arctan2(forearm[..., 1], forearm[..., 0] * ASPECT_RATIO)
+    angles = np.stack([np.sin(angle), np.cos(angle)], axis=-1) * forearm_present[..., None]
+
+    return np.hstack([relative.reshape(n, -1), offset, present.astype(np.float64), angles.reshape(n, -1)])
+
+
+def invariant_feature_names():
+    """Column names of the 128 invariant features, in order"""
+    names = []
+    for hand in range(2):
+        for i in range(1, 21):
+            names += [f"hand{hand}_rel_x{i}", f"hand{hand}_rel_y{i}", f"hand{hand}_rel_z{i}"]
+    names += ["wrist_offset_x", "wrist_offset_y", "hand0_present", "hand1_present"]
+    for side in ["left", "right"]:
+        names += [f"{side}_forearm_sin", f"{side}_forearm_cos"]
+    return names
+
+
+def transformed_feature_names(transform="raw"):
+    """Column names of the features a transform produces"""
+    if transform == "invariant":
+        return invariant_feature_names()
+    from recognition_core import feature_names
+    return feature_names()
+
+
+def select_columns(X, indices):
+    """Keep only the given feature columns"""
+    return np.asarray(X)[:, indices]
+
+
+def make_model(estimator, transform="raw", feature_indices=None):
+    """
+    Wrap an estimator so it accepts raw 138-feature rows
+
+    Args:
+        estimator: Classifier trained on the transformed (and selected) features
+        transform: "raw" or "invariant"
+        feature_indices: Columns of the transformed features the estimator uses (None = all)
+    """
+    if transform not in FEATURE_TRANSFORMS:
+        raise ValueError(f"Unknown feature transform '{transform}'")
+    steps = []
+    if transform == "invariant":
+        steps.append(("invariant", FunctionTransformer(invariant_features, validate=False)))
+    if feature_indices is not None:
+        indices = np.asarray(feature_indices, dtype=np.intp)
+        steps.append(("select", FunctionTransformer(select_columns, kw_args={"indices": indices}, validate=False)))
+    if not steps:
+        return estimator
+    return Pipeline(steps + [("classifier", estimator)])
+
+
+def model_transform(model):
+    """Name of the feature transform a trained model applies ("raw" if none)"""
+    if hasattr(model, "feature_transform"):
+        # Bundled models (model_bundle.BundledForest) record it in their manifest
+        return model.feature_transform
+    if isinstance(model, Pipeline) and "invariant" in model.named_steps:
+        return "invariant"
+    return "raw"
+
+
+def model_feature_indices(model):
+    """Transformed-feature columns a reduced-width model uses, or None for all"""
+    if hasattr(model, "feature_indices"):
+        return model.feature_indices
+    if isinstance(model, Pipeline) and "select" in model.named_steps:
+        return model.named_steps["select"].kw_args["indices"]
+    return None
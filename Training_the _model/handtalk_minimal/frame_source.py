@@ -0,0 +1,205 @@
+"""
+Pluggable frame sources for the HandTalk collector and recognizers
+
+Every source is a generator of BGR frames, so the capture loop is just
+``for frame in frames:`` whether the frames come from a live camera, a video
+file, a directory of images or a deterministic synthetic generator. File and
+synthetic sources can be paced in real time (at the source's FPS) or replayed
+as fast as possible for profiling and load tests on machines without a camera.
+
+Source specs:
+    camera, camera:N, or N    - live camera (index N, default 0)
+    synthetic                 - generated frames (seeded, reproducible)
+    path/to/video.mp4         - video file
+    path/to/frames/           - directory of .png/.jpg/.jpeg/.bmp images
+"""
+
+import glob
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+logger = logging.getLogger("HandTalk")
+
+
+def add_source_arguments(parser):
+    """Add the frame source command line options to an argparse parser"""
+    parser.add_argument("--source", default="camera",
+                        help="Frame source: camera[:N], a video file, an image directory or 'synthetic' (default: camera)")
+    parser.add_argument("--pacing", choices=["realtime", "fast"], default="realtime",
+                        help="Replay file/synthetic sources at their frame rate or as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="Restart file sources when they run out")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop after this many frames (0 = no limit)")
+    return parser
+
+
+def open_frame_source(source="camera", width=640, height=480, fps=30, pacing="realtime", loop=False, max_frames=0, seed=0):
+    """
+    Open a frame source and return a generator of BGR frames
+
+    Args:
+        source: Source spec (see module docstring)
+        width, height, fps: Requested camera settings and synthetic frame size
+        pacing: "realtime" to sleep to the source frame rate, "fast" for no pacing
+        loop: Restart video/image sources at the end
+        max_frames: Stop after this many frames (0 = no limit)
+        seed: Random seed for the synthetic source
+
+    Returns:
+        Generator yielding frames; close() it to release the device or file
+
+    Raises:
+        FileNotFoundError, IOError: The source doesn't exist or can't be read
+    """
+    source = str(source)
+    kind, _, arg = source.partition(":")
+    if source.isdigit():
+        frames = camera_frames(int(source), width, height, fps)
+    elif kind == "camera":
+        frames = camera_frames(int(arg or 0), width, height, fps)
+    elif kind == "synthetic":
+        frames = _paced(synthetic_frames(width, height, seed), fps, pacing)
+    elif os.path.isdir(source):
+        frames = _paced(image_directory_frames(source, loop), fps, pacing)
+    elif os.path.isfile(source):
+        capture = cv2.VideoCapture(source)
+        opened = capture.isOpened()
+        file_fps = capture.get(cv2.CAP_PROP_FPS) or fps
+        capture.release()
+        if not opened:
+            raise IOError(f"Could not open video file {source}")
+        frames = _paced(video_file_frames(source, loop), file_fps, pacing)
+    else:
+        raise FileNotFoundError(f"Frame source {source} not found")
+
+    if max_frames:
+        frames = _limited(frames, max_frames)
+    return frames
+
+
+def open_from_args(args, width=640, height=480, fps=30):
+    """Open the frame source described by parsed add_source_arguments options"""
+    return open_frame_source(args.source, width, height, fps, pacing=args.pacing,
+                             loop=args.loop, max_frames=args.max_frames)
+
+
+def camera_frames(index=0, width=640, height=480, fps=30):
+    """Frames from a live camera with the standard HandTalk settings"""
+    cap = cv2.VideoCapture(index)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)            # Force 30 FPS for consistency
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                logger.warning("Failed to read frame from camera")
+                print("Failed to read frame from camera")
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+def video_file_frames(path, loop=False):
+    """Frames decoded from a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file {path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                if loop and cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                    continue
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+def image_directory_frames(directory, loop=False):
+    """
+    Frames read from the images in a directory, in file name order
+
+    The directory is checked when this is called rather than at the first
+    frame: it must hold at least one readable image.
+    """
+    paths = sorted(path for path in glob.glob(os.path.join(directory, "*"))
+                   if path.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise FileNotFoundError(f"No images found in {directory}")
+    if not any(cv2.imread(path) is not None for path in paths):
+        raise IOError(f"None of the {len(paths)} images in {directory} could be read")
+    return _image_frames(directory, paths, loop)
+
+
+def _image_frames(directory, paths, loop):
+    while True:
+        read = 0
+        for path in paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                logger.warning(f"Skipping unreadable image {path}")
+                continue
+            read += 1
+            yield frame
+        if not loop:
+            return
+        # Images can disappear while looping; don't spin on a pass that yields nothing
+        if not read:
+            raise IOError(f"No image in {directory} could be read")
+
+
+def synthetic_frames(width=640, height=480, seed=0):
+    """Endless deterministic frames: a static noise background with two moving blobs"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+    index = 0
+    while True:
+        frame = background.copy()
+        t = index / 30.0
+        for phase, color in ((0.0, (60, 170, 230)), (np.pi, (50, 150, 210))):
+            cx = int(width / 2 + width / 4 * np.cos(t + phase))
+            cy = int(height / 2 + height / 6 * np.sin(2 * t + phase))
+            cv2.circle(frame, (cx, cy), min(width, height) // 10, color, cv2.FILLED)
+        cv2.putText(frame, f"synthetic {index}", (10, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        yield frame
+        index += 1
+
+
+def _paced(frames, fps, pacing):
+    """Yield frames no faster than fps when pacing is "realtime" """
+    if pacing != "realtime" or not fps:
+        yield from frames
+        return
+    interval = 1.0 / fps
+    next_time = time.perf_counter()
+    try:
+        for frame in frames:
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Running behind - don't try to catch up with a burst
+                next_time = time.perf_counter()
+            next_time += interval
+            yield frame
+    finally:
+        frames.close()
+
+
+def _limited(frames, max_frames):
+    """Stop a frame generator after max_frames frames"""
+    try:
+        for count, frame in enumerate(frames, 1):
+            yield frame
+            if count >= max_frames:
+                return
+    finally:
+        frames.close()
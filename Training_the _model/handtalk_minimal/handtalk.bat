@@ -77,7 +77,7 @@ echo 3. Press 'q' to quit
 echo.
 echo Running gesture recognition... Close the camera window when finished.
 echo.
-python recognize_gestures_bimanual.py
+python recognize_gestures_bimanual.py --target-ms 33
 echo.
 echo Recognition session ended.
 echo.
@@ -101,7 +101,7 @@ echo 3. Press 'q' to quit
 echo.
 echo Running gesture recognition with dialect selection... Close the camera window when finished.
 echo.
-python recognize_gestures_bimanual.py
+python recognize_gestures_bimanual.py --target-ms 33
 echo.
 echo Recognition session ended.
 echo.
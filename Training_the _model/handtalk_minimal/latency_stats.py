@@ -0,0 +1,166 @@
+"""
+Per-stage latency histograms for HandTalk's real-time loops
+
+The loop calls lap(stage) after each stage; the time since the previous lap
+is added to that stage's total for the current frame, and end_frame() files
+every stage that ran into a fixed-bucket histogram. Recording is a couple of
+perf_counter_ns() calls per stage and one vectorized bucket lookup per frame,
+so it can stay on in production. Summaries can be drawn on the overlay and
+are written periodically to a JSON stats file.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Upper bucket edges in milliseconds; the last bucket catches everything slower
+BUCKET_EDGES_MS = [0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133, 266]
+
+RECOGNITION_STAGES = ["capture", "color", "hands", "pose", "features",
+                      "classify", "translate", "render", "display"]
+
+
+def add_stats_arguments(parser):
+    """Add the latency statistics command line options to an argparse parser"""
+    parser.add_argument("--stats-file", default="logs/latency_stats.json",
+                        help="Where to write per-stage latency histograms ('' = don't write)")
+    parser.add_argument("--stats-interval", type=float, default=30.0,
+                        help="Seconds between stats file updates (default: 30)")
+    parser.add_argument("--show-stats", action="store_true",
+                        help="Show per-stage p50/p95 latency on the video overlay")
+    return parser
+
+
+class LatencyHistograms:
+    """
+    Fixed-bucket latency histograms for the stages of a per-frame loop
+
+    Args:
+        stages: Stage names, in loop order
+        stats_path: JSON file written by maybe_dump() (None disables it)
+        dump_interval: Seconds between writes of the stats file
+        bucket_edges_ms: Upper bucket edges in milliseconds
+    """
+
+    def __init__(self, stages, stats_path=None, dump_interval=30.0, bucket_edges_ms=None):
+        self.stages = list(stages) + ["frame"]
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.edges_ms = list(bucket_edges_ms or BUCKET_EDGES_MS)
+        self._edges_ns = np.array(self.edges_ms, dtype=np.float64) * 1e6
+        self.stats_path = stats_path
+        self.dump_interval = dump_interval
+
+        n = len(self.stages)
+        self.counts = np.zeros((n, len(self.edges_ms) + 1), dtype=np.int64)
+        self.total_ns = np.zeros(n, dtype=np.int64)
+        self.max_ns = np.zeros(n, dtype=np.int64)
+        self.frames = 0
+
+        self._frame_ns = np.zeros(n, dtype=np.int64)
+        self._ran = np.zeros(n, dtype=bool)
+        self._frame_start = self._last = time.perf_counter_ns()
+        self._last_dump = time.monotonic()
+
+    @classmethod
+    def from_args(cls, args, stages=RECOGNITION_STAGES):
+        """Build histograms from parsed add_stats_arguments options"""
+        return cls(stages, stats_path=args.stats_file or None, dump_interval=args.stats_interval)
+
+    def lap(self, stage):
+        """Charge the time since the previous lap to stage"""
+        now = time.perf_counter_ns()
+        i = self.index[stage]
+        self._frame_ns[i] += now - self._last
+        self._ran[i] = True
+        self._last = now
+
+    def add(self, stage, ns):
+        """Charge a separately measured duration in nanoseconds to stage"""
+        i = self.index[stage]
+        self._frame_ns[i] += ns
+        self._ran[i] = True
+
+    def skip(self):
+        """Restart the lap timer without charging any stage"""
+        self._last = time.perf_counter_ns()
+
+    def end_frame(self):
+        """File this frame's stage totals into the histograms"""
+        now = time.perf_counter_ns()
+        self.add("frame", now - self._frame_start)
+        self._frame_start = now
+
+        stages = np.flatnonzero(self._ran)
+        values = self._frame_ns[stages]
+        buckets = np.searchsorted(self._edges_ns, values, side='left')
+        self.counts[stages, buckets] += 1
+        self.total_ns[stages] += values
+        np.maximum.at(self.max_ns, stages, values)
+        self.frames += 1
+
+        self._frame_ns[:] = 0
+        self._ran[:] = False
+
+    def percentile_ms(self, stage, q):
+        """Upper bucket edge below which q percent of the stage's samples fall"""
+        counts = self.counts[self.index[stage]]
+        total = counts.sum()
+        if not total:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(counts), total * q / 100.0, side='left'))
+        max_ms = self.max_ns[self.index[stage]] / 1e6
+        if bucket >= len(self.edges_ms):
+            return max_ms
+        return min(float(self.edges_ms[bucket]), max_ms)
+
+    def summary(self):
+        """Per-stage count, mean, p50/p95/p99, max and raw bucket counts"""
+        stages = {}
+        for stage, i in self.index.items():
+            count = int(self.counts[i].sum())
+            stages[stage] = {
+                "count": count,
+                "mean_ms": round(self.total_ns[i] / count / 1e6, 4) if count else 0.0,
+                "p50_ms": self.percentile_ms(stage, 50),
+                "p95_ms": self.percentile_ms(stage, 95),
+                "p99_ms": self.percentile_ms(stage, 99),
+                "max_ms": round(self.max_ns[i] / 1e6, 4),
+                "buckets": self.counts[i].tolist(),
+            }
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "frames": self.frames,
+            "bucket_edges_ms": self.edges_ms,
+            "stages": stages,
+        }
+
+    def overlay_lines(self):
+        """Short per-stage text lines for the video overlay"""
+        lines = []
+        for stage, i in self.index.items():
+            count = self.counts[i].sum()
+            if count:
+                lines.append(f"{stage:<9} {self.total_ns[i] / count / 1e6:6.2f} ms  "
+                             f"p95<{self.percentile_ms(stage, 95):g}")
+        return lines
+
+    def maybe_dump(self, force=False):
+        """Write the stats file when dump_interval has passed (or force is set)"""
+        if not self.stats_path or not self.frames:
+            return False
+        if not force and time.monotonic() - self._last_dump < self.dump_interval:
+            return False
+        self._last_dump = time.monotonic()
+
+        directory = os.path.dirname(self.stats_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial file
+        temp_path = self.stats_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(temp_path, self.stats_path)
+        return True
@@ -1,21 +1,180 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DIR = "logs"
+MAX_LOG_BYTES = 5 * 1024 * 1024  # Rotate session files at 5 MB
+LOG_BACKUP_COUNT = 3
+
+# At most RATE_LIMIT_BURST records per call site every RATE_LIMIT_INTERVAL seconds
+RATE_LIMIT_INTERVAL = 5.0
+RATE_LIMIT_BURST = 5
+
+# Sidecar index next to each log file: one (created, byte offset, levelno)
+# entry per record, so view_logs.py can seek straight to the records it needs
+INDEX_RECORD = struct.Struct('<dQB')
+INDEX_SUFFIX = ".idx"
+
+_listener = None
+_log_file = None
+
+
+def index_path(log_path):
+    """Path of the sidecar offset index for a log file."""
+    return log_path + INDEX_SUFFIX
+
+
+class IndexedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that also appends each record's offset to a sidecar index
+
+    The index rotates together with its log file (handtalk_x.log.1.idx belongs
+    to handtalk_x.log.1).
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self._index = open(index_path(self.baseFilename), 'ab')
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            offset = self.stream.tell()
+            logging.FileHandler.emit(self, record)
+            self._index.write(INDEX_RECORD.pack(record.created, offset, record.levelno))
+            self._index.flush()
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._index.close()
+        for i in range(self.backupCount - 1, 0, -1):
+            source = index_path(f"{self.baseFilename}.{i}")
+            if os.path.exists(source):
+                os.replace(source, index_path(f"{self.baseFilename}.{i + 1}"))
+        if self.backupCount > 0:
+            os.replace(index_path(self.baseFilename), index_path(self.baseFilename + ".1"))
+        self._index = open(index_path(self.baseFilename), 'wb')
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+        finally:
+            self.release()
+        super().close()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drop repeated records from the same call site (e.g. a per-frame log_error)
+
+    Each source line may emit `burst` records per `interval` seconds. The next
+    record let through after a suppressed run reports how many were dropped.
+    """
+
+    def __init__(self, interval=RATE_LIMIT_INTERVAL, burst=RATE_LIMIT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._sites = {}  # (pathname, lineno) -> [window_start, count, suppressed]
+        self._lock = threading.Lock()  # Records are filtered on every logging thread
+
+    def filter(self, record):
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get((record.pathname, record.lineno))
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self._sites[(record.pathname, record.lineno)] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                return True
+            else:
+                site[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+def setup_logging(log_level=logging.WARNING, log_dir=LOG_DIR, file_level=logging.INFO):
+    """Set up logging configuration for the HandTalk project.
+
+    Records are put on a queue by the calling thread and written by a
+    background QueueListener, so logging from the frame loop never blocks on
+    console or disk I/O. Each session writes logs/handtalk_YYYYmmdd_HHMMSS_<pid>.log
+    (size-rotated, with a sidecar .idx offset index); the console only shows
+    records at log_level and above. Call it from entry-point scripts only; library
+    modules use logging.getLogger("HandTalk"). Only the first call configures logging.
+    """
+    global _listener, _log_file
+
+    if _listener is None:
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        # Console: only show warnings and errors to reduce spam
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(log_level)
+        console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+
+        # Per-session log file, rotated by size
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            _log_file = os.path.join(log_dir, f"handtalk_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.log")
+            file_handler = IndexedRotatingFileHandler(
+                _log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+            file_handler.setLevel(file_level)
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            _log_file = None
+            print(f"Could not create log file in {log_dir}: {e}")
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(min(log_level, file_level))
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
 
-def setup_logging(log_level=logging.WARNING):
-    """Set up logging configuration for the HandTalk project."""
-    
-    # Configure logging to console only (no file logging)
-    # Only show warnings and errors to reduce spam
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()  # Log to console only
-        ]
-    )
-    
     # Return logger instance
     return logging.getLogger("HandTalk")
 
+def shutdown_logging():
+    """Flush queued records and stop the background logging thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def current_log_file():
+    """Path of this session's log file, or None if file logging is unavailable."""
+    return _log_file
+
 def get_logger(name):
     """Get a logger instance with the specified name."""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,162 @@
+"""
+Micro-batching in front of the HandTalk classifier
+
+A random forest's predict_proba has a large fixed cost per call (walking 100
+trees through sklearn's input validation and joblib dispatch) and a small
+cost per row, so classifying one 1x138 row per call wastes most of the time
+once several streams or clients are active. MicroBatcher queues rows from any
+number of threads, waits at most max_wait_ms after the first queued row (or
+until max_batch rows are waiting), runs one batched predict_proba and hands
+each caller its own slice of the result.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def add_batching_arguments(parser):
+    """Add the micro-batching command line options to an argparse parser"""
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0,
+                        help="Longest time a request waits for others to batch with (0 = no batching)")
+    parser.add_argument("--max-batch", type=int, default=32,
+                        help="Largest number of vectors classified in one call (default: 32)")
+    return parser
+
+
+class BatchMetrics:
+    """Batch size distribution and queueing delay of a batching classifier"""
+
+    def __init__(self, window=10000):
+        self.batch_sizes = Counter()
+        self.delays_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, batch_size, delays_ms):
+        with self._lock:
+            self.batch_sizes[batch_size] += 1
+            self.delays_ms.extend(delays_ms)
+
+    def summary(self):
+        """Batch size histogram and queueing delay percentiles"""
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+            delays = np.array(self.delays_ms, dtype=np.float64)
+        batches = sum(sizes.values())
+        rows = sum(size * count for size, count in sizes.items())
+        summary = {
+            "batches": batches,
+            "rows": rows,
+            "mean_batch_size": round(rows / batches, 2) if batches else 0.0,
+            "batch_size_histogram": sizes,
+        }
+        if delays.size:
+            summary.update({
+                "queue_delay_mean_ms": round(float(delays.mean()), 3),
+                "queue_delay_p50_ms": round(float(np.percentile(delays, 50)), 3),
+                "queue_delay_p95_ms": round(float(np.percentile(delays, 95)), 3),
+                "queue_delay_max_ms": round(float(delays.max()), 3),
+            })
+        return summary
+
+
+class MicroBatcher:
+    """
+    Collect rows from concurrent callers into batched predict_proba calls
+
+    Args:
+        model: Classifier with predict_proba
+        max_batch: Dispatch as soon as this many rows are queued
+        max_wait_ms: Longest wait after the first queued row before dispatching
+    """
+
+    def __init__(self, model, max_batch=32, max_wait_ms=2.0):
+        self.model = model
+        self.classes_ = model.classes_
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = BatchMetrics()
+        self._queue = deque()  # (rows, future, submit_time)
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_args(cls, model, args):
+        """Build a batcher from parsed add_batching_arguments options, or None if batching is off"""
+        if args.batch_wait_ms <= 0 or args.max_batch <= 1:
+            return None
+        return cls(model, max_batch=args.max_batch, max_wait_ms=args.batch_wait_ms)
+
+    def submit(self, rows):
+        """Queue an (N, features) array; the Future resolves to its (N, classes) probabilities"""
+        future = Future()
+        with self._condition:
+            self._queue.append((rows, future, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def predict_proba(self, rows):
+        """Drop-in replacement for model.predict_proba that batches with other callers"""
+        return self.submit(rows).result()
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+    def _collect(self):
+        """Wait for a batch worth dispatching and pop it (None when closed)"""
+        with self._condition:
+            while not self._queue:
+                if not self._running:
+                    return None
+                self._condition.wait()
+            deadline = self._queue[0][2] + self.max_wait
+            while self._running and sum(len(item[0]) for item in self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch, rows = [], 0
+            while self._queue and (not batch or rows + len(self._queue[0][0]) <= self.max_batch):
+                item = self._queue.popleft()
+                batch.append(item)
+                rows += len(item[0])
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            try:
+                probabilities = self.model.predict_proba(np.vstack([rows for rows, _, _ in batch]))
+            except Exception as e:
+                self._retry_separately(batch, e)
+                continue
+            self.metrics.record(len(probabilities), [(start - submitted) * 1000 for _, _, submitted in batch])
+
+            # Scatter each caller's rows back to its Future
+            offset = 0
+            for rows, future, _ in batch:
+                future.set_result(probabilities[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def _retry_separately(self, batch, error):
+        """Classify a failed batch one request at a time, so only the bad request gets the error"""
+        if len(batch) == 1:
+            batch[0][1].set_exception(error)
+            return
+        for rows, future, _ in batch:
+            try:
+                future.set_result(self.model.predict_proba(rows))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,304 @@
+"""
+Versioned, memory-mappable model bundles for HandTalk
+
+Unpickling sign_language_model_bimanual.pkl rebuilds 100 sklearn tree
+objects on every start. A bundle stores the same random forest as a few flat
+arrays plus a JSON manifest:
+
+    sign_language_model_bimanual.bundle/
+        manifest.json     format version, feature schema hash, labels,
+                          feature transform, metrics, training data hash
+        left.npy, right.npy, feature.npy, threshold.npy, value.npy, roots.npy
+        feature_indices.npy   (reduced-width models only)
+
+The arrays are opened with np.load(mmap_mode='r'), so loading takes
+milliseconds and processes serving the same bundle share one read-only copy
+through the page cache. The feature schema hash covers the raw 138-feature
+layout, the feature transform with the columns it produces and the selected
+column indices; a bundle whose hash doesn't match is refused.
+
+The trainers write both the pickle and the bundle (save_model);
+recognition_core.load_model prefers the bundle when it is up to date.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from feature_transform import (FEATURE_TRANSFORMS, invariant_features, model_feature_indices, model_transform,
+                               transformed_feature_names)
+
+# Version 2: the schema hash also covers the transform and the selected columns
+BUNDLE_FORMAT_VERSION = 2
+BUNDLE_SUFFIX = ".bundle"
+MANIFEST_NAME = "manifest.json"
+TREE_ARRAYS = ["left", "right", "feature", "threshold", "value", "roots"]
+
+
+class BundleError(ValueError):
+    """A model bundle is missing, malformed or doesn't match this feature layout"""
+
+
+def feature_schema_hash(transform="raw", feature_indices=None, names=None):
+    """
+    SHA-256 of the feature layout a model was trained on
+
+    Covers the ordered raw column names, the transform and the columns it
+    produces, and the selected column indices (if any).
+    """
+    if names is None:
+        from recognition_core import feature_names
+        names = feature_names()
+    indices = "all" if feature_indices is None else ",".join(str(int(i)) for i in feature_indices)
+    schema = "\n".join(list(names) + [f"transform={transform}"] + transformed_feature_names(transform)
+                       + [f"indices={indices}"])
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents (the training dataset version)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bundle_path(model_path):
+    """Bundle directory that belongs to a pickle path"""
+    if model_path.endswith(BUNDLE_SUFFIX):
+        return model_path
+    return os.path.splitext(model_path)[0] + BUNDLE_SUFFIX
+
+
+def _forest_of(model):
+    """The tree ensemble inside a (possibly pipelined) model, or None"""
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    if not hasattr(estimator, "estimators_") or not hasattr(estimator.estimators_[0], "tree_"):
+        return None
+    return estimator
+
+
+def flatten_forest(forest):
+    """
+    Concatenate the trees of a fitted forest into flat arrays
+
+    Leaves point to themselves, so every row can be walked max_depth steps
+    without checking for leaves; value holds each node's class probabilities.
+    """
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in (estimator.tree_ for estimator in forest.estimators_):
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left < 0
+        left.append(np.where(leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(leaf, nodes, tree.children_right) + offset)
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        counts = tree.value[:, 0, :]
+        value.append(counts / np.maximum(counts.sum(axis=1, keepdims=True), 1e-12))
+        roots.append(offset)
+        offset += tree.node_count
+    return {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+
+
+def save_bundle(model, path, metrics=None, dataset_path=None):
+    """
+    Write a forest model as a bundle directory
+
+    Args:
+        model: Fitted RandomForest (optionally inside a make_model Pipeline)
+        path: Bundle directory to write (replaced if it exists)
+        metrics: Evaluation results to record, e.g. {"accuracy": 0.95}
+        dataset_path: Training CSV whose hash and row count are recorded
+    """
+    forest = _forest_of(model)
+    if forest is None:
+        raise BundleError(f"Only tree ensembles can be bundled, not {type(model).__name__}")
+
+    arrays = flatten_forest(forest)
+    feature_indices = model_feature_indices(model)
+    transform = model_transform(model)
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model_type": type(forest).__name__,
+        "schema_hash": feature_schema_hash(transform, feature_indices),
+        "transform": transform,
+        "input_features": int(forest.n_features_in_),
+        "labels": [str(label) for label in model.classes_],
+        "n_estimators": len(forest.estimators_),
+        "max_depth": int(max(estimator.tree_.max_depth for estimator in forest.estimators_)),
+        "node_count": int(len(arrays["left"])),
+        "metrics": metrics or {},
+        "dataset": None,
+        "arrays": TREE_ARRAYS + (["feature_indices"] if feature_indices is not None else []),
+    }
+    if dataset_path and os.path.exists(dataset_path):
+        with open(dataset_path, "rb") as f:
+            rows = max(sum(1 for _ in f) - 1, 0)
+        manifest["dataset"] = {"path": dataset_path, "sha256": file_hash(dataset_path), "rows": rows}
+
+    # Write next to the target, then swap it in
+    temp_path = path + ".tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), array)
+    if feature_indices is not None:
+        np.save(os.path.join(temp_path, "feature_indices.npy"), np.asarray(feature_indices, dtype=np.int64))
+    with open(os.path.join(temp_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+    return manifest
+
+
+class BundledForest:
+    """
+    Random forest classifier evaluated from a bundle's flat arrays
+
+    Offers the parts of the sklearn interface the recognizers use:
+    classes_, predict_proba and predict on raw 138-feature rows.
+    """
+
+    def __init__(self, manifest, arrays, path=None):
+        self.manifest = manifest
+        self.path = path
+        self.classes_ = np.array(manifest["labels"], dtype=object)
+        self.feature_transform = manifest["transform"]
+        self.feature_indices = arrays.get("feature_indices")
+        self.max_depth = manifest["max_depth"]
+        self._left = arrays["left"]
+        self._right = arrays["right"]
+        self._feature = arrays["feature"]
+        self._threshold = arrays["threshold"]
+        self._value = arrays["value"]
+        self._roots = np.asarray(arrays["roots"])
+
+    def _prepare(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if self.feature_transform == "invariant":
+            X = invariant_features(X)
+        if self.feature_indices is not None:
+            X = X[:, self.feature_indices]
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return X.astype(np.float32)
+
+    def predict_proba(self, X):
+        """Mean of the trees' leaf class probabilities, (N, classes)"""
+        X = self._prepare(X)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self._roots, (len(X), len(self._roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self._feature[nodes]] <= self._threshold[nodes]
+            nodes = np.where(go_left, self._left[nodes], self._right[nodes])
+        return self._value[nodes].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_bundle(path, mmap=True, transform=None, feature_indices=None):
+    """
+    Open a bundle directory as a BundledForest
+
+    Args:
+        transform, feature_indices: If given, the bundle must have been built
+            for this feature transform / column selection
+
+    Raises:
+        BundleError: if the bundle is malformed, from a newer format or built
+            for a different feature layout
+    """
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise BundleError(f"{path} is not a model bundle (no {MANIFEST_NAME})")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise BundleError(f"{path} has bundle format {manifest.get('format_version')}, "
+                          f"expected {BUNDLE_FORMAT_VERSION}")
+    if manifest.get("transform") not in FEATURE_TRANSFORMS:
+        raise BundleError(f"{path} uses unknown feature transform '{manifest.get('transform')}'")
+    if transform is not None and manifest["transform"] != transform:
+        raise BundleError(f"{path} was built for {manifest['transform']} features, expected {transform}")
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+              for name in manifest["arrays"]}
+    bundle_indices = arrays.get("feature_indices")
+    if feature_indices is not None and (bundle_indices is None
+                                        or not np.array_equal(bundle_indices, feature_indices)):
+        raise BundleError(f"{path} was built for a different feature column selection")
+    expected_hash = feature_schema_hash(manifest["transform"], bundle_indices)
+    if manifest.get("schema_hash") != expected_hash:
+        raise BundleError(f"{path} was trained on a different feature layout "
+                          f"(schema {str(manifest.get('schema_hash'))[:12]}, expected {expected_hash[:12]})")
+    nodes = manifest["node_count"]
+    if any(len(arrays[name]) != nodes for name in ["left", "right", "feature", "threshold", "value"]):
+        raise BundleError(f"{path} arrays don't match its manifest")
+    if arrays["value"].shape[1] != len(manifest["labels"]):
+        raise BundleError(f"{path} has {arrays['value'].shape[1]} class columns for {len(manifest['labels'])} labels")
+    if nodes and int(np.max(arrays["feature"])) >= manifest["input_features"]:
+        raise BundleError(f"{path} references features beyond its {manifest['input_features']} inputs")
+    return BundledForest(manifest, arrays, path)
+
+
+def save_model(model, model_path, metrics=None, dataset_path=None):
+    """
+    Save a trained model as a pickle and, for forests, as a bundle next to it
+
+    Returns:
+        The bundle path, or None if the model type can't be bundled
+    """
+    joblib.dump(model, model_path)
+    if _forest_of(model) is None:
+        return None
+    path = bundle_path(model_path)
+    save_bundle(model, path, metrics, dataset_path)
+    return path
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Convert a HandTalk model pickle to a bundle, or show a bundle")
+    parser.add_argument("model", nargs="?", default="sign_language_model_bimanual.pkl",
+                        help="Pickle to convert, or bundle directory to show")
+    parser.add_argument("--dataset", default="data/gestures_bimanual.csv",
+                        help="Training CSV recorded in the manifest")
+    return parser.parse_args()
+
+
+def main():
+    """Convert a pickle to a bundle (or verify an existing bundle) and print its manifest"""
+    args = parse_args()
+    try:
+        if os.path.isdir(args.model):
+            manifest = load_bundle(args.model).manifest
+        else:
+            manifest = save_bundle(joblib.load(args.model), bundle_path(args.model), dataset_path=args.dataset)
+            print(f"💾 Saved model bundle to {bundle_path(args.model)}")
+    except (OSError, BundleError) as e:
+        print(f"❌ {str(e)}")
+        return 1
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Indexed nearest-neighbor classifier backend for HandTalk
+
+Instead of retraining the forest, NeighborClassifier keeps one KD-tree (or
+ball tree) per label over the feature vectors (position/scale-invariant by
+default, see feature_transform.py) and classifies a frame by a
+distance-weighted vote of its k nearest samples across all labels. A newly
+collected gesture is added with insert(): its rows go to a per-label buffer
+and are folded into that label's tree once the buffer grows, so the other
+labels' trees are never rebuilt.
+
+Labels with fewer than BRUTE_FORCE_ROWS samples and the insert buffers are
+compared with the query in one matrix product, which beats a tree query on
+~128-dimensional vectors at that size. The trees of large labels are
+searched nearest-centroid first; the resulting k-th distance bounds radius
+queries into the others, so the search stays exact without walking every
+tree in full.
+
+It offers classes_ and predict_proba like the forest, so the recognizers can
+use it with --classifier neighbors.
+
+Usage:
+    python neighbor_classifier.py build                  # index data/gestures_bimanual.csv
+    python neighbor_classifier.py add Wave               # add a newly collected label
+    python recognize_gestures_bimanual.py --classifier neighbors
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import BallTree, KDTree
+
+from benchmark_suite import summarize
+from feature_transform import FEATURE_TRANSFORMS, invariant_features
+
+NEIGHBORS_MODEL_PATH = "gesture_neighbors.pkl"
+TREE_TYPES = {"kd": KDTree, "ball": BallTree}
+# A label's insert buffer is merged into its tree once it exceeds
+# max(MIN_PENDING, rebuild_fraction x tree size) rows
+MIN_PENDING = 32
+# Below this many samples a label is scanned with one matrix-vector product,
+# which is faster than a tree query on ~128-dimensional vectors
+BRUTE_FORCE_ROWS = 2048
+# insert(skip_existing=True) treats rows this close to a sample as already indexed
+DUPLICATE_DISTANCE = 1e-9
+
+
+def add_classifier_arguments(parser):
+    """Add the classifier backend command line options to an argparse parser"""
+    parser.add_argument("--classifier", choices=["forest", "neighbors"], default="forest",
+                        help="Classify with the trained forest or the nearest-neighbor index (default: forest)")
+    parser.add_argument("--neighbors-model", default=NEIGHBORS_MODEL_PATH,
+                        help=f"Nearest-neighbor index used by --classifier neighbors (default: {NEIGHBORS_MODEL_PATH})")
+    return parser
+
+
+class NeighborClassifier:
+    """
+    k-nearest-neighbor classifier with one spatial index per label
+
+    Args:
+        k: Number of neighbors that vote
+        transform: Feature transform applied to raw 138-feature rows ("raw" or "invariant")
+        tree: "kd" or "ball"
+        rebuild_fraction: Insert buffer size, relative to the tree, that triggers a rebuild
+    """
+
+    def __init__(self, k=5, transform="invariant", tree="kd", leaf_size=20, rebuild_fraction=0.25):
+        if transform not in FEATURE_TRANSFORMS:
+            raise ValueError(f"Unknown feature transform '{transform}'")
+        if tree not in TREE_TYPES:
+            raise ValueError(f"Unknown tree type '{tree}'")
+        self.k = k
+        self.feature_transform = transform
+        self.feature_indices = None
+        self.tree = tree
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self._reset()
+
+    def _reset(self):
+        self.classes_ = np.array([], dtype=object)
+        self._rows = {}       # label -> all samples; the first _tree_size are in the tree
+        self._norms = {}      # label -> squared norms of the samples
+        self._tree_size = {}
+        self._trees = {}      # label -> spatial index (large labels only)
+        self._centroids = {}
+        self._scan_cache = None
+
+    def _transform(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return invariant_features(X) if self.feature_transform == "invariant" else X
+
+    def fit(self, X, y):
+        """Index labelled raw feature rows, replacing any existing index"""
+        self._reset()
+        X = self._transform(X)
+        y = np.asarray(y)
+        for label in np.unique(y):
+            self._insert_transformed(X[y == label], label)
+        return self
+
+    def insert(self, X, label, skip_existing=False):
+        """
+        Add raw feature rows of one (new or existing) label
+
+        Only that label's index changes; its tree is rebuilt only when the
+        insert buffer grows past the rebuild threshold.
+
+        Returns:
+            Number of rows added
+        """
+        X = self._transform(X)
+        if skip_existing and label in self._rows:
+            X = X[self._nearest_distances(X, label) > DUPLICATE_DISTANCE]
+        return self._insert_transformed(X, label)
+
+    def _insert_transformed(self, X, label):
+        if len(X) == 0:
+            return 0
+        if label not in self._rows:
+            self._rows[label] = X[:0]
+            self._norms[label] = np.empty(0)
+            self._tree_size[label] = 0
+            self.classes_ = np.array(sorted(list(self.classes_) + [label]), dtype=object)
+        rows = np.vstack([self._rows[label], X])
+        self._rows[label] = rows
+        self._norms[label] = np.concatenate([self._norms[label], (X ** 2).sum(axis=1)])
+        self._centroids[label] = rows.mean(axis=0)
+        self._scan_cache = None
+
+        pending = len(rows) - self._tree_size[label]
+        if len(rows) >= BRUTE_FORCE_ROWS and pending > max(MIN_PENDING,
+                                                            self.rebuild_fraction * self._tree_size[label]):
+            self._trees[label] = TREE_TYPES[self.tree](rows, leaf_size=self.leaf_size)
+            self._tree_size[label] = len(rows)
+        return len(X)
+
+    def sample_counts(self):
+        """Number of samples per label"""
+        return {label: len(self._rows[label]) for label in self.classes_}
+
+    def _scan_matrix(self):
+        """Samples not covered by a tree, of all labels, with their squared norms and label indices"""
+        if self._scan_cache is None:
+            rows, norms, owners = [], [], []
+            for index, label in enumerate(self.classes_):
+                start = self._tree_size[label]
+                rows.append(self._rows[label][start:])
+                norms.append(self._norms[label][start:])
+                owners.append(np.full(len(rows[-1]), index))
+            self._scan_cache = (np.vstack(rows), np.concatenate(norms), np.concatenate(owners))
+        return self._scan_cache
+
+    def _nearest_distances(self, X, label):
+        """Exact distance from each row to its nearest sample of one label, (N,)"""
+        rows, norms, owners = self._scan_matrix()
+        mask = owners == list(self.classes_).index(label)
+        nearest = np.full(len(X), np.inf)
+        if mask.any():
+            scanned = rows[mask]
+            closest = np.argmin(_distances(X, scanned, norms[mask]), axis=1)
+            # The norm expansion leaves ~1e-7 for identical rows; measure the closest sample directly
+            nearest = np.linalg.norm(X - scanned[closest], axis=1)
+        if label in self._trees:
+            nearest = np.minimum(nearest, self._trees[label].query(X, k=1)[0][:, 0])
+        return nearest
+
+    def predict_proba(self, X):
+        """Distance-weighted vote of the k nearest samples over all labels, (N, classes)"""
+        X = self._transform(X)
+        n = len(X)
+
+        # Samples outside the trees: one matrix product over all labels
+        rows, norms, owners = self._scan_matrix()
+        distances = _distances(X, rows, norms)
+        candidates = [[(distances[row], owners)] for row in range(n)]
+        radius = np.full(n, np.inf)
+        if distances.shape[1] >= self.k:
+            radius = np.partition(distances, self.k - 1, axis=1)[:, self.k - 1]
+
+        # Large labels: search the tree with the nearest centroid first, then
+        # only look for samples closer than the current k-th distance
+        tree_labels = [index for index, label in enumerate(self.classes_) if label in self._trees]
+        if tree_labels:
+            centroids = np.array([self._centroids[self.classes_[index]] for index in tree_labels])
+            seeds = np.argmin(((X[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2), axis=1)
+            for position, index in enumerate(tree_labels):
+                label = self.classes_[index]
+                tree = self._trees[label]
+                seeded = np.flatnonzero(seeds == position)
+                if len(seeded):
+                    found = tree.query(X[seeded], k=min(self.k, self._tree_size[label]))[0]
+                    for row, row_distances in zip(seeded, found):
+                        candidates[row].append((row_distances, np.full(len(row_distances), index)))
+                    if found.shape[1] >= self.k:
+                        radius[seeded] = np.minimum(radius[seeded], found[:, self.k - 1])
+            for position, index in enumerate(tree_labels):
+                others = np.flatnonzero(seeds != position)
+                if len(others):
+                    found = self._trees[self.classes_[index]].query_radius(
+                        X[others], r=np.minimum(radius[others], np.finfo(np.float64).max), return_distance=True)[1]
+                    for row, row_distances in zip(others, found):
+                        candidates[row].append((row_distances, np.full(len(row_distances), index)))
+
+        probabilities = np.zeros((n, len(self.classes_)))
+        for row, parts in enumerate(candidates):
+            row_distances = np.concatenate([d for d, _ in parts])
+            row_owners = np.concatenate([o for _, o in parts])
+            nearest = row_distances.argsort() if len(row_distances) <= self.k else \
+                np.argpartition(row_distances, self.k - 1)[:self.k]
+            np.add.at(probabilities[row], row_owners[nearest], 1.0 / (row_distances[nearest] + 1e-6))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _distances(X, rows, norms):
+    """Euclidean distances between query rows and samples with precomputed squared norms, (N, M)"""
+    squared = (X ** 2).sum(axis=1)[:, None] - 2.0 * (X @ rows.T) + norms[None, :]
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def load_neighbors(path=NEIGHBORS_MODEL_PATH):
+    """Load a saved NeighborClassifier"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Nearest-neighbor index {path} not found. "
+                                f"Build it with: python neighbor_classifier.py build")
+    model = joblib.load(path)
+    print(f"Nearest-neighbor index loaded from {path} ({sum(model.sample_counts().values())} samples)")
+    return model
+
+
+def load_classifier(args, model_path="sign_language_model_bimanual.pkl"):
+    """The forest or the nearest-neighbor index, as chosen by add_classifier_arguments options"""
+    if args.classifier == "neighbors":
+        return load_neighbors(args.neighbors_model)
+    from recognition_core import load_model
+    return load_model(model_path)
+
+
+def load_csv(csv_path):
+    df = pd.read_csv(csv_path)
+    return df.drop('label', axis=1).to_numpy(dtype=np.float64), df['label'].to_numpy()
+
+
+def time_queries(model, rows, repeat=500):
+    """Latency of one-row predict_proba calls"""
+    model.predict_proba(rows[:1])
+    samples = []
+    for i in range(repeat):
+        row = rows[i % len(rows)].reshape(1, -1)
+        start = time.perf_counter_ns()
+        model.predict_proba(row)
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Build or extend the HandTalk nearest-neighbor index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Index every row of the gesture CSV")
+    build.add_argument("--k", type=int, default=5, help="Number of voting neighbors")
+    build.add_argument("--features", choices=FEATURE_TRANSFORMS, default="invariant",
+                       help="Index raw coordinates or invariant features (default: invariant)")
+    build.add_argument("--tree", choices=list(TREE_TYPES), default="kd", help="Spatial index type")
+
+    add = subparsers.add_parser("add", help="Insert the CSV rows of one label into the saved index")
+    add.add_argument("label", help="Gesture label to add or extend")
+
+    for subparser in (build, add):
+        subparser.add_argument("--csv", default="data/gestures_bimanual.csv", help="Gesture CSV to read")
+        subparser.add_argument("--model", default=NEIGHBORS_MODEL_PATH, help="Index file to write")
+    return parser.parse_args()
+
+
+def main():
+    """Build the index (reporting accuracy and latency) or add one label to it"""
+    args = parse_args()
+    if not os.path.exists(args.csv):
+        print(f"❌ Data file {args.csv} not found.")
+        return 1
+    X, y = load_csv(args.csv)
+
+    if args.command == "build":
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        model = NeighborClassifier(args.k, args.features, args.tree).fit(X_train, y_train)
+        accuracy = np.mean(model.predict(X_test) == y_test)
+        latency = time_queries(model, X_test)
+        print(f"Held-out accuracy {accuracy:.3f}; predict_proba p50 {latency['p50_ms']:.3f} ms, "
+              f"p95 {latency['p95_ms']:.3f} ms")
+        model.fit(X, y)
+    else:
+        try:
+            model = load_neighbors(args.model)
+        except FileNotFoundError as e:
+            print(f"❌ {str(e)}")
+            return 1
+        rows = X[y == args.label]
+        if not len(rows):
+            print(f"❌ No rows labelled '{args.label}' in {args.csv}")
+            return 1
+        start = time.perf_counter()
+        added = model.insert(rows, args.label, skip_existing=True)
+        print(f"Inserted {added} new '{args.label}' samples in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    joblib.dump(model, args.model)
+    counts = ", ".join(f"{label}: {count}" for label, count in model.sample_counts().items())
+    print(f"💾 Saved nearest-neighbor index to {args.model} ({counts})")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run through the module so the saved index pickles NeighborClassifier
+    # as neighbor_classifier.NeighborClassifier, not __main__.NeighborClassifier
+    import neighbor_classifier
+    sys.exit(neighbor_classifier.main())
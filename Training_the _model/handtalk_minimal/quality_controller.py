@@ -0,0 +1,116 @@
+"""
+Adaptive quality controller for HandTalk's real-time loops
+
+Measures a rolling average of per-frame processing latency and steps the
+MediaPipe model complexity, detector input resolution and frame skip down
+when the loop is over its frame budget, and back up when there is clear
+headroom. Every change is logged, so the same build settles on a usable
+setting on both slow kiosk PCs and fast workstations.
+"""
+
+import logging
+from collections import deque, namedtuple
+
+QualityLevel = namedtuple("QualityLevel", ["model_complexity", "max_side", "frame_skip"])
+
+# Ordered from best quality to cheapest. max_side is the longest side of the
+# image handed to MediaPipe (640 = native 640x480 camera frames).
+QUALITY_LEVELS = [
+    QualityLevel(model_complexity=1, max_side=640, frame_skip=1),
+    QualityLevel(model_complexity=0, max_side=640, frame_skip=1),
+    QualityLevel(model_complexity=0, max_side=480, frame_skip=1),
+    QualityLevel(model_complexity=0, max_side=320, frame_skip=1),
+    QualityLevel(model_complexity=0, max_side=320, frame_skip=2),
+    QualityLevel(model_complexity=0, max_side=256, frame_skip=3),
+]
+
+
+def add_quality_arguments(parser):
+    """Add the adaptive quality command line options to an argparse parser"""
+    parser.add_argument("--target-ms", type=float, default=0,
+                        help="Per-frame latency budget in ms for adaptive quality, e.g. 33 (0 = fixed quality)")
+    parser.add_argument("--quality-window", type=int, default=30,
+                        help="Number of frames averaged before each quality decision (default: 30)")
+    return parser
+
+
+class AdaptiveQualityController:
+    """
+    Step quality levels up or down to hold a per-frame latency budget
+
+    Args:
+        target_ms: Per-frame processing budget in milliseconds (0 disables adaptation)
+        window: Number of frames averaged before each decision
+        levels: Quality levels ordered from best to cheapest
+        start_level: Index of the initial level
+        downgrade_ratio: Step down when the average exceeds target * ratio
+        upgrade_ratio: Step up when the average is below target * ratio
+    """
+
+    def __init__(self, target_ms=33.0, window=30, levels=None, start_level=0,
+                 downgrade_ratio=1.1, upgrade_ratio=0.6):
+        self.target_ms = target_ms
+        self.levels = levels or QUALITY_LEVELS
+        self.index = start_level
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.samples = deque(maxlen=window)
+        self.changes = 0
+        self.logger = logging.getLogger("HandTalk")
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a controller from parsed add_quality_arguments options"""
+        return cls(target_ms=args.target_ms, window=args.quality_window)
+
+    @property
+    def enabled(self):
+        return self.target_ms > 0
+
+    @property
+    def level(self):
+        """The current QualityLevel"""
+        return self.levels[self.index]
+
+    def average_ms(self):
+        """Rolling average of the recorded frame latencies"""
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def record(self, frame_ms):
+        """
+        Record one frame's processing latency
+
+        Args:
+            frame_ms: Time spent processing the frame in milliseconds
+
+        Returns:
+            True if the quality level changed and the caller should apply it
+        """
+        if not self.enabled:
+            return False
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.samples.maxlen:
+            return False
+
+        average = self.average_ms()
+        if average > self.target_ms * self.downgrade_ratio and self.index < len(self.levels) - 1:
+            return self._step(+1, average)
+        if average < self.target_ms * self.upgrade_ratio and self.index > 0:
+            return self._step(-1, average)
+        return False
+
+    def _step(self, direction, average):
+        previous = self.level
+        self.index += direction
+        self.changes += 1
+        # Start a fresh window so the next decision only sees the new level
+        self.samples.clear()
+        current = self.level
+        message = (f"Quality {'lowered' if direction > 0 else 'raised'} to level {self.index} "
+                   f"(avg {average:.1f} ms vs {self.target_ms:.0f} ms budget): "
+                   f"model_complexity {previous.model_complexity}->{current.model_complexity}, "
+                   f"max_side {previous.max_side}->{current.max_side}, "
+                   f"frame_skip {previous.frame_skip}->{current.frame_skip}")
+        self.logger.info(message)
+        print(message)
+        return True
@@ -0,0 +1,171 @@
+"""
+Core recognition steps shared by the HandTalk recognizers and benchmarks
+
+Feature extraction from MediaPipe results, model loading and the confidence
+threshold logic live here so they can be used (and timed) without a camera
+or a MediaPipe install.
+"""
+
+import logging
+import os
+
+import joblib
+import numpy as np
+
+from feature_transform import model_feature_indices, model_transform
+from model_bundle import bundle_path, load_bundle
+
+# Library module: the entry-point scripts configure logging (setup_logging)
+logger = logging.getLogger("HandTalk")
+log_info = logger.info
+log_error = logger.error
+log_warning = logger.warning
+
+# 2 hands x 21 landmarks x 3 coordinates + 4 arm points x 3 coordinates
+HAND_FEATURES = 126
+POSE_FEATURES = 12
+FEATURE_COUNT = HAND_FEATURES + POSE_FEATURES
+
+# Pose landmarks used as features: elbows (13, 14) and wrists (15, 16)
+ARM_LANDMARKS = [13, 14, 15, 16]
+
+# Confidence thresholds used by the recognizers
+HIGH_CONFIDENCE_THRESHOLD = 0.7
+MEDIUM_CONFIDENCE_THRESHOLD = 0.4
+
+
+def feature_names():
+    """Column names of the 138 features, in CSV order"""
+    names = []
+    # Hand landmarks (both hands)
+    for hand in range(2):  # Two hands
+        for i in range(21):  # 21 landmarks per hand
+            names += [f"hand{hand}_x{i}", f"hand{hand}_y{i}", f"hand{hand}_z{i}"]
+
+    # Pose landmarks (hands and arms only)
+    for part in ["left_elbow", "right_elbow", "left_wrist", "right_wrist"]:
+        names += [f"{part}_x", f"{part}_y", f"{part}_z"]
+    return names
+
+
+def load_model(model_path="sign_language_model_bimanual.pkl"):
+    """
+    Load the trained bimanual model
+
+    Uses the model bundle next to the pickle (see model_bundle.py) when it is
+    at least as new as the pickle, so startup doesn't unpickle the forest.
+    A bundle built for a different feature layout raises BundleError.
+    """
+    try:
+        bundle = bundle_path(model_path)
+        if os.path.isdir(bundle) and (not os.path.exists(model_path)
+                                      or os.path.getmtime(bundle) >= os.path.getmtime(model_path)):
+            model = load_bundle(bundle)
+            dataset = model.manifest.get("dataset") or {}
+            log_info(f"Bimanual model bundle loaded from {bundle} ({model.feature_transform} features, "
+                     f"trained {model.manifest['created']}, dataset {dataset.get('sha256', 'unknown')[:12]})")
+            print(f"Bimanual model loaded from {bundle}")
+            return model
+        if os.path.isdir(bundle):
+            log_warning(f"{bundle} is older than {model_path}; loading the pickle")
+
+        if not os.path.exists(model_path):
+            error_msg = f"Bimanual model file {model_path} not found. Please train a bimanual model first."
+            log_error(error_msg)
+            raise FileNotFoundError(error_msg)
+
+        model = joblib.load(model_path)
+        indices = model_feature_indices(model)
+        width = f", {len(indices)} selected" if indices is not None else ""
+        log_info(f"Bimanual model loaded from {model_path} ({model_transform(model)} features{width})")
+        print(f"Bimanual model loaded from {model_path}")
+
+        return model
+    except Exception as e:
+        log_error(f"Error loading model: {str(e)}")
+        raise
+
+
+def extract_features(hand_results, pose_results):
+    """Extract features from MediaPipe results in the same format as training data"""
+    frame_data = []
+
+    # Extract hand landmarks (both hands if present)
+    if hasattr(hand_results, 'multi_hand_landmarks') and hand_results.multi_hand_landmarks:
+        for hand_landmarks in hand_results.multi_hand_landmarks:
+            # Extract hand landmark coordinates
+            for lm in hand_landmarks.landmark:
+                frame_data += [lm.x, lm.y, lm.z]
+        # If only one hand is detected, we still need to pad the data
+        if len(hand_results.multi_hand_landmarks) == 1:
+            # Add zero padding for the missing hand
+            frame_data += [0.0] * 63  # 21 landmarks * 3 coordinates each
+    else:
+        # If no hands detected, add zero padding for both hands
+        frame_data += [0.0] * HAND_FEATURES  # 2 hands * 21 landmarks * 3 coordinates each
+
+    # Extract pose landmarks (hands and arms only)
+    if hasattr(pose_results, 'pose_landmarks') and pose_results.pose_landmarks:
+        # Pose landmarks: 0-32 (33 total), focusing on elbows and wrists
+        landmarks = pose_results.pose_landmarks.landmark
+        pose_coords = []
+        for i in ARM_LANDMARKS:
+            if i < len(landmarks):
+                lm = landmarks[i]
+                pose_coords += [lm.x, lm.y, lm.z]
+        # Ensure we have exactly 12 pose coordinates (4 points * 3 coordinates x,y,z)
+        if len(pose_coords) >= POSE_FEATURES:
+            frame_data += pose_coords[:POSE_FEATURES]
+        else:
+            # Add zero padding if we don't have all pose landmarks
+            frame_data += [0.0] * POSE_FEATURES
+    else:
+        # Add zero padding if no pose detected
+        frame_data += [0.0] * POSE_FEATURES
+
+    return prepare_features(frame_data)
+
+
+def prepare_features(frame_data):
+    """Pad or truncate a raw feature list to 138 values and shape it as one model row"""
+    # Ensure we have exactly 138 features (126 hand + 12 pose)
+    if len(frame_data) > FEATURE_COUNT:
+        frame_data = frame_data[:FEATURE_COUNT]
+    elif len(frame_data) < FEATURE_COUNT:
+        frame_data = list(frame_data) + [0.0] * (FEATURE_COUNT - len(frame_data))
+
+    # Final validation
+    if len(frame_data) != FEATURE_COUNT:
+        log_warning(f"Feature count mismatch: expected {FEATURE_COUNT}, got {len(frame_data)}")
+
+    return np.array(frame_data, dtype=np.float64).reshape(1, -1)
+
+
+def confidence_level(max_proba):
+    """Map the top class probability to "High", "Medium" or "Low" """
+    if max_proba >= HIGH_CONFIDENCE_THRESHOLD:
+        return "High"
+    if max_proba >= MEDIUM_CONFIDENCE_THRESHOLD:
+        return "Medium"
+    return "Low"
+
+
+def top_predictions(prediction_proba, classes, k=3):
+    """Return the k most likely (class, probability) pairs"""
+    top_indices = np.argsort(prediction_proba)[::-1][:k]
+    return [(classes[idx], float(prediction_proba[idx])) for idx in top_indices]
+
+
+def describe_prediction(prediction_proba, classes, translator, dialect=None, k=3):
+    """Label, confidence, level, top-k and (for high confidence) translation of one prediction"""
+    best = int(np.argmax(prediction_proba))
+    label = str(classes[best])
+    max_proba = float(prediction_proba[best])
+    confidence = confidence_level(max_proba)
+    return {
+        "label": label,
+        "confidence": max_proba,
+        "level": confidence,
+        "top": [(str(name), prob) for name, prob in top_predictions(prediction_proba, classes, k)],
+        "translation": translator.translate(label, dialect) if confidence == "High" else None,
+    }
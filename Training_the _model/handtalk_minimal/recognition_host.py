@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Multi-stream HandTalk recognition host
+
+Serves several frame sources (camera stations, video files, ...) from one
+process. Every stream gets its own landmark worker thread with its own
+MediaPipe graphs, since hand/pose tracking is stateful per stream, while the
+model and translator are loaded once and shared. The shared classifier serves
+streams round-robin, one request per stream per round, so a fast stream
+cannot starve a slow one, and classifies all requests pending in a round with
+one batched predict_proba call. Per-stream FPS and the batch size / queueing
+delay distribution are reported periodically.
+
+Usage:
+    python recognition_host.py --source camera:0 --source camera:1
+    python recognition_host.py --source a.mp4 --source b.mp4 --pacing fast --no-display
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from logging_config import setup_logging
+from recognition_core import describe_prediction, extract_features
+from neighbor_classifier import add_classifier_arguments, load_classifier
+from translation_module import get_translator
+from frame_source import open_frame_source
+from overlay_renderer import OverlayCache, draw_arm_landmarks, draw_hand_landmarks
+from micro_batcher import BatchMetrics
+
+# Logging is configured in main(), so importing this module has no side effects
+logger = logging.getLogger("HandTalk")
+log_info = logger.info
+log_error = logger.error
+
+
+class SharedClassifier:
+    """
+    One model and translator shared by every stream
+
+    Each stream has a single request slot. The classifier thread takes every
+    pending slot (up to max_batch) in round-robin order, starting after the
+    stream it served last, and classifies them in one batch.
+    """
+
+    def __init__(self, model, translator, stream_count, max_batch=32):
+        self.model = model
+        self.translator = translator
+        self.max_batch = max_batch
+        self.metrics = BatchMetrics()
+        self._slots = [None] * stream_count
+        self._next = 0
+        self._condition = threading.Condition()
+        self._running = True
+        self.served = [0] * stream_count
+        self._thread = threading.Thread(target=self._run, name="classifier", daemon=True)
+        self._thread.start()
+
+    def submit(self, stream_id, features):
+        """Queue a 1x138 feature row for a stream and return a Future for its result"""
+        future = Future()
+        with self._condition:
+            self._slots[stream_id] = (features, future, time.perf_counter())
+            self._condition.notify()
+        return future
+
+    def classify(self, stream_id, features):
+        """Classify a feature row, blocking until the result is ready"""
+        return self.submit(stream_id, features).result()
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+    def _take_pending(self):
+        """Pop pending requests in round-robin order, up to max_batch (lock held)"""
+        count = len(self._slots)
+        pending = []
+        for offset in range(count):
+            stream_id = (self._next + offset) % count
+            if self._slots[stream_id] is not None:
+                pending.append((stream_id, self._slots[stream_id]))
+                self._slots[stream_id] = None
+                if len(pending) >= self.max_batch:
+                    break
+        if pending:
+            self._next = (pending[-1][0] + 1) % count
+        return pending
+
+    def _run(self):
+        while True:
+            with self._condition:
+                pending = self._take_pending()
+                while not pending and self._running:
+                    self._condition.wait()
+                    pending = self._take_pending()
+                if not pending:
+                    return
+            start = time.perf_counter()
+            try:
+                probabilities = self.model.predict_proba(np.vstack([features for _, (features, _, _) in pending]))
+            except Exception as e:
+                self._retry_separately(pending, e)
+                continue
+            self.metrics.record(len(pending), [(start - submitted) * 1000 for _, (_, _, submitted) in pending])
+            for (stream_id, (_, future, _)), prediction_proba in zip(pending, probabilities):
+                future.set_result(describe_prediction(prediction_proba, self.model.classes_, self.translator))
+                self.served[stream_id] += 1
+
+    def _retry_separately(self, pending, error):
+        """Classify a failed batch one stream at a time, so only the stream with the bad row gets the error"""
+        if len(pending) == 1:
+            pending[0][1][1].set_exception(error)
+            return
+        for stream_id, (features, future, _) in pending:
+            try:
+                prediction_proba = self.model.predict_proba(features)[0]
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result(describe_prediction(prediction_proba, self.model.classes_, self.translator))
+            self.served[stream_id] += 1
+
+
+class StreamWorker(threading.Thread):
+    """Landmark worker for one frame source"""
+
+    def __init__(self, stream_id, source, classifier, args):
+        super().__init__(name=f"stream-{stream_id}", daemon=True)
+        self.stream_id = stream_id
+        self.source = source
+        self.classifier = classifier
+        self.args = args
+        self.stop_event = threading.Event()
+        self.frames = 0
+        self.error = None
+        self._frame_times = deque(maxlen=60)
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def fps(self):
+        """Processed frames per second over the last 60 frames"""
+        times = self._frame_times
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def latest_frame(self):
+        with self._lock:
+            return self._latest
+
+    def run(self):
+        # Imported here so the host module itself can be loaded without MediaPipe
+        from recognize_gestures_bimanual import create_detectors
+
+        try:
+            frames = open_frame_source(self.source, pacing=self.args.pacing, loop=self.args.loop,
+                                       max_frames=self.args.max_frames)
+        except (OSError, ValueError) as e:
+            self.error = e
+            log_error(f"Stream {self.stream_id} ({self.source}) could not be opened: {str(e)}")
+            return
+        hands, pose = create_detectors()
+        overlay = OverlayCache()
+        try:
+            for frame in frames:
+                if self.stop_event.is_set():
+                    break
+                frame = cv2.flip(frame, 1)
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                hand_results = hands.process(rgb)
+                pose_results = pose.process(rgb)
+
+                if getattr(hand_results, 'multi_hand_landmarks', None):
+                    result = self.classifier.classify(self.stream_id, extract_features(hand_results, pose_results))
+                    if result["level"] == "High":
+                        overlay.set_text("gesture", f"Gesture: {result['label']} ({result['confidence']:.2f})",
+                                         (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                        overlay.set_text("translation", f"Translation: {result['translation']}", (10, 60),
+                                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                    else:
+                        overlay.set_text("gesture", f"Gesture: Unrecognized ({result['level']} Confidence)",
+                                         (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                        overlay.discard("translation")
+                else:
+                    overlay.discard("gesture", "translation")
+
+                if self.args.display:
+                    overlay.set_text("title", f"Stream {self.stream_id}: {self.source}", (10, frame.shape[0] - 10),
+                                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    draw_hand_landmarks(frame, hand_results)
+                    draw_arm_landmarks(frame, pose_results)
+                    overlay.render(frame)
+                    with self._lock:
+                        self._latest = frame
+                self.frames += 1
+                self._frame_times.append(time.perf_counter())
+        except Exception as e:
+            self.error = e
+            log_error(f"Stream {self.stream_id} ({self.source}) failed: {str(e)}")
+        finally:
+            frames.close()
+            hands.close()
+            pose.close()
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Serve several HandTalk frame sources from one process")
+    parser.add_argument("--source", action="append", required=True,
+                        help="Frame source for one stream (repeat for more streams): camera[:N], video file, image directory or 'synthetic'")
+    parser.add_argument("--pacing", choices=["realtime", "fast"], default="realtime",
+                        help="Replay file/synthetic sources at their frame rate or as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="Restart file sources when they run out")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop each stream after this many frames (0 = no limit)")
+    parser.add_argument("--model", default="sign_language_model_bimanual.pkl", help="Model file shared by all streams")
+    parser.add_argument("--dialect", default="english", help="Translation dialect")
+    parser.add_argument("--no-display", dest="display", action="store_false", help="Run without preview windows")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="Seconds between FPS reports")
+    add_classifier_arguments(parser)
+    return parser.parse_args()
+
+
+def report(workers, classifier):
+    """Print and log per-stream FPS and the classifier's batching"""
+    for worker in workers:
+        message = (f"Stream {worker.stream_id} ({worker.source}): {worker.fps():.1f} FPS, "
+                   f"{worker.frames} frames, {classifier.served[worker.stream_id]} predictions")
+        log_info(message)
+        print(message)
+    batching = classifier.metrics.summary()
+    if batching["batches"]:
+        message = (f"Classifier: mean batch size {batching['mean_batch_size']}, "
+                   f"queueing delay p50 {batching['queue_delay_p50_ms']} ms, p95 {batching['queue_delay_p95_ms']} ms")
+        log_info(message)
+        print(message)
+
+
+def main():
+    """Start one worker per source and display / report until all streams end"""
+    args = parse_args()
+    print("=== HandTalk Multi-stream Recognition Host ===")
+    setup_logging()
+
+    try:
+        model = load_classifier(args, args.model)
+    except Exception as e:
+        print(f"❌ Failed to load model: {str(e)}")
+        return 1
+    translator = get_translator()
+    if not translator.set_dialect(args.dialect):
+        print(f"Unknown dialect '{args.dialect}', using {translator.current_dialect}")
+
+    classifier = SharedClassifier(model, translator, len(args.source))
+    workers = [StreamWorker(i, source, classifier, args) for i, source in enumerate(args.source)]
+    for worker in workers:
+        worker.start()
+    print(f"Serving {len(workers)} streams. Press 'q' in a preview window (or Ctrl+C) to quit.")
+
+    last_report = time.monotonic()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            if args.display:
+                # OpenCV windows must be driven from the main thread
+                for worker in workers:
+                    frame = worker.latest_frame()
+                    if frame is not None:
+                        cv2.imshow(f"HandTalk - Stream {worker.stream_id}", frame)
+                if cv2.waitKey(15) & 0xFF == ord('q'):
+                    break
+            else:
+                time.sleep(0.05)
+            if time.monotonic() - last_report >= args.report_interval:
+                report(workers, classifier)
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nHost interrupted by user")
+    finally:
+        for worker in workers:
+            worker.stop_event.set()
+        for worker in workers:
+            worker.join()
+        classifier.close()
+        report(workers, classifier)
+        if args.display:
+            cv2.destroyAllWindows()
+    return 1 if any(worker.error for worker in workers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
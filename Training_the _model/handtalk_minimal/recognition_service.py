@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Local landmark-in, prediction-out HandTalk recognition service
+
+A small HTTP/1.1 server (standard library only) that keeps the model loaded
+and answers classification requests for 138-feature landmark vectors, so the
+Android app and desktop tools can share one classifier. Connections are kept
+alive between requests, and vectors from concurrent requests are classified
+together in micro-batches (--batch-wait-ms, --max-batch).
+
+Endpoints:
+    GET  /health                  -> {"status": "ok", "classes": [...], "features": 138}
+    GET  /dialects                -> {"dialects": [...]}
+    GET  /metrics                 -> micro-batch size distribution and queueing delay
+    POST /predict?dialect=filipino&top_k=3
+         application/json:         {"features": [138 floats] or [[138 floats], ...],
+                                    "dialect": "...", "top_k": 3}
+         application/octet-stream: N x 138 little-endian float32 values
+
+A single vector returns {"label", "confidence", "level", "top", "translation"};
+several vectors return {"results": [...]} in request order.
+
+Usage:
+    python recognition_service.py --port 8765
+    python service_load_test.py --url http://127.0.0.1:8765 --binary
+"""
+
+import argparse
+import logging
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from logging_config import setup_logging
+from recognition_core import FEATURE_COUNT, describe_prediction
+from neighbor_classifier import add_classifier_arguments, load_classifier
+from translation_module import get_translator
+from micro_batcher import MicroBatcher, add_batching_arguments
+
+# Logging is configured in main(), so importing this module has no side effects
+logger = logging.getLogger("HandTalk")
+log_info = logger.info
+log_error = logger.error
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+BINARY_DTYPE = np.dtype('<f4')
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class RecognitionService:
+    """Model and translator shared by all request handler threads"""
+
+    def __init__(self, model, translator, default_dialect="english", top_k=3, batcher=None):
+        self.model = model
+        self.translator = translator
+        self.default_dialect = default_dialect
+        self.top_k = top_k
+        # Classify through the micro-batcher when there is one
+        self.classifier = batcher or model
+
+    def predict(self, rows, dialect=None, top_k=None):
+        """Describe the predictions for an (N, 138) feature array"""
+        dialect = (dialect or self.default_dialect).lower()
+        if dialect not in self.translator.translations:
+            raise ValueError(f"Unknown dialect '{dialect}'")
+        probabilities = self.classifier.predict_proba(rows)
+        return [describe_prediction(proba, self.model.classes_, self.translator, dialect, top_k or self.top_k)
+                for proba in probabilities]
+
+
+def parse_top_k(value):
+    """Validated top_k request parameter"""
+    top_k = int(value)
+    if top_k < 1:
+        raise ValueError(f"top_k must be at least 1, got {top_k}")
+    return top_k
+
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler; the service is attached to the server as server.service"""
+
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY every
+    # response on a kept-alive connection waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "features": FEATURE_COUNT,
+                                  "classes": [str(c) for c in service.model.classes_]})
+        elif path == "/dialects":
+            self._send_json(200, {"dialects": service.translator.get_available_dialects()})
+        elif path == "/metrics":
+            metrics = getattr(service.classifier, "metrics", None)
+            self._send_json(200, {"batching": metrics.summary() if metrics else None})
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        # The body is read (or the connection closed) before any reply, so a
+        # rejected request can't leave bytes behind for the next one on a
+        # kept-alive connection
+        body = self._read_body()
+        if url.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        if not body:
+            self._send_json(400, {"error": f"Content-Length must be between 1 and {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            query = parse_qs(url.query)
+            dialect = query.get("dialect", [None])[0]
+            top_k = parse_top_k(query["top_k"][0]) if "top_k" in query else None
+
+            if self.headers.get("Content-Type", "").startswith(BINARY_CONTENT_TYPE):
+                if len(body) % (FEATURE_COUNT * BINARY_DTYPE.itemsize):
+                    raise ValueError(f"Binary body must hold N x {FEATURE_COUNT} float32 values")
+                rows = np.frombuffer(body, dtype=BINARY_DTYPE).reshape(-1, FEATURE_COUNT).astype(np.float64)
+            else:
+                payload = json.loads(body)
+                if not isinstance(payload, dict):
+                    raise ValueError('JSON body must be an object with a "features" key')
+                dialect = payload.get("dialect", dialect)
+                if dialect is not None and not isinstance(dialect, str):
+                    raise ValueError("dialect must be a string")
+                if "top_k" in payload:
+                    top_k = parse_top_k(payload["top_k"])
+                rows = np.asarray(payload["features"], dtype=np.float64)
+                if rows.ndim == 1:
+                    rows = rows.reshape(1, -1)
+                if rows.ndim != 2 or rows.shape[1] != FEATURE_COUNT:
+                    raise ValueError(f"Expected {FEATURE_COUNT} features per vector, got shape {rows.shape}")
+            # Rejected here rather than in the shared batch, where it would fail other clients' rows too
+            if not np.isfinite(rows).all():
+                raise ValueError("Features must be finite numbers")
+
+            results = self.server.service.predict(rows, dialect, top_k)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            log_error(f"Prediction request failed: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, results[0] if len(results) == 1 else {"results": results})
+
+    def _read_body(self):
+        """Request body, or None (closing the connection) if its length is invalid or too large"""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if "Transfer-Encoding" in self.headers or length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Per-request access logging would dominate the request cost
+        pass
+
+
+def create_server(service, host="127.0.0.1", port=8765):
+    """Create (but don't start) a threaded HTTP server for the service"""
+    server = ThreadingHTTPServer((host, port), RecognitionRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Local HandTalk recognition service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--model", default="sign_language_model_bimanual.pkl", help="Model file to serve")
+    parser.add_argument("--dialect", default="english", help="Default translation dialect")
+    parser.add_argument("--top-k", type=int, default=3, help="Default number of top predictions returned")
+    add_batching_arguments(parser)
+    add_classifier_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Load the model and serve until interrupted"""
+    args = parse_args()
+    setup_logging()
+    try:
+        model = load_classifier(args, args.model)
+    except Exception as e:
+        print(f"❌ Failed to load model: {str(e)}")
+        return 1
+
+    batcher = MicroBatcher.from_args(model, args)
+    service = RecognitionService(model, get_translator(), args.dialect, args.top_k, batcher)
+    server = create_server(service, args.host, args.port)
+    message = f"HandTalk recognition service listening on http://{args.host}:{args.port}"
+    log_info(message)
+    print(message)
+    print("Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nService stopped")
+    finally:
+        server.server_close()
+        if batcher:
+            batcher.close()
+            summary = batcher.metrics.summary()
+            print(f"Micro-batching: {summary['batches']} batches, mean size {summary['mean_batch_size']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import sys
+import argparse
 
 import mediapipe as mp
 import cv2
@@ -6,6 +7,7 @@ import numpy as np
 import pandas as pd
 import joblib
 import os
+import time
 from datetime import datetime
 
 # Import logging configuration
@@ -20,6 +22,33 @@ import joblib
 # Import translation module
 from translation_module import get_translator
 
+# Import shared feature extraction, model loading and confidence thresholds
+from recognition_core import confidence_level, extract_features, top_predictions
+
+# Import the optional nearest-neighbor classifier backend
+from neighbor_classifier import add_classifier_arguments, load_classifier
+
+# Import overlay rendering helpers
+from overlay_renderer import OverlayCache, draw_arm_landmarks, draw_hand_landmarks, draw_text_with_background
+
+# Import region-of-interest inference
+from roi_tracker import ROITracker, add_roi_arguments
+
+# Import adaptive quality control
+from quality_controller import AdaptiveQualityController, add_quality_arguments
+
+# Import pluggable frame sources
+from frame_source import add_source_arguments, open_from_args
+
+# Import per-stage latency histograms
+from latency_stats import LatencyHistograms, add_stats_arguments
+
+# Import the optional DTW matcher over recorded motion sequences
+from sequence_matcher import FeatureWindow, SequenceMatcher, add_sequence_arguments
+
+# Import landmark interpolation between detector runs
+from landmark_interpolation import LandmarkInterpolator, add_interpolation_arguments
+
 # Suppress protobuf deprecation warnings
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='google.protobuf.symbol_database')
@@ -31,103 +60,47 @@ log_error = logger.error
 log_debug = logger.debug
 log_warning = logger.warning
 
-def load_model(model_path="sign_language_model_bimanual.pkl"):
-    """Load the trained bimanual model"""
-    try:
-        if not os.path.exists(model_path):
-            error_msg = f"Bimanual model file {model_path} not found. Please train a bimanual model first."
-            log_error(error_msg)
-            raise FileNotFoundError(error_msg)
-        
-        model = joblib.load(model_path)
-        log_info(f"Bimanual model loaded from {model_path}")
-        print(f"Bimanual model loaded from {model_path}")
-        
-        # Print model information for debugging
-        print(f"Model classes: {model.classes_}")
-        print(f"Number of classes: {len(model.classes_)}")
-        
-        return model
-    except Exception as e:
-        log_error(f"Error loading model: {str(e)}")
-        raise
-
-def extract_features(hand_results, pose_results):
-    """Extract features from MediaPipe results in the same format as training data"""
-    frame_data = []
-    
-    # Extract hand landmarks (both hands if present)
-    if hasattr(hand_results, 'multi_hand_landmarks') and hand_results.multi_hand_landmarks:
-        for hand_landmarks in hand_results.multi_hand_landmarks:
-            # Extract hand landmark coordinates
-            for lm in hand_landmarks.landmark:
-                frame_data += [lm.x, lm.y, lm.z]
-        # If only one hand is detected, we still need to pad the data
-        if len(hand_results.multi_hand_landmarks) == 1:
-            # Add zero padding for the missing hand
-            frame_data += [0.0] * 63  # 21 landmarks * 3 coordinates each
-    else:
-        # If no hands detected, add zero padding for both hands
-        frame_data += [0.0] * 126  # 2 hands * 21 landmarks * 3 coordinates each
-        
-    # Extract pose landmarks (hands and arms only)
-    if hasattr(pose_results, 'pose_landmarks') and pose_results.pose_landmarks:
-        # Extract pose landmark coordinates (focus on upper body landmarks)
-        # Pose landmarks: 0-32 (33 total), focusing on:
-        # Elbows: 13, 14
-        # Wrists: 15, 16
-        pose_coords = []
-        for i, lm in enumerate(pose_results.pose_landmarks.landmark):
-            # Focus on hands and arms landmarks only
-            if i in [13, 14, 15, 16]:
-                pose_coords += [lm.x, lm.y, lm.z]
-        # Ensure we have exactly 12 pose coordinates (4 points * 3 coordinates x,y,z)
-        if len(pose_coords) >= 12:
-            frame_data += pose_coords[:12]
-        else:
-            # Add zero padding if we don't have all pose landmarks
-            frame_data += [0.0] * 12
-    else:
-        # Add zero padding if no pose detected
-        frame_data += [0.0] * 12
-    
-    # Debug: Print the number of features
-    # log_debug(f"Extracted {len(frame_data)} features")
-    # print(f"Debug: Extracted {len(frame_data)} features")
-    
-    # Ensure we have exactly 138 features (126 hand + 12 pose)
-    if len(frame_data) > 138:
-        frame_data = frame_data[:138]
-    elif len(frame_data) < 138:
-        frame_data += [0.0] * (138 - len(frame_data))
-    
-    # Final validation
-    if len(frame_data) != 138:
-        log_warning(f"Feature count mismatch: expected 138, got {len(frame_data)}")
-        # print(f"Warning: Feature count mismatch: expected 138, got {len(frame_data)}")
-        
-    return np.array(frame_data).reshape(1, -1)
-
-def draw_text_with_background(frame, text, position, font, font_scale, text_color, thickness, bg_color=(128, 128, 128), padding=5):
-    """Draw text with a background rectangle for better visibility"""
-    # Get text size
-    text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+def create_detectors(model_complexity=1):
+    """Create the MediaPipe Hands and Pose graphs"""
+    import mediapipe.python.solutions.hands as mp_hands
+    import mediapipe.python.solutions.pose as mp_pose
+    import mediapipe.python.solutions.drawing_utils as mp_drawing
     
-    # Calculate background rectangle coordinates
-    x, y = position
-    bg_coords = (
-        (x - padding, y - text_size[1] - padding),
-        (x + text_size[0] + padding, y + padding)
+    hands = mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,
+        min_detection_confidence=0.5,  # Reduced from 0.7 for better detection
+        min_tracking_confidence=0.5,   # Reduced from 0.7 for better tracking
+        model_complexity=model_complexity
     )
     
-    # Draw background rectangle
-    cv2.rectangle(frame, bg_coords[0], bg_coords[1], bg_color, -1)
+    pose = mp_pose.Pose(
+        static_image_mode=False,
+        min_detection_confidence=0.5,  # Reduced from 0.7 for better detection
+        min_tracking_confidence=0.5,   # Reduced from 0.7 for better tracking
+        enable_segmentation=False,
+        smooth_landmarks=True,
+        model_complexity=model_complexity
+    )
     
-    # Draw text
-    cv2.putText(frame, text, position, font, font_scale, text_color, thickness)
+    return hands, pose
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="HandTalk real-time gesture recognition")
+    add_roi_arguments(parser)
+    add_quality_arguments(parser)
+    add_source_arguments(parser)
+    add_stats_arguments(parser)
+    add_classifier_arguments(parser)
+    add_sequence_arguments(parser)
+    add_interpolation_arguments(parser)
+    return parser.parse_args()
 
 def main():
     """Main function for real-time gesture recognition"""
+    args = parse_args()
+    
     print("=== HandTalk Real-time Gesture Recognition ===")
     print()
     
@@ -174,7 +147,7 @@ def main():
     
     # Load the trained model
     try:
-        model = load_model()
+        model = load_classifier(args)
         # Print model information for debugging
         print(f"Model classes: {model.classes_}")
         print(f"Number of classes: {len(model.classes_)}")
@@ -183,33 +156,17 @@ def main():
         print("   Please make sure you have trained a model first.")
         return
     
-    # Setup MediaPipe
-    import mediapipe.python.solutions.hands as mp_hands
-    import mediapipe.python.solutions.pose as mp_pose
-    import mediapipe.python.solutions.drawing_utils as mp_drawing
-    
-    hands = mp_hands.Hands(
-        static_image_mode=False,
-        max_num_hands=2,
-        min_detection_confidence=0.5,  # Reduced from 0.7 for better detection
-        min_tracking_confidence=0.5,   # Reduced from 0.7 for better tracking
-        model_complexity=1
-    )
-    
-    pose = mp_pose.Pose(
-        static_image_mode=False,
-        min_detection_confidence=0.5,  # Reduced from 0.7 for better detection
-        min_tracking_confidence=0.5,   # Reduced from 0.7 for better tracking
-        enable_segmentation=False,
-        smooth_landmarks=True,
-        model_complexity=1
-    )
+    # Setup frame source (camera by default, see --source)
+    try:
+        frames = open_from_args(args)
+    except (OSError, ValueError) as e:
+        log_error(f"Could not open frame source {args.source}: {str(e)}")
+        print(f"❌ Could not open frame source {args.source}: {str(e)}")
+        return
     
-    # Setup camera
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)            # Force 30 FPS for consistency
+    # Setup MediaPipe
+    hands, pose = create_detectors()
+    hands_complexity = 1
     
     print("Starting real-time gesture recognition...")
     print("Show your hands to the camera to begin recognizing gestures.")
@@ -221,69 +178,130 @@ def main():
     prediction_count = 0
     min_confidence = 0.2  # Lowered from 0.3 to 0.2 for better sensitivity
     
+    # Static and rarely-changing text is rasterized once and re-stamped per frame
+    overlay = OverlayCache()
+    
+    # Landmark inference on a crop around the previously tracked hands (--roi)
+    roi = ROITracker.from_args(args)
+    if roi.enabled:
+        log_info(f"ROI mode enabled (margin={roi.margin}, max_side={roi.max_side})")
+    
+    # Adaptive model complexity / input resolution / frame skip (--target-ms)
+    quality = AdaptiveQualityController.from_args(args)
+    base_max_side = roi.max_side
+    frame_skip = 1
+    frame_count = 0
+    prediction_proba = None
+    if quality.enabled:
+        log_info(f"Adaptive quality enabled with a {quality.target_ms:.0f} ms frame budget")
+        roi.max_side = min(filter(None, [base_max_side, quality.level.max_side]))
+    
+    # Per-stage latency histograms, dumped to --stats-file every --stats-interval seconds
+    stats = LatencyHistograms.from_args(args)
+    
+    # Motion sequence matching over the last frames (--sequence-match)
+    sequences = SequenceMatcher.from_args(args)
+    sequence_window = FeatureWindow()
+    if sequences:
+        log_info(f"Sequence matching enabled with {len(sequences.templates)} templates")
+    
+    # Detectors every k-th frame with extrapolated landmarks in between (--interpolate)
+    interpolator = LandmarkInterpolator.from_args(args)
+    interpolated = False
+    if interpolator:
+        log_info(f"Landmark interpolation enabled (max stride {interpolator.max_stride})")
+    
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("Failed to read frame from camera")
-                break
-            
+        for frame in frames:
+            frame_start = time.perf_counter()
+            frame_count += 1
             frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            stats.lap("capture")
             
-            # Process hands and pose
-            hand_results = hands.process(rgb)
-            pose_results = pose.process(rgb)
+            # Process hands and pose (cropped to the tracked region in ROI mode);
+            # skipped frames reuse the previous landmarks and prediction, or
+            # extrapolate them with --interpolate
+            if (interpolator.due() if interpolator else frame_count % frame_skip == 0):
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                stats.lap("color")
+                hand_results, pose_results = roi.process(hands, pose, rgb)
+                stats.add("hands", roi.last_hands_ns)
+                stats.add("pose", roi.last_pose_ns)
+                stats.skip()
+                prediction_proba = None
+                interpolated = False
+            elif interpolator:
+                prediction_proba = None
+                interpolated = True
+            
+            # Draw hand skeletons and tracked arm landmarks
+            draw_hand_landmarks(frame, hand_results)
+            draw_arm_landmarks(frame, pose_results)
+            stats.lap("render")
             
             # Recognize gesture
             multi_hand_landmarks = getattr(hand_results, 'multi_hand_landmarks', None)
             if multi_hand_landmarks:
                 try:
-                    # Extract features
-                    features = extract_features(hand_results, pose_results)
-                    
-                    # Make prediction
-                    prediction_proba = model.predict_proba(features)[0]
+                    if prediction_proba is None:
+                        # Extract features (or extrapolate them between detector runs)
+                        if interpolated:
+                            features = interpolator.predict(frame_start)
+                        else:
+                            features = extract_features(hand_results, pose_results)
+                            if interpolator:
+                                interpolator.update(features, frame_start)
+                        stats.lap("features")
+                        
+                        # Make prediction
+                        prediction_proba = model.predict_proba(features)[0]
+                        
+                        # Match the recent motion against the recorded sequences
+                        if sequences:
+                            sequence_window.append(features[0])
+                            if sequence_window.full() and sequence_window.appended % args.sequence_interval == 0:
+                                sequence_label, sequence_distance, _ = sequences.match(sequence_window.array())
+                                overlay.set_text("sequence", f"Sequence: {sequence_label} ({sequence_distance:.2f})",
+                                                 (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2)
                     max_proba = np.max(prediction_proba)
                     
-                    # Define confidence thresholds
-                    high_confidence_threshold = 0.7
-                    medium_confidence_threshold = 0.4
+                    # Apply the shared confidence thresholds (0.7 high, 0.4 medium)
+                    confidence = confidence_level(max_proba)
+                    stats.lap("classify")
                     
-                    if max_proba >= high_confidence_threshold:
+                    if confidence == "High":
                         # High confidence - display the gesture
                         predicted_class = model.classes_[np.argmax(prediction_proba)]
                         
                         # Display prediction with confidence details
                         display_text = f"Gesture: {predicted_class}"
                         translated_text = translator.translate(predicted_class)
+                        stats.lap("translate")
                         confidence_text = f"Confidence: {max_proba:.2f} (High)"
                         
                         # Show all probabilities for debugging (top 3)
-                        top_indices = np.argsort(prediction_proba)[::-1][:3]
                         prob_details = "Top predictions: "
-                        for i, idx in enumerate(top_indices):
-                            class_name = model.classes_[idx]
-                            prob = prediction_proba[idx]
+                        for class_name, prob in top_predictions(prediction_proba, model.classes_, 3):
                             prob_details += f"{class_name}({prob:.2f}) "
                         
-                        # Draw predictions on frame
-                        draw_text_with_background(frame, display_text, (10, 30),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)  # Green
-                        draw_text_with_background(frame, f"Translation: {translated_text}", (10, 60),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                        # Draw predictions on frame (gesture and translation only change with the prediction)
+                        overlay.set_text("gesture", display_text, (10, 30),
+                                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)  # Green
+                        overlay.set_text("translation", f"Translation: {translated_text}", (10, 60),
+                                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
                         draw_text_with_background(frame, confidence_text, (10, 90),
                                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)  # Green
                         draw_text_with_background(frame, prob_details, (10, 120),
                                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                    elif max_proba >= medium_confidence_threshold:
+                    elif confidence == "Medium":
                         # Medium confidence - show as unrecognized
                         confidence_text = f"Confidence: {max_proba:.2f} (Medium)"
                         display_text = "Gesture: Unrecognized (Medium Confidence)"
                         
                         # Draw medium confidence message
-                        draw_text_with_background(frame, display_text, (10, 30),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)  # Yellow
+                        overlay.set_text("gesture", display_text, (10, 30),
+                                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)  # Yellow
+                        overlay.discard("translation")
                         draw_text_with_background(frame, confidence_text, (10, 60),
                                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)  # Yellow
                     else:
@@ -292,26 +310,57 @@ def main():
                         display_text = "Gesture: Unrecognized (Low Confidence)"
                         
                         # Draw low confidence message
-                        draw_text_with_background(frame, display_text, (10, 30),
-                                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)  # Red
+                        overlay.set_text("gesture", display_text, (10, 30),
+                                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)  # Red
+                        overlay.discard("translation")
                         draw_text_with_background(frame, confidence_text, (10, 60),
                                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)  # Red
                 except Exception as e:
                     log_error(f"Error during prediction: {str(e)}")
-                    draw_text_with_background(frame, "Prediction error", (10, 30),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                    overlay.set_text("gesture", "Prediction error", (10, 30),
+                                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                    overlay.discard("translation")
+            else:
+                overlay.discard("gesture", "translation", "sequence")
+                sequence_window.clear()
+                if interpolator:
+                    interpolator.reset()
             
             # Display instructions
-            draw_text_with_background(frame, "Real-time Gesture Recognition", (10, frame.shape[0] - 30),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            draw_text_with_background(frame, "Press 'q' to quit", (10, frame.shape[0] - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            overlay.set_text("title", "Real-time Gesture Recognition", (10, frame.shape[0] - 30),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            overlay.set_text("quit", "Press 'q' to quit", (10, frame.shape[0] - 10),
+                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            
+            # Per-stage latency table (--show-stats), refreshed twice a second
+            if args.show_stats and frame_count % 15 == 0:
+                for i, line in enumerate(stats.overlay_lines()):
+                    overlay.set_text(f"stats_{i}", line, (frame.shape[1] - 230, 20 + 18 * i),
+                                     cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, bg_color=(64, 64, 64))
+            overlay.render(frame)
+            stats.lap("render")
+            
+            # Hold the frame budget by adjusting detector quality
+            if quality.record((time.perf_counter() - frame_start) * 1000):
+                level = quality.level
+                if level.model_complexity != hands_complexity:
+                    hands.close()
+                    pose.close()
+                    hands, pose = create_detectors(level.model_complexity)
+                    hands_complexity = level.model_complexity
+                roi.max_side = min(filter(None, [base_max_side, level.max_side]))
+                frame_skip = level.frame_skip
+            stats.skip()
             
             # Show frame
             cv2.imshow("HandTalk - Real-time Gesture Recognition", frame)
             
             # Exit on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            key = cv2.waitKey(1) & 0xFF
+            stats.lap("display")
+            stats.end_frame()
+            stats.maybe_dump()
+            if key == ord('q'):
                 break
                 
     except KeyboardInterrupt:
@@ -320,8 +369,16 @@ def main():
         log_error(f"Error in main recognition loop: {str(e)}")
         print(f"Error in recognition: {str(e)}")
     finally:
+        if roi.enabled:
+            print(f"ROI mode processed {roi.pixel_ratio():.0%} of full-frame pixels "
+                  f"({roi.full_frame_passes}/{roi.frames} full-frame passes, {roi.retry_passes} after a lost track, "
+                  f"{roi.graph_resets} graph resets)")
+        if interpolator:
+            print(f"Interpolation ran the detectors on {interpolator.detection_ratio():.0%} of frames with hands")
+        if stats.maybe_dump(force=True):
+            print(f"Latency statistics saved to {stats.stats_path}")
         # Cleanup
-        cap.release()
+        frames.close()
         cv2.destroyAllWindows()
         hands.close()
         pose.close()
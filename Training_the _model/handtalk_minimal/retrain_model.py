@@ -6,8 +6,12 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
-import joblib
 import os
+import argparse
+
+from augmentation import add_augmentation_arguments, augment_dataset
+from feature_transform import add_transform_arguments, make_model
+from model_bundle import save_model
 
 def load_and_prepare_data(csv_path="data/gestures_bimanual.csv"):
     """Load and prepare the bimanual gesture data for training"""
@@ -33,7 +37,16 @@ def load_and_prepare_data(csv_path="data/gestures_bimanual.csv"):
         print(f"Error loading data: {str(e)}")
         raise
 
-def train_model():
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Retrain the HandTalk gesture model")
+    add_augmentation_arguments(parser)
+    add_transform_arguments(parser)
+    parser.add_argument("--n-estimators", type=int, default=100,
+                        help="Number of trees (invariant features need far fewer, e.g. 20)")
+    return parser.parse_args()
+
+def train_model(augment=0, augment_workers=0, mirror=True, seed=42, transform="raw", n_estimators=100):
     """Train the model with current data"""
     try:
         print("=== HandTalk Model Retraining ===")
@@ -45,14 +58,20 @@ def train_model():
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         print(f"Data split: {len(X_train)} training samples, {len(X_test)} testing samples")
         
+        # Augment the training split only, so the test split stays real data
+        if augment:
+            X_train, y_train = augment_dataset(X_train, y_train, copies=augment, seed=seed,
+                                               workers=augment_workers, mirror_prob=0.5 if mirror else 0.0)
+            print(f"Augmented training data: {len(X_train)} samples ({augment} copies per sample)")
+        
         # Create and train the model
-        model = RandomForestClassifier(
-            n_estimators=100, 
+        model = make_model(RandomForestClassifier(
+            n_estimators=n_estimators, 
             random_state=42,
             # Add parameters to handle class imbalance
             class_weight='balanced'
-        )
-        print("Training Random Forest classifier...")
+        ), transform)
+        print(f"Training Random Forest classifier ({n_estimators} trees, {transform} features)...")
         model.fit(X_train, y_train)
         
         # Evaluate the model
@@ -63,10 +82,10 @@ def train_model():
         print("\nClassification Report:")
         print(classification_report(y_test, y_pred))
         
-        # Save model
+        # Save model (pickle plus memory-mappable bundle)
         model_filename = "sign_language_model_bimanual.pkl"
-        joblib.dump(model, model_filename)
-        print(f"Model saved as {model_filename}")
+        bundle = save_model(model, model_filename, {"accuracy": round(float(accuracy), 4)}, "data/gestures_bimanual.csv")
+        print(f"Model saved as {model_filename} ({os.path.getsize(model_filename) / 1024:.0f} KB) and {bundle}")
         
         print("\n✅ Model retraining completed successfully!")
         print("Model is ready for real-time gesture recognition.")
@@ -78,4 +97,5 @@ def train_model():
         raise
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    args = parse_args()
+    train_model(args.augment, args.augment_workers, args.mirror, args.seed, args.features, args.n_estimators)
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Region-of-interest landmark inference for HandTalk
+
+Instead of handing the full camera frame to MediaPipe every frame, the
+previous frame's hand landmarks and arm pose landmarks (shoulders, elbows,
+wrists) define a crop window with a margin around the signer's hands. The
+crop is optionally downscaled before detection and the resulting landmarks
+are remapped to full-frame normalized coordinates in place, so extracted
+features are the same as in full-frame mode.
+
+The crop window is sticky: it only moves when the tracked region leaves it,
+which keeps the input to MediaPipe's own tracker stable between frames.
+The graphs track in the coordinates of their input, so they are reset
+whenever the window changes (including switches to and from the full
+frame) and start a fresh track instead of carrying one over from another
+crop. On track loss the frame is re-run at full resolution, and a full-frame
+pass is forced periodically so hands entering elsewhere are picked up.
+
+Such a frame runs both graphs twice (plus the resets), and last_hands_ns /
+last_pose_ns include every pass, so the per-frame timing shows the cost;
+retry_passes counts how often it happened.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Shoulders, elbows and wrists - enough arm context for the pose model
+ROI_POSE_LANDMARKS = [11, 12, 13, 14, 15, 16]
+
+
+def add_roi_arguments(parser):
+    """Add the ROI command line options to an argparse parser"""
+    parser.add_argument("--roi", action="store_true",
+                        help="Run MediaPipe on a crop around the previously tracked hands and arms")
+    parser.add_argument("--roi-margin", type=float, default=0.25,
+                        help="Margin around the tracked region, as a fraction of its size (default: 0.25)")
+    parser.add_argument("--roi-max-side", type=int, default=0,
+                        help="Downscale the detector input so its longest side is at most this many pixels (0 = no downscale)")
+    parser.add_argument("--roi-refresh", type=int, default=30,
+                        help="Force a full-frame pass every N frames to pick up new hands (default: 30)")
+    return parser
+
+
+class ROITracker:
+    """
+    Crop (and optionally downscale) MediaPipe input around the tracked hands
+
+    Args:
+        enabled: When False, process() just runs both graphs on the full frame
+        margin: Margin added around the tracked region, relative to its size
+        max_side: Longest side of the detector input in pixels (0 = no downscale)
+        refresh_interval: Force a full-frame pass every N frames (0 = never)
+        min_size: Smallest crop side in pixels
+    """
+
+    def __init__(self, enabled=True, margin=0.25, max_side=0, refresh_interval=30, min_size=160):
+        self.enabled = enabled
+        self.margin = margin
+        self.max_side = max_side
+        self.refresh_interval = refresh_interval
+        self.min_size = min_size
+        self.box = None  # (x0, y0, x1, y1) in full-frame pixels, None = full frame
+        self._pose_tracked = False
+        self.frames = 0
+        self.full_frame_passes = 0
+        self.pixels_processed = 0
+        self.pixels_full = 0
+        self.retry_passes = 0
+        self.graph_resets = 0
+        self._graphs = None
+        self._graph_box = None  # Window the graphs are currently tracking in
+        # Time spent inside the hands / pose graphs for the last processed
+        # frame, including a full-frame retry and graph resets
+        self.last_hands_ns = 0
+        self.last_pose_ns = 0
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a tracker from parsed add_roi_arguments options"""
+        return cls(enabled=args.roi, margin=args.roi_margin,
+                   max_side=args.roi_max_side, refresh_interval=args.roi_refresh)
+
+    def process(self, hands, pose, rgb):
+        """
+        Run the hands and pose graphs on the current region of interest
+
+        Args:
+            hands: mediapipe Hands instance
+            pose: mediapipe Pose instance
+            rgb: Full RGB frame
+
+        Returns:
+            (hand_results, pose_results) with landmarks in full-frame coordinates
+        """
+        h, w = rgb.shape[:2]
+        self.frames += 1
+        self.pixels_full += h * w
+        self.last_hands_ns = self.last_pose_ns = 0
+
+        box = self.box if self.enabled else None
+        if box is not None and self.refresh_interval and self.frames % self.refresh_interval == 0:
+            box = None
+
+        hand_results, pose_results = self._run(hands, pose, rgb, box)
+
+        # Track lost inside the crop - retry this frame on the full image
+        if box is not None and (not getattr(hand_results, 'multi_hand_landmarks', None)
+                                or (self._pose_tracked and not getattr(pose_results, 'pose_landmarks', None))):
+            box = None
+            self.retry_passes += 1
+            hand_results, pose_results = self._run(hands, pose, rgb, box)
+        self._pose_tracked = bool(getattr(pose_results, 'pose_landmarks', None))
+
+        if self.enabled:
+            self.box = self._next_box(hand_results, pose_results, w, h)
+        return hand_results, pose_results
+
+    def pixel_ratio(self):
+        """Fraction of full-frame pixels actually handed to MediaPipe so far"""
+        return self.pixels_processed / self.pixels_full if self.pixels_full else 1.0
+
+    def _run(self, hands, pose, rgb, box):
+        """Crop, downscale, detect and remap landmarks back to the full frame"""
+        h, w = rgb.shape[:2]
+        if box is None:
+            x0, y0, x1, y1 = 0, 0, w, h
+            image = rgb
+            self.full_frame_passes += 1
+        else:
+            x0, y0, x1, y1 = box
+            image = rgb[y0:y1, x0:x1]
+
+        if self.max_side:
+            scale = self.max_side / max(image.shape[:2])
+            if scale < 1.0:
+                image = cv2.resize(image, (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale))),
+                                   interpolation=cv2.INTER_AREA)
+        image = np.ascontiguousarray(image)
+        self.pixels_processed += image.shape[0] * image.shape[1]
+
+        # New graphs start untracked; otherwise a changed window means a fresh track
+        if self._graphs != (id(hands), id(pose)):
+            self._graphs = (id(hands), id(pose))
+            self._graph_box = box
+        reset = box != self._graph_box
+        if reset:
+            self._graph_box = box
+            self.graph_resets += 1
+
+        t0 = time.perf_counter_ns()
+        if reset:
+            _reset_graph(hands)
+        hand_results = hands.process(image)
+        t1 = time.perf_counter_ns()
+        if reset:
+            _reset_graph(pose)
+        pose_results = pose.process(image)
+        self.last_hands_ns += t1 - t0
+        self.last_pose_ns += time.perf_counter_ns() - t1
+
+        if (x0, y0, x1, y1) != (0, 0, w, h):
+            # Normalized crop coordinates -> normalized full-frame coordinates.
+            # MediaPipe's z uses roughly the same scale as x, so it follows the width.
+            sx, sy = (x1 - x0) / w, (y1 - y0) / h
+            ox, oy = x0 / w, y0 / h
+            for hand_landmarks in getattr(hand_results, 'multi_hand_landmarks', None) or []:
+                _remap_landmarks(hand_landmarks.landmark, sx, sy, ox, oy)
+            pose_landmarks = getattr(pose_results, 'pose_landmarks', None)
+            if pose_landmarks:
+                _remap_landmarks(pose_landmarks.landmark, sx, sy, ox, oy)
+        return hand_results, pose_results
+
+    def _next_box(self, hand_results, pose_results, w, h):
+        """Crop window for the next frame, or None to use the full frame"""
+        points = []
+        for hand_landmarks in getattr(hand_results, 'multi_hand_landmarks', None) or []:
+            points.extend((lm.x, lm.y) for lm in hand_landmarks.landmark)
+        if not points:
+            return None
+        pose_landmarks = getattr(pose_results, 'pose_landmarks', None)
+        if pose_landmarks:
+            landmarks = pose_landmarks.landmark
+            points.extend((landmarks[i].x, landmarks[i].y) for i in ROI_POSE_LANDMARKS
+                          if i < len(landmarks) and getattr(landmarks[i], 'visibility', 1.0) > 0.5)
+
+        coords = np.clip(np.array(points, dtype=np.float32), 0.0, 1.0) * np.array([w, h], dtype=np.float32)
+        bx0, by0 = coords.min(axis=0)
+        bx1, by1 = coords.max(axis=0)
+
+        # Keep the current window while the tracked region stays clear of its edges
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            border_x, border_y = 0.05 * (x1 - x0), 0.05 * (y1 - y0)
+            if (bx0 >= x0 + border_x and by0 >= y0 + border_y
+                    and bx1 <= x1 - border_x and by1 <= y1 - border_y):
+                return self.box
+
+        pad = self.margin * max(bx1 - bx0, by1 - by0, 1.0)
+        half_w = max((bx1 - bx0) / 2 + pad, self.min_size / 2)
+        half_h = max((by1 - by0) / 2 + pad, self.min_size / 2)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0, x1 = int(max(0, cx - half_w)), int(min(w, cx + half_w))
+        y0, y1 = int(max(0, cy - half_h)), int(min(h, cy + half_h))
+
+        # Not worth cropping when the window covers most of the frame
+        if (x1 - x0) * (y1 - y0) > 0.8 * w * h:
+            return None
+        return (x0, y0, x1, y1)
+
+
+def _remap_landmarks(landmarks, sx, sy, ox, oy):
+    """Map normalized crop landmarks to full-frame coordinates in place"""
+    for lm in landmarks:
+        lm.x = lm.x * sx + ox
+        lm.y = lm.y * sy + oy
+        lm.z = lm.z * sx
+
+
+def _reset_graph(graph):
+    """Drop a MediaPipe solution's tracking state (SolutionBase.reset, where available)"""
+    reset = getattr(graph, 'reset', None)
+    if reset is not None:
+        reset()
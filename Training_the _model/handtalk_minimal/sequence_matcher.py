@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Dynamic-time-warping matcher over the recorded motion sequences
+
+Every JSON file in data/arm_hand_sequences is a template for its gesture.
+Templates and the live window of recent feature frames are resampled to the
+same length, and the nearest template under DTW (squared Euclidean frame
+distance, Sakoe-Chiba band) gives the label. To keep hundreds of templates
+affordable at frame rate, each query runs the UCR-suite cascade:
+
+    1. LB_Kim: the first and last frames are always aligned, computed for
+       all templates at once
+    2. LB_Keogh: distance from the query to each surviving template's
+       band envelope, also vectorized over templates and computed on the
+       frames' leading principal components
+    3. full DTW, in batches of templates in order of increasing lower
+       bound, vectorized over each batch and abandoned per template as soon
+       as a row's minimum plus the remaining LB_Keogh terms exceeds the best
+       distance before the batch
+
+Every pruning step is exact: the match is the same as comparing against
+every template in full. When a template is a near-copy of the query the
+first DTW distance is tiny and LB_Kim alone prunes almost everything;
+LB_Keogh does the work when the best match is further away (another
+signer, a shifted position), which the benchmark simulates by holding each
+query's own recording out of the templates.
+
+The leave-one-out accuracy on the bundled recordings is low (5 of 14; most
+gestures have one or two recordings), so the match is informational, not a
+replacement for the frame classifier.
+
+Usage:
+    python sequence_matcher.py                  # leave-one-out accuracy and pruning benchmark
+    python sequence_matcher.py --templates 500  # scale up with jittered copies
+    python sequence_matcher.py --no-holdout     # queries with a near-copy among the templates
+    python recognize_gestures_bimanual.py --sequence-match
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from benchmark_suite import summarize
+from feature_transform import FEATURE_TRANSFORMS, invariant_features
+from recognition_core import FEATURE_COUNT
+
+SEQUENCE_LENGTH = 20
+
+logger = logging.getLogger("HandTalk")
+
+
+def add_sequence_arguments(parser):
+    """Add the DTW sequence matching command line options to an argparse parser"""
+    parser.add_argument("--sequence-match", action="store_true",
+                        help="Also match the last frames against the recorded motion sequences (DTW)")
+    parser.add_argument("--sequences-dir", default="data/arm_hand_sequences",
+                        help="Directory of recorded sequence JSON files used as templates")
+    parser.add_argument("--sequence-band", type=int, default=3,
+                        help="DTW warping band in frames (Sakoe-Chiba window)")
+    parser.add_argument("--sequence-interval", type=int, default=3,
+                        help="Match every N frames with new landmarks")
+    return parser
+
+
+def load_sequences(sequences_dir="data/arm_hand_sequences"):
+    """Load (label, (frames, 138) array) pairs from the recorded sequence files"""
+    sequences = []
+    for path in sorted(glob.glob(os.path.join(sequences_dir, "*.json"))):
+        try:
+            with open(path, 'r') as f:
+                sequence = json.load(f)
+            frames = np.array([row[:FEATURE_COUNT] for row in sequence["frames"]], dtype=np.float64)
+            label = str(sequence.get("metadata", {}).get("gesture_name") or sequence["frames"][0][-1])
+        except Exception as e:
+            print(f"Skipping unreadable sequence {path}: {e}")
+            continue
+        if len(frames) >= 2:
+            sequences.append((label, frames))
+    return sequences
+
+
+def resample(frames, length=SEQUENCE_LENGTH):
+    """Linearly resample a (T, D) sequence to (length, D)"""
+    frames = np.asarray(frames, dtype=np.float64)
+    if len(frames) == length:
+        return frames
+    positions = np.linspace(0, len(frames) - 1, length)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(frames) - 1)
+    weight = (positions - lower)[:, None]
+    return frames[lower] * (1 - weight) + frames[upper] * weight
+
+
+def envelopes(templates, band):
+    """Upper and lower LB_Keogh envelopes of (M, T, D) templates within +-band frames"""
+    length = templates.shape[1]
+    upper = np.empty_like(templates)
+    lower = np.empty_like(templates)
+    for i in range(length):
+        window = templates[:, max(0, i - band):min(length, i + band + 1)]
+        upper[:, i] = window.max(axis=1)
+        lower[:, i] = window.min(axis=1)
+    return upper, lower
+
+
+def dtw(cost, band, best=np.inf, tail=None):
+    """
+    Banded DTW over a stack of (T, T) frame cost matrices at once, with early abandoning
+
+    Each row of the recurrence is a handful of NumPy operations over all
+    templates: the dependency on the cell to the left is a running minimum
+    once the row's prefix sums are taken out.
+
+    Args:
+        cost: (M, T, T) pairwise squared frame distances, query rows x template columns
+        band: Sakoe-Chiba window in frames
+        best: Abandon a template once its distance is certain to reach this value
+        tail: (M, T), tail[m, i] = lower bound on the cost of query rows i.. (LB_Keogh suffix sums)
+
+    Returns:
+        (M,) DTW distances, inf where abandoned
+    """
+    count, length = cost.shape[:2]
+    result = np.full(count, np.inf)
+    alive = np.arange(count)
+    previous = None
+    for i in range(length):
+        low, high = max(0, i - band), min(length - 1, i + band)
+        row = cost[alive, i, low:high + 1]
+        prefix = np.cumsum(row, axis=1)
+        if previous is None:
+            current = prefix
+        else:
+            # Best of the cells above and diagonally above; outside the band is inf
+            above = previous[:, low:high + 1]
+            diagonal = np.concatenate([previous[:, low - 1:low] if low > 0 else np.full((len(alive), 1), np.inf),
+                                       previous[:, low:high]], axis=1)
+            from_previous = np.minimum(above, diagonal)
+            # current[j] = row[j] + min(from_previous[j], current[j - 1])
+            #            = prefix[j] + min over k <= j of (from_previous[k] - prefix[k - 1])
+            shifted = np.concatenate([np.zeros((len(alive), 1)), prefix[:, :-1]], axis=1)
+            current = prefix + np.minimum.accumulate(from_previous - shifted, axis=1)
+        remaining = tail[alive, i + 1] if tail is not None and i + 1 < length else 0.0
+        keep = current.min(axis=1) + remaining < best
+        alive = alive[keep]
+        if not len(alive):
+            return result
+        previous = np.full((len(alive), length), np.inf)
+        previous[:, low:high + 1] = current[keep]
+    result[alive] = previous[:, length - 1]
+    return result
+
+
+class SequenceMatcher:
+    """
+    1-nearest-neighbor DTW matcher over gesture templates
+
+    Args:
+        sequences: (label, (frames, 138) array) pairs, e.g. from load_sequences()
+        length: Frames every template and query is resampled to
+        band: Sakoe-Chiba window in frames
+        transform: "raw" or "invariant" frame features
+        batch: Templates compared by one vectorized DTW call; the best distance
+            is tightened between batches
+        components: Principal components LB_Keogh is computed on
+    """
+
+    def __init__(self, sequences, length=SEQUENCE_LENGTH, band=3, transform="raw", batch=16, components=16):
+        if transform not in FEATURE_TRANSFORMS:
+            raise ValueError(f"Unknown feature transform '{transform}'")
+        if not sequences:
+            raise ValueError("No template sequences to match against")
+        self.length = length
+        self.band = band
+        self.transform = transform
+        self.batch = batch
+        self.labels = np.array([label for label, _ in sequences], dtype=object)
+        self.templates = np.stack([self._prepare(frames) for _, frames in sequences])
+        self.norms = (self.templates ** 2).sum(axis=2)
+        # LB_Keogh runs on the frames' leading principal components: an
+        # orthonormal projection never lengthens a distance, so it still bounds
+        # the full DTW, and the recorded frames are close to low-rank
+        frames = self.templates.reshape(-1, self.templates.shape[2])
+        self.basis = np.linalg.svd(frames - frames.mean(axis=0), full_matrices=False)[2][:components]
+        self.upper, self.lower = envelopes(self.templates @ self.basis.T, band)
+
+    @classmethod
+    def from_directory(cls, sequences_dir="data/arm_hand_sequences", **options):
+        return cls(load_sequences(sequences_dir), **options)
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a matcher from parsed add_sequence_arguments options, or None if matching is off or impossible"""
+        if not args.sequence_match:
+            return None
+        try:
+            return cls.from_directory(args.sequences_dir, band=args.sequence_band)
+        except ValueError:
+            message = f"Sequence matching disabled: no recorded sequences in {args.sequences_dir}"
+            logger.error(message)
+            print(f"❌ {message}")
+            return None
+
+    def _prepare(self, frames):
+        frames = resample(frames, self.length)
+        return invariant_features(frames) if self.transform == "invariant" else frames
+
+    def match(self, frames):
+        """
+        Nearest template of a window of feature frames
+
+        Returns:
+            (label, distance, stats) where stats counts the templates pruned by
+            each bound, abandoned during DTW and compared in full
+        """
+        query = self._prepare(frames)
+        count = len(self.templates)
+        stats = {"templates": count, "pruned_kim": 0, "pruned_keogh": 0, "abandoned": 0, "full_dtw": 0}
+
+        # LB_Kim: DTW always aligns the first frames and the last frames
+        kim = (((self.templates[:, 0] - query[0]) ** 2).sum(axis=1)
+               + ((self.templates[:, -1] - query[-1]) ** 2).sum(axis=1))
+        order = np.argsort(kim)
+        best_index = order[0]
+        best = self._dtw(query, order[:1], np.inf, None)[0]
+        stats["full_dtw"] += 1
+
+        survivors = order[1:][kim[order[1:]] < best]
+        stats["pruned_kim"] = count - 1 - len(survivors)
+        if len(survivors):
+            # LB_Keogh per query frame, vectorized over the surviving templates
+            projected = query @ self.basis.T
+            outside = np.clip(projected[None], self.lower[survivors], self.upper[survivors]) - projected[None]
+            per_frame = np.einsum('mtc,mtc->mt', outside, outside)
+            keogh = per_frame.sum(axis=1)
+            tails = np.cumsum(per_frame[:, ::-1], axis=1)[:, ::-1]
+
+            ranked = np.argsort(keogh)
+            for start in range(0, len(ranked), self.batch):
+                chunk = ranked[start:start + self.batch]
+                live = chunk[keogh[chunk] < best]
+                if len(live):
+                    distances = self._dtw(query, survivors[live], best, tails[live])
+                    finished = np.isfinite(distances)
+                    stats["abandoned"] += int(np.sum(~finished))
+                    stats["full_dtw"] += int(np.sum(finished))
+                    position = int(np.argmin(distances))
+                    if distances[position] < best:
+                        best, best_index = distances[position], survivors[live[position]]
+                if len(live) < len(chunk):
+                    # Sorted by bound: every remaining template is pruned too
+                    stats["pruned_keogh"] += len(ranked) - start - len(live)
+                    break
+        return self.labels[best_index], float(best), stats
+
+    def _dtw(self, query, indices, best, tails):
+        templates = self.templates[indices]
+        cost = np.maximum((query ** 2).sum(axis=1)[None, :, None] - 2.0 * query @ templates.transpose(0, 2, 1)
+                          + self.norms[indices][:, None, :], 0.0)
+        return dtw(cost, self.band, best, tails)
+
+    def match_exhaustive(self, frames):
+        """Nearest template without any pruning (for checking and benchmarking)"""
+        query = self._prepare(frames)
+        distances = self._dtw(query, np.arange(len(self.templates)), np.inf, None)
+        best_index = int(np.argmin(distances))
+        return self.labels[best_index], float(distances[best_index])
+
+
+class FeatureWindow:
+    """The last `length` feature frames seen by a recognizer"""
+
+    def __init__(self, length=SEQUENCE_LENGTH):
+        self.frames = deque(maxlen=length)
+        self.appended = 0
+
+    def append(self, features):
+        self.frames.append(np.asarray(features, dtype=np.float64).reshape(-1))
+        self.appended += 1
+
+    def clear(self):
+        self.frames.clear()
+        self.appended = 0
+
+    def full(self):
+        return len(self.frames) == self.frames.maxlen
+
+    def array(self):
+        return np.array(self.frames)
+
+
+def jittered_copies(sequences, total, seed=42, sigma=0.004, max_shift=2):
+    """Pad a template set to `total` templates with time-shifted, jittered copies"""
+    rng = np.random.default_rng(seed)
+    out = list(sequences)
+    while len(out) < total:
+        label, frames = sequences[rng.integers(len(sequences))]
+        shift = rng.integers(-max_shift, max_shift + 1)
+        shifted = np.roll(frames, shift, axis=0)
+        out.append((label, shifted + np.where(shifted != 0, rng.normal(0, sigma, shifted.shape), 0.0)))
+    return out
+
+
+def perturb_sequence(frames, rng, shift=0.03, sigma=0.004, warp=0.15):
+    """A plausible new performance of a recording: time-warped, shifted in the image and jittered"""
+    length = len(frames)
+    u = np.linspace(0, 1, length)
+    positions = np.clip(u + rng.uniform(-warp, warp) * np.sin(np.pi * u), 0, 1) * (length - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, length - 1)
+    weight = (positions - lower)[:, None]
+    warped = frames[lower] * (1 - weight) + frames[upper] * weight
+    offset = np.zeros(FEATURE_COUNT)
+    offset[0::3] = rng.uniform(-shift, shift)
+    offset[1::3] = rng.uniform(-shift, shift)
+    return np.where(warped != 0, warped + offset + rng.normal(0, sigma, warped.shape), 0.0)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark DTW matching over the recorded motion sequences")
+    parser.add_argument("--sequences-dir", default="data/arm_hand_sequences", help="Recorded sequence directory")
+    parser.add_argument("--band", type=int, default=3, help="DTW warping band in frames")
+    parser.add_argument("--features", choices=FEATURE_TRANSFORMS, default="raw", help="Frame features to compare")
+    parser.add_argument("--templates", type=int, default=0,
+                        help="Pad the template set to this many with jittered copies, to measure scaling")
+    parser.add_argument("--queries", type=int, default=100, help="Number of timed queries")
+    parser.add_argument("--no-holdout", dest="holdout", action="store_false",
+                        help="Keep each query's own recording (and its copies) among the templates")
+    parser.add_argument("--check", action="store_true", help="Verify every match against exhaustive DTW")
+    parser.add_argument("--output", help="Write the benchmark report to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    """Leave-one-out accuracy on the recordings, then pruning and latency per query"""
+    args = parse_args()
+    sequences = load_sequences(args.sequences_dir)
+    if len(sequences) < 2:
+        print(f"❌ Need at least two recorded sequences in {args.sequences_dir}")
+        return 1
+    labels = sorted({label for label, _ in sequences})
+    print(f"{len(sequences)} recorded sequences, {len(labels)} gestures: {', '.join(labels)}")
+
+    # Leave-one-out: each recording against all the others
+    correct = 0
+    for i, (label, frames) in enumerate(sequences):
+        matcher = SequenceMatcher(sequences[:i] + sequences[i + 1:], band=args.band, transform=args.features)
+        correct += matcher.match(frames)[0] == label
+    print(f"Leave-one-out accuracy: {correct}/{len(sequences)} ({correct / len(sequences):.0%})")
+
+    # Queries are perturbed performances of a recording. With --holdout (the
+    # default) that recording is not among the templates, as for a new signer;
+    # otherwise a near-copy of every query is, its DTW distance is tiny and
+    # LB_Kim alone prunes almost everything
+    matchers = {}
+    rng = np.random.default_rng(0)
+    totals = {"pruned_kim": 0, "pruned_keogh": 0, "abandoned": 0, "full_dtw": 0}
+    pruned_latency, exhaustive_latency, mismatches = [], [], 0
+    for q in range(args.queries):
+        source = q % len(sequences)
+        key = source if args.holdout else None
+        if key not in matchers:
+            pool = [s for i, s in enumerate(sequences) if i != key]
+            templates = jittered_copies(pool, args.templates) if args.templates > len(pool) else pool
+            matchers[key] = SequenceMatcher(templates, band=args.band, transform=args.features)
+        matcher = matchers[key]
+        query = perturb_sequence(sequences[source][1], rng)
+        start = time.perf_counter_ns()
+        match_label, distance, stats = matcher.match(query)
+        pruned_latency.append(time.perf_counter_ns() - start)
+        for name in totals:
+            totals[name] += stats[name]
+        if args.check or q < 10:
+            start = time.perf_counter_ns()
+            exhaustive_label, exhaustive_distance = matcher.match_exhaustive(query)
+            exhaustive_latency.append(time.perf_counter_ns() - start)
+            mismatches += not np.isclose(distance, exhaustive_distance)
+
+    template_count = len(matcher.templates)
+    pruned, exhaustive = summarize(pruned_latency), summarize(exhaustive_latency)
+    per_query = {name: round(value / args.queries, 1) for name, value in totals.items()}
+    kim_survivors = template_count - 1 - per_query["pruned_kim"]
+    keogh_share = per_query["pruned_keogh"] / kim_survivors if kim_survivors > 0 else 0.0
+    print(f"\n{template_count} templates, band {args.band}, {args.queries} "
+          f"{'held-out' if args.holdout else 'in-set'} queries:")
+    print(f"  pruned by LB_Kim    {per_query['pruned_kim']:7.1f} per query")
+    print(f"  pruned by LB_Keogh  {per_query['pruned_keogh']:7.1f} per query "
+          f"({keogh_share:.0%} of the LB_Kim survivors)")
+    print(f"  abandoned early     {per_query['abandoned']:7.1f} per query")
+    print(f"  full DTW            {per_query['full_dtw']:7.1f} per query")
+    print(f"  latency p50 {pruned['p50_ms']:.3f} ms, p95 {pruned['p95_ms']:.3f} ms "
+          f"(exhaustive p50 {exhaustive['p50_ms']:.3f} ms)")
+    if mismatches:
+        print(f"❌ {mismatches} pruned matches differ from exhaustive DTW")
+
+    if args.output:
+        report = {"templates": template_count, "band": args.band, "features": args.features,
+                  "holdout": args.holdout, "leave_one_out_accuracy": correct / len(sequences),
+                  "per_query": per_query, "keogh_share_of_kim_survivors": round(keogh_share, 4),
+                  "latency": pruned, "exhaustive_latency": exhaustive, "mismatches": mismatches}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved sequence matching report to {args.output}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Load-test client for recognition_service.py
+
+Opens --connections persistent HTTP connections, each sending the rows of
+data/gestures_bimanual.csv as prediction requests (JSON or binary float32)
+back to back for --duration seconds, then reports requests/sec and
+p50/p95/p99 latency. The report can also be written to a JSON file.
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmark_suite import load_csv_frames, summarize
+from recognition_service import BINARY_CONTENT_TYPE, BINARY_DTYPE
+
+
+def encode_requests(rows, binary, batch_size=1):
+    """Pre-encode request bodies so the client measures the service, not itself"""
+    features = np.asarray(rows, dtype=np.float64)
+    bodies = []
+    for start in range(0, len(features) - batch_size + 1, batch_size):
+        batch = features[start:start + batch_size]
+        if binary:
+            bodies.append((batch.astype(BINARY_DTYPE).tobytes(), BINARY_CONTENT_TYPE))
+        else:
+            payload = {"features": batch[0].tolist() if batch_size == 1 else batch.tolist()}
+            bodies.append((json.dumps(payload).encode("utf-8"), "application/json"))
+    return bodies
+
+
+def run_connection(url, path, bodies, offset, deadline, latencies, errors):
+    """Send requests over one kept-alive connection until the deadline"""
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    clock = time.perf_counter_ns
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            body, content_type = bodies[index % len(bodies)]
+            index += 1
+            start = clock()
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(str(e))
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+                continue
+            latencies.append(clock() - start)
+    finally:
+        connection.close()
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Load test for the HandTalk recognition service")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Service base URL")
+    parser.add_argument("--csv", default="data/gestures_bimanual.csv", help="Gesture CSV whose rows are sent")
+    parser.add_argument("--connections", type=int, default=4, help="Concurrent persistent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test length in seconds")
+    parser.add_argument("--binary", action="store_true", help="Send float32 binary bodies instead of JSON")
+    parser.add_argument("--batch-size", type=int, default=1, help="Vectors per request")
+    parser.add_argument("--dialect", help="Dialect to request translations in")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    """Run the load test and print requests/sec and tail latency"""
+    args = parse_args()
+    frames = load_csv_frames(args.csv)
+    if not frames:
+        print("❌ No gesture data found to send.")
+        return 1
+
+    url = urlparse(args.url)
+    path = "/predict" + (f"?dialect={args.dialect}" if args.dialect else "")
+    bodies = encode_requests([features for features, _ in frames], args.binary, args.batch_size)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=run_connection,
+                                args=(url, path, bodies, i * 17, deadline, latencies, errors))
+               for i in range(args.connections)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    report = {
+        "url": args.url,
+        "connections": args.connections,
+        "payload": "binary" if args.binary else "json",
+        "batch_size": args.batch_size,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "vectors_per_s": round(len(latencies) * args.batch_size / elapsed, 1),
+        "latency": stats,
+    }
+
+    print(f"{report['requests']} requests in {elapsed:.1f} s over {args.connections} connections "
+          f"({report['payload']}, {args.batch_size} vector(s) per request)")
+    print(f"Throughput: {report['requests_per_s']} requests/s, {report['vectors_per_s']} vectors/s")
+    if stats["count"]:
+        print(f"Latency: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+              f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+    if errors:
+        print(f"❌ {len(errors)} failed requests (first: {errors[0]})")
+
+    # Server-side micro-batching metrics, when the service exposes them
+    try:
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=5)
+        connection.request("GET", "/metrics")
+        report["service_metrics"] = json.loads(connection.getresponse().read())
+        connection.close()
+        batching = report["service_metrics"].get("batching")
+        if batching and batching.get("batches"):
+            print(f"Service batching: mean batch size {batching['mean_batch_size']}, "
+                  f"queueing delay p50 {batching['queue_delay_p50_ms']} ms, p95 {batching['queue_delay_p95_ms']} ms")
+    except (OSError, ValueError, http.client.HTTPException):
+        pass
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved load test report to {args.output}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Tests for the background collection writer"""
+
+import csv
+import json
+import os
+import time
+
+import collection_writer
+from collection_writer import CollectionWriter
+
+
+def make_row(i, label="Hello"):
+    return [float(i)] * 138 + [label]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the writer"
+        time.sleep(0.01)
+
+
+def test_failed_write_is_reported_and_retried(tmp_path, monkeypatch):
+    csv_path = tmp_path / "gestures.csv"
+    real_fsync = os.fsync
+    failures = [OSError("No space left on device")]
+
+    def flaky_fsync(fd):
+        # Fail once the first batch has reached the CSV, as a full disk would
+        if failures and csv_path.exists() and csv_path.stat().st_size:
+            raise failures.pop()
+        real_fsync(fd)
+
+    monkeypatch.setattr(collection_writer.os, "fsync", flaky_fsync)
+    writer = CollectionWriter(str(csv_path), str(tmp_path / "sequences"), flush_rows=2, flush_interval=0.05)
+    writer.start_recording("Hello")
+    for i in range(3):
+        writer.add_row(make_row(i))
+
+    # The failure reaches the UI while the session is still running
+    wait_for(lambda: writer.errors)
+    assert writer.poll_errors() == ["No space left on device"]
+    writer.finish_recording()
+    assert writer.close() == 3
+    assert not writer.failing
+    assert writer.poll_errors() == []
+
+    with open(csv_path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == collection_writer.sequence_header()
+    assert [row[0] for row in rows[1:]] == ["0.0", "1.0", "2.0"]
+    sequence, = writer.sequences
+    with open(sequence) as f:
+        assert json.load(f)["metadata"]["frame_count"] == 3
+    assert not os.path.exists(sequence + collection_writer.PARTIAL_SUFFIX)
+
+
+def test_failed_finalize_closes_the_journal(tmp_path, monkeypatch):
+    def failing_write_sequence(*args, **kwargs):
+        raise OSError("Read-only file system")
+
+    monkeypatch.setattr(collection_writer, "write_sequence", failing_write_sequence)
+    sequence_dir = tmp_path / "sequences"
+    writer = CollectionWriter(str(tmp_path / "gestures.csv"), str(sequence_dir), flush_interval=0.05)
+    writer.start_recording("Hello")
+    writer.add_row(make_row(0))
+    writer.finish_recording()
+    # Rows recorded after the failure don't end up in the stale sequence
+    writer.add_row(make_row(1))
+    assert writer.close() == 2
+    assert len(writer.errors) == 1 and "Read-only file system" in writer.errors[0]
+
+    # The journal is left for recovery, holding only the recorded frame
+    journal, = sequence_dir.glob("*" + collection_writer.PARTIAL_SUFFIX)
+    with open(journal) as f:
+        assert len(f.readlines()) == 2
+    monkeypatch.undo()
+    recovered = collection_writer.recover_sequences(str(sequence_dir))
+    assert len(recovered) == 1
+
+
+def test_close_retries_held_back_rows(tmp_path, monkeypatch):
+    csv_path = tmp_path / "gestures.csv"
+    real_fsync = os.fsync
+    failures = [OSError("Disk busy")] * 3
+
+    def flaky_fsync(fd):
+        if failures:
+            raise failures.pop()
+        real_fsync(fd)
+
+    monkeypatch.setattr(collection_writer.os, "fsync", flaky_fsync)
+    writer = CollectionWriter(str(csv_path), str(tmp_path / "sequences"), flush_rows=100, flush_interval=0.01)
+    for i in range(3):
+        writer.add_row(make_row(i))
+    assert writer.close() == 3
+    assert not writer.failing and writer.rows_lost == 0
+    assert writer.poll_errors() == ["Disk busy"]
+
+
+def test_rows_lost_at_close_are_reported(tmp_path, monkeypatch):
+    def failing_fsync(fd):
+        raise OSError("Input/output error")
+
+    monkeypatch.setattr(collection_writer.os, "fsync", failing_fsync)
+    writer = CollectionWriter(str(tmp_path / "gestures.csv"), str(tmp_path / "sequences"),
+                              flush_rows=100, flush_interval=0.01)
+    for i in range(3):
+        writer.add_row(make_row(i))
+    assert writer.close() == 0
+    assert writer.failing and writer.rows_lost == 3
+    assert writer.poll_errors() == ["Input/output error",
+                                    f"3 collected rows could not be written to {tmp_path / 'gestures.csv'}"]
@@ -108,22 +108,25 @@ class TranslationModule:
         """
         return list(self.translations.keys())
     
-    def translate(self, text: str) -> str:
+    def translate(self, text: str, dialect: Optional[str] = None) -> str:
         """
         Translate text to the current dialect
         
         Args:
             text: Text to translate
+            dialect: Dialect to use instead of the current one (lets
+                concurrent callers translate without changing shared state)
             
         Returns:
             Translated text or original text if translation not found
         """
         # Normalize the text (remove extra spaces, etc.)
         normalized_text = text.strip()
+        dialect = dialect.lower() if dialect else self.current_dialect
         
-        # Check if we have translations for the current dialect
-        if self.current_dialect in self.translations:
-            dialect_translations = self.translations[self.current_dialect]
+        # Check if we have translations for the dialect
+        if dialect in self.translations:
+            dialect_translations = self.translations[dialect]
             
             # Look for exact match
             if normalized_text in dialect_translations:
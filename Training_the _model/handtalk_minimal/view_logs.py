@@ -1,100 +1,361 @@
 #!/usr/bin/env python3
 """
-Simple script to view the latest log file
+Simple script to view, tail, follow and filter HandTalk log files
+
+Level and time filters use the sidecar .idx offset index written next to each
+log file, so only the matching records are read from disk. Logs without an
+index (older sessions) fall back to scanning the text.
+
+Usage:
+    python view_logs.py                               # interactive menu
+    python view_logs.py --tail 50                     # last 50 records
+    python view_logs.py --follow --level WARNING      # follow new warnings/errors
+    python view_logs.py --level ERROR --since "2024-05-01 09:00" --page 40
 """
 
+import argparse
 import os
 import glob
+import re
+import sys
+import time
 from datetime import datetime
 
-def view_latest_log():
-    """View the most recent log file"""
-    # Find all log files
-    log_dir = "logs"
+import numpy as np
+
+from logging_config import INDEX_RECORD, INDEX_SUFFIX, index_path
+
+LOG_DIR = "logs"
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# (created, offset, levelno) entries written by IndexedRotatingFileHandler
+INDEX_DTYPE = np.dtype([('created', '<f8'), ('offset', '<u8'), ('level', 'u1')])
+assert INDEX_DTYPE.itemsize == INDEX_RECORD.size
+
+# handtalk_YYYYmmdd_HHMMSS[_pid].log[.N] - N is a size-rotated backup (1 = newest)
+NAME_PATTERN = re.compile(r'^handtalk_(\d{8}_\d{6})(?:_(\d+))?\.log(?:\.(\d+))?$')
+
+LINE_PATTERN = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - .*? - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
+
+def session_time(log_path):
+    """Session start time from a log file name, or None if the name has none"""
+    match = NAME_PATTERN.match(os.path.basename(log_path))
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+
+def _sort_key(log_path):
+    match = NAME_PATTERN.match(os.path.basename(log_path))
+    if not match:
+        # Unexpected name: only these files are stat'ed
+        return (datetime.fromtimestamp(os.path.getmtime(log_path)).strftime("%Y%m%d_%H%M%S"), 0, 0)
+    # Within a session the live file is newest, then .1, .2, ...
+    return (match.group(1), int(match.group(2) or 0), -int(match.group(3) or 0))
+
+def find_log_files(log_dir=LOG_DIR):
+    """Log files including rotated backups, newest first (ordered by the session time in the name)"""
+    log_files = [path for path in glob.glob(os.path.join(log_dir, "handtalk_*.log*"))
+                 if not path.endswith(INDEX_SUFFIX)]
+    log_files.sort(key=_sort_key, reverse=True)
+    return log_files
+
+def latest_log_file(log_dir=LOG_DIR):
+    """The most recent log file, or None (with a message) if there is none"""
     if not os.path.exists(log_dir):
         print("No logs directory found!")
-        return
-    
-    log_files = glob.glob(os.path.join(log_dir, "handtalk_*.log"))
-    
+        return None
+    log_files = find_log_files(log_dir)
     if not log_files:
         print("No log files found!")
+        return None
+    return log_files[0]
+
+def read_index(log_path):
+    """Load a log file's offset index, or None if it is missing or stale"""
+    path = index_path(log_path)
+    if not os.path.exists(path):
+        return None
+    # Memory-mapped, so only the pages the filters touch are read; a
+    # partially written last entry is ignored
+    count = os.path.getsize(path) // INDEX_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    index = np.memmap(path, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+    if len(index) and index['offset'][-1] > os.path.getsize(log_path):
+        return None
+    return index
+
+def parse_time(text):
+    """Parse "YYYY-mm-dd HH:MM[:SS]" or "HH:MM[:SS]" (today) into a timestamp"""
+    if text is None:
+        return None
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        clock = datetime.strptime(text, "%H:%M:%S" if text.count(":") == 2 else "%H:%M").time()
+        return datetime.combine(datetime.now().date(), clock).timestamp()
+
+def _record_time_and_level(first_line):
+    """Timestamp and level number parsed from a record's first line"""
+    match = LINE_PATTERN.match(first_line)
+    if not match:
+        return None, None
+    created = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").timestamp() + int(match.group(2)) / 1000
+    return created, LEVELS[match.group(3)]
+
+def _scan_records(log_path):
+    """(created, levelno, text) for every record, parsed from the text (no index)"""
+    record = None
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            created, level = _record_time_and_level(line)
+            if created is None and record is not None:
+                # Continuation line, e.g. a traceback
+                record[2] += line
+                continue
+            if record is not None:
+                yield tuple(record)
+            record = [created, level or 0, line]
+    if record is not None:
+        yield tuple(record)
+
+def iter_records(log_path, min_level=0, since=None, until=None, last=None):
+    """
+    Yield the text of the records matching a level / time range filter
+
+    Args:
+        log_path: Log file to read
+        min_level: Lowest level number to include (e.g. 30 for WARNING)
+        since, until: Timestamps bounding the records' creation time
+        last: Only the last N matching records
+    """
+    index = read_index(log_path)
+    if index is None:
+        records = [text for created, level, text in _scan_records(log_path)
+                   if level >= min_level
+                   and (since is None or (created or 0) >= since)
+                   and (until is None or (created or 0) <= until)]
+        yield from records[-last:] if last else records
+        return
+
+    # Record i spans [offset[i], offset[i + 1])
+    ends = np.append(index['offset'][1:], os.path.getsize(log_path))
+    mask = index['level'] >= min_level
+    if since is not None:
+        mask &= index['created'] >= since
+    if until is not None:
+        mask &= index['created'] <= until
+    selected = np.flatnonzero(mask)
+    if last:
+        selected = selected[-last:]
+
+    with open(log_path, 'rb') as f:
+        for i in selected:
+            f.seek(int(index['offset'][i]))
+            yield f.read(int(ends[i] - index['offset'][i])).decode('utf-8', errors='replace')
+
+def session_files(log_path):
+    """A log file's rotated backups (oldest first) followed by the file itself"""
+    backups = []
+    for path in glob.glob(glob.escape(log_path) + ".*"):
+        suffix = path[len(log_path) + 1:]
+        if suffix.isdigit():
+            backups.append((int(suffix), path))
+    return [path for _, path in sorted(backups, reverse=True)] + [log_path]
+
+def iter_session_records(log_path, min_level=0, since=None, until=None, last=None):
+    """iter_records over a log file and its rotated backups, in time order"""
+    files = session_files(log_path)
+    if not last:
+        for path in files:
+            yield from iter_records(path, min_level, since, until)
         return
-    
-    # Sort by modification time (newest first)
-    log_files.sort(key=os.path.getmtime, reverse=True)
-    
-    # Get the most recent log file
-    latest_log = log_files[0]
-    
+    # Take the last records from the live file first and only reach into
+    # older backups while more are needed
+    chunks, needed = [], last
+    for path in reversed(files):
+        records = list(iter_records(path, min_level, since, until, needed))
+        chunks.append(records)
+        needed -= len(records)
+        if needed <= 0:
+            break
+    for records in reversed(chunks):
+        yield from records
+
+def tail_lines(log_path, count=20, block_size=8192):
+    """Last count lines of a file, read backwards from the end in blocks"""
+    with open(log_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return [line.decode('utf-8', errors='replace') + "\n" for line in data.splitlines()[-count:]]
+
+def follow_log(log_path, min_level=0, poll_interval=0.5):
+    """Print new records as they are written, until Ctrl+C"""
+    print(f"Following {log_path} (Ctrl+C to stop)")
+    position = os.path.getsize(log_path)
+    show = True
+    pending = ""
+    try:
+        while True:
+            size = os.path.getsize(log_path)
+            if size < position:
+                # The file was rotated - start again from the top
+                print("--- log rotated ---")
+                position = 0
+            if size > position:
+                with open(log_path, 'rb') as f:
+                    f.seek(position)
+                    chunk = f.read(size - position)
+                position = size
+                text = pending + chunk.decode('utf-8', errors='replace')
+                lines = text.split("\n")
+                pending = lines.pop()  # Keep an unfinished last line for the next read
+                for line in lines:
+                    created, level = _record_time_and_level(line)
+                    if level is not None:
+                        show = level >= min_level
+                    if show:
+                        print(line)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print()
+
+def page_output(records, page_size=40):
+    """Print records a page at a time"""
+    lines_shown = 0
+    for text in records:
+        print(text, end="" if text.endswith("\n") else "\n")
+        lines_shown += text.count("\n") or 1
+        if page_size and lines_shown >= page_size:
+            lines_shown = 0
+            if input("-- More (Enter to continue, q to quit) -- ").strip().lower() == 'q':
+                return
+
+def view_latest_log(page_size=40):
+    """View the most recent log file"""
+    latest_log = latest_log_file()
+    if latest_log is None:
+        return
+
     print(f"Latest log file: {latest_log}")
     print("=" * 50)
-    
+
     # Display the contents
     try:
-        with open(latest_log, 'r') as f:
-            print(f.read())
+        page_output(iter_session_records(latest_log), page_size)
     except Exception as e:
         print(f"Error reading log file: {e}")
 
 def list_all_logs():
     """List all log files with their timestamps"""
-    log_dir = "logs"
+    log_dir = LOG_DIR
     if not os.path.exists(log_dir):
         print("No logs directory found!")
         return
-    
-    log_files = glob.glob(os.path.join(log_dir, "handtalk_*.log"))
-    
+
+    log_files = find_log_files(log_dir)
+
     if not log_files:
         print("No log files found!")
         return
-    
-    # Sort by modification time (newest first)
-    log_files.sort(key=os.path.getmtime, reverse=True)
-    
+
     print("Available log files:")
     print("=" * 50)
-    
+
     for log_file in log_files:
-        # Extract timestamp from filename
-        try:
-            timestamp_str = os.path.basename(log_file).replace("handtalk_", "").replace(".log", "")
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-            formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        except:
-            formatted_time = "Unknown"
-        
-        file_size = os.path.getsize(log_file)
-        print(f"{formatted_time} - {os.path.basename(log_file)} ({file_size} bytes)")
+        # The timestamp comes from the file name, so listing doesn't stat every file
+        timestamp = session_time(log_file)
+        formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S") if timestamp else "Unknown"
+        print(f"{formatted_time} - {os.path.basename(log_file)}")
+
+def filter_latest_log():
+    """Interactively filter the latest log by level and time range"""
+    latest_log = latest_log_file()
+    if latest_log is None:
+        return
+    level = input("Minimum level (DEBUG/INFO/WARNING/ERROR) [INFO]: ").strip().upper() or "INFO"
+    since = input("From (YYYY-mm-dd HH:MM or HH:MM, blank = start): ").strip() or None
+    until = input("Until (YYYY-mm-dd HH:MM or HH:MM, blank = end): ").strip() or None
+    try:
+        records = iter_session_records(latest_log, LEVELS.get(level, 20), parse_time(since), parse_time(until))
+        print(f"{latest_log} - {level} and above")
+        print("=" * 50)
+        page_output(records)
+    except ValueError as e:
+        print(f"Invalid time: {e}")
+
+def parse_args():
+    """Parse command line options (no options = interactive menu)"""
+    parser = argparse.ArgumentParser(description="View HandTalk log files")
+    parser.add_argument("--file", help="Log file to read (default: latest)")
+    parser.add_argument("--tail", type=int, default=0, help="Show only the last N records")
+    parser.add_argument("--follow", action="store_true", help="Keep printing new records as they are written")
+    parser.add_argument("--level", choices=list(LEVELS), help="Minimum level to show")
+    parser.add_argument("--since", help="Only records from this time (YYYY-mm-dd HH:MM[:SS] or HH:MM[:SS])")
+    parser.add_argument("--until", help="Only records up to this time")
+    parser.add_argument("--page", type=int, default=0, help="Pause every N lines (0 = no paging)")
+    return parser.parse_args()
+
+def run_command_line(args):
+    """Non-interactive viewing driven by command line options"""
+    log_path = args.file or latest_log_file()
+    if log_path is None:
+        return
+    min_level = LEVELS[args.level] if args.level else 0
+    if (args.tail and not args.level and not args.since and not args.until and read_index(log_path) is None
+            and len(session_files(log_path)) == 1):
+        # Unfiltered tail of an unindexed, unrotated log: just read the end of the file
+        records = tail_lines(log_path, args.tail)
+    else:
+        records = iter_session_records(log_path, min_level, parse_time(args.since), parse_time(args.until), args.tail)
+    page_output(records, args.page)
+    if args.follow:
+        follow_log(log_path, min_level)
 
 def main():
     """Main function"""
     print("HandTalk Log Viewer")
     print("=" * 20)
     print()
-    
+
     while True:
         print("Options:")
         print("1. View latest log")
         print("2. List all logs")
-        print("3. Exit")
+        print("3. Filter latest log by level / time")
+        print("4. Follow latest log")
+        print("5. Exit")
         print()
-        
-        choice = input("Enter your choice (1-3): ").strip()
-        
+
+        choice = input("Enter your choice (1-5): ").strip()
+
         if choice == '1':
             view_latest_log()
         elif choice == '2':
             list_all_logs()
         elif choice == '3':
+            filter_latest_log()
+        elif choice == '4':
+            latest_log = latest_log_file()
+            if latest_log:
+                follow_log(latest_log)
+        elif choice == '5':
             break
         else:
             print("Invalid choice!")
-        
+
         print()
         input("Press Enter to continue...")
         print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        run_command_line(parse_args())
+    else:
+        main()